@@ -1,11 +1,22 @@
 from django.contrib import admin
-from .models import Product, PurchaseItem, ListingComponent, TrendyolWebhookLog
+from .models import (
+    Product, PurchaseItem, ListingComponent, TrendyolWebhookLog, CargoInvoice, CargoInvoiceItem,
+    TrendyolSettlement, AwaitingCargoInvoice, ReportJob, MonthlyProfitSummary, SingleFlight,
+    BarcodeMonthlyRollup, PurchasePriceHistory, ProductBarcodeAlias,
+)
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'barcode', 'purchase_price', 'selling_price', 'stock', 'profit_margin')
     search_fields = ('name', 'barcode')  # Arama yapılacak alanlar
 
+@admin.register(ProductBarcodeAlias)
+class ProductBarcodeAliasAdmin(admin.ModelAdmin):
+    list_display = ('barcode', 'product', 'note', 'created_at')
+    search_fields = ('barcode', 'product__barcode', 'product__name')
+    raw_id_fields = ('product',)
+
+
 @admin.register(PurchaseItem)
 class PurchaseItemAdmin(admin.ModelAdmin):
     list_display = ('name', 'purchase_barcode', 'purchase_price', 'quantity', 'created_at')
@@ -20,6 +31,12 @@ class ListingComponentInline(admin.TabularInline):
     autocomplete_fields = ['purchase_item']
 
 
+@admin.register(PurchasePriceHistory)
+class PurchasePriceHistoryAdmin(admin.ModelAdmin):
+    list_display = ('barcode', 'purchase_price', 'effective_at')
+    search_fields = ('barcode',)
+
+
 @admin.register(ListingComponent)
 class ListingComponentAdmin(admin.ModelAdmin):
     list_display = ('inventory_product', 'purchase_item', 'qty_per_listing', 'created_at')
@@ -41,3 +58,59 @@ class TrendyolWebhookLogAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False  # Loglar değiştirilemez
+
+
+class CargoInvoiceItemInline(admin.TabularInline):
+    model = CargoInvoiceItem
+    extra = 0
+    readonly_fields = ('order_number', 'amount')
+    can_delete = False
+
+
+@admin.register(CargoInvoice)
+class CargoInvoiceAdmin(admin.ModelAdmin):
+    list_display = ('serial_number', 'transaction_date', 'items_fetched', 'item_count', 'created_at')
+    list_filter = ('items_fetched', 'transaction_date')
+    search_fields = ('serial_number', 'items__order_number')
+    readonly_fields = ('serial_number', 'transaction_date', 'items_fetched', 'item_count', 'created_at')
+    inlines = [CargoInvoiceItemInline]
+
+
+@admin.register(TrendyolSettlement)
+class TrendyolSettlementAdmin(admin.ModelAdmin):
+    list_display = ('order_number', 'barcode', 'transaction_type', 'transaction_date', 'seller_revenue', 'synced_at')
+    list_filter = ('sync_type', 'transaction_type', 'transaction_date')
+    search_fields = ('order_number', 'barcode', 'settlement_id')
+
+
+@admin.register(AwaitingCargoInvoice)
+class AwaitingCargoInvoiceAdmin(admin.ModelAdmin):
+    list_display = ('order_number', 'barcode', 'transaction_type', 'transaction_date', 'seller_revenue', 'created_at')
+    list_filter = ('transaction_type',)
+    search_fields = ('order_number', 'barcode')
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'start_date', 'end_date', 'source', 'status', 'phase', 'created_at', 'finished_at')
+    list_filter = ('status', 'source')
+    readonly_fields = ('result',)
+
+
+@admin.register(SingleFlight)
+class SingleFlightAdmin(admin.ModelAdmin):
+    list_display = ('key', 'status', 'owner', 'started_at', 'expires_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('result',)
+
+
+@admin.register(MonthlyProfitSummary)
+class MonthlyProfitSummaryAdmin(admin.ModelAdmin):
+    list_display = ('month_key', 'seller_revenue', 'cargo_cost', 'purchase_cost', 'transaction_fee', 'net_profit', 'refreshed_at')
+
+
+@admin.register(BarcodeMonthlyRollup)
+class BarcodeMonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('month_key', 'barcode', 'units_sold', 'units_returned', 'seller_revenue', 'purchase_cost', 'net_profit', 'cost_missing')
+    list_filter = ('month_key', 'cost_missing')
+    search_fields = ('barcode',)
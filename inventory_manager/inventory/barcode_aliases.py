@@ -0,0 +1,142 @@
+"""
+Pazaryeri barkod eşlemeleri (ProductBarcodeAlias) için süreç içi indeks.
+
+Trendyol settlement / webhook kayıtları bazen Product.barcode'dan farklı bir
+barkod taşır (varyant barkodu, yeniden listelenmiş ürün). Eşlemeler tek
+sorguyla dış barkod → product_id sözlüğüne yüklenir; aramalar O(1)'dir.
+Tablonun sürümü (satır sayısı + en son updated_at) en fazla
+BARCODE_ALIAS_CHECK_SECONDS'ta bir kontrol edilir; sürüm değiştiyse (başka
+bir süreç eşleme eklediyse/sildiyse) harita yeniden yüklenir. Aynı süreçteki
+değişiklikler invalidate_alias_index() ile hemen görünür.
+
+propose_aliases(), eksik barkodlar için ürün önerir (propose_barcode_aliases komutu).
+"""
+import logging
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Product, ProductBarcodeAlias
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_index: Optional[Dict[str, int]] = None
+_version: Optional[tuple] = None
+_checked_at = 0.0
+
+
+def _table_version() -> tuple:
+    state = ProductBarcodeAlias.objects.aggregate(count=Count("id"), latest=Max("updated_at"))
+    return state["count"], state["latest"]
+
+
+def invalidate_alias_index() -> None:
+    """Haritayı düşürür; bir sonraki aramada yeniden yüklenir."""
+    global _index, _version
+    with _lock:
+        _index = None
+        _version = None
+
+
+def alias_index() -> Dict[str, int]:
+    """Güncel dış barkod → product_id haritası."""
+    global _index, _version, _checked_at
+    check_seconds = getattr(settings, "BARCODE_ALIAS_CHECK_SECONDS", 10)
+    with _lock:
+        now = time.monotonic()
+        if _index is not None and now - _checked_at < check_seconds:
+            return _index
+        version = _table_version()
+        _checked_at = now
+        if _index is None or version != _version:
+            _index = dict(ProductBarcodeAlias.objects.values_list("barcode", "product_id"))
+            _version = version
+            logger.info(f"Barkod eşleme indeksi yüklendi: {len(_index)} eşleme")
+        return _index
+
+
+def resolve_product_id(barcode: str) -> Optional[int]:
+    """Eşlenmiş dış barkodun product_id'si (eşleme yoksa None)."""
+    if not barcode:
+        return None
+    return alias_index().get(barcode)
+
+
+def find_products(barcodes: Iterable[str]) -> Dict[str, Product]:
+    """
+    Barkod → ürün: önce Product.barcode, bulunamayanlar eşleme tablosundan.
+    Barkod sayısından bağımsız en fazla iki sorgu; bulunamayan barkodlar sonuçta yoktur.
+    """
+    wanted = {b for b in barcodes if b}
+    if not wanted:
+        return {}
+    found = {product.barcode: product for product in Product.objects.filter(barcode__in=wanted)}
+    index = alias_index()
+    aliased = {barcode: index[barcode] for barcode in wanted - found.keys() if barcode in index}
+    if aliased:
+        by_id = Product.objects.in_bulk(set(aliased.values()))
+        for barcode, product_id in aliased.items():
+            if product_id in by_id:
+                found[barcode] = by_id[product_id]
+    return found
+
+
+def find_product(barcode: str) -> Optional[Product]:
+    """Barkodla ürün: önce Product.barcode, sonra eşleme tablosu."""
+    return find_products([barcode]).get(barcode)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Eşleme önerileri
+# ─────────────────────────────────────────────────────────────────────────────
+
+_SEPARATORS = re.compile(r"[\s\-_./]")
+# Varyant barkodu: ürün barkodu + ayraç/kısa ek (ör. ABC123-XL, ABC12302)
+MAX_VARIANT_SUFFIX = 4
+
+
+def _normalize(barcode: str) -> str:
+    return _SEPARATORS.sub("", barcode).upper().lstrip("0")
+
+
+def propose_aliases(barcodes: Iterable[str]) -> List[Tuple[str, Product, str]]:
+    """
+    Ürünü bulunamayan barkodlar için tek aday ürün önerir. Döner:
+    [(dış barkod, ürün, gerekçe)]. Ürünler bir kez yüklenir; her barkod için
+    sözlük aramaları yapılır. Birden fazla aday çıkan barkod önerilmez.
+
+    Sırasıyla: ürünün alış barkoduyla birebir eşleşme, biçim farkı (boşluk,
+    tire, büyük/küçük harf, baştaki sıfırlar), ürün barkodu + kısa varyant eki.
+    """
+    products = list(Product.objects.only("id", "name", "barcode", "purchase_barcode"))
+    by_purchase: Dict[str, List[Product]] = {}
+    by_normalized: Dict[str, List[Product]] = {}
+    for product in products:
+        if product.purchase_barcode:
+            by_purchase.setdefault(product.purchase_barcode, []).append(product)
+        by_normalized.setdefault(_normalize(product.barcode), []).append(product)
+
+    proposals: List[Tuple[str, Product, str]] = []
+    for barcode in sorted({b for b in barcodes if b}):
+        candidates = by_purchase.get(barcode)
+        reason = "alış barkodu"
+        normalized = _normalize(barcode)
+        if not candidates:
+            candidates = by_normalized.get(normalized)
+            reason = "biçim farkı"
+        if not candidates:
+            reason = "varyant eki"
+            for cut in range(1, MAX_VARIANT_SUFFIX + 1):
+                if len(normalized) - cut < 4:
+                    break
+                candidates = by_normalized.get(normalized[:-cut])
+                if candidates:
+                    break
+        if candidates and len(candidates) == 1:
+            proposals.append((barcode, candidates[0], reason))
+    return proposals
@@ -0,0 +1,308 @@
+"""
+Settlement aggregation için pandas tabanlı sütunsal motor (isteğe bağlı).
+
+SettlementAccumulator ile aynı arayüzü (add / extend / records / duplicates /
+barcodes / finalize) sunar; kayıtlar sayfa sayfa DataFrame'e alınır, aylık
+kovalar ve sipariş toplamları vektörel group-by ile hesaplanır. Tutarlar int64
+kuruş sütunlarında toplanır (money modülü); sonuç Python motoruyla birebir aynı
+(monthly_list, missing_barcodes, order_list) üçlüsüdür.
+
+settings.TRENDYOL_AGGREGATION_ENGINE = "pandas" ile açılır; pandas kurulu
+değilse make_settlement_accumulator() Python motoruna düşer.
+
+Hız kazancı katlama (add/extend) aşamasındandır: 100k satırlık benchmark'ta
+kayıtları DataFrame'e almak Python motorunun satır satır katlamasından ~2 kat
+hızlıdır. finalize() ise Python motoruyla aşağı yukarı aynı sürededir (~1 sn);
+group-by'lar ucuzdur, süreyi sonuç sözlüklerini (sipariş, kalem, barkod
+satırları) Python nesnesi olarak kurmak alır ve bu iki motorda da aynıdır.
+Sütunsal motor ayrıca tüm satırları bellekte tutar ve tekrarları finalize'da
+küresel olarak ayıklar.
+"""
+import logging
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+
+from .money import KURUS_PER_LIRA, to_kurus
+from .trendyol_integration import (
+    BARCODE_ROLLUP_FIELDS,
+    RETURN_TYPES,
+    TRANSACTION_FEE,
+    TURKISH_MONTHS,
+    SettlementAccumulator,
+    _settlement_id,
+)
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # pragma: no cover - pandas requirements.txt'te, ama motor isteğe bağlı
+    np = None
+    pd = None
+
+logger = logging.getLogger(__name__)
+
+
+def pandas_available() -> bool:
+    return pd is not None
+
+
+class ColumnarSettlementAccumulator:
+    """Settlement sayfalarını DataFrame parçaları olarak biriktirir; finalize() vektöreldir."""
+
+    def __init__(self) -> None:
+        if pd is None:
+            raise RuntimeError("Sütunsal motor için pandas gerekli")
+        self._frames: List["pd.DataFrame"] = []
+        self._pending: List[Dict[str, Any]] = []
+        self._frame = None
+        self.duplicates = 0
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self._pending.append(record)
+        if len(self._pending) >= 500:
+            self._flush()
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> "ColumnarSettlementAccumulator":
+        if isinstance(records, list):
+            self._flush()
+            if records:
+                self._frames.append(self._to_frame(records))
+                self._frame = None
+        else:
+            for record in records:
+                self.add(record)
+        return self
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._frames.append(self._to_frame(self._pending))
+            self._pending = []
+            self._frame = None
+
+    @staticmethod
+    def _to_frame(records: List[Dict[str, Any]]) -> "pd.DataFrame":
+        # Alanlar SettlementAccumulator.add ile aynı kurallarla normalize edilir;
+        # sütunlar object/int64 olarak sabitlenir (int sipariş no'ları float'a dönmesin)
+        return pd.DataFrame({
+            "id": pd.Series([_settlement_id(r) for r in records], dtype=object),
+            "order": pd.Series([str(r.get("orderNumber") or "") for r in records], dtype=object),
+            "barcode": pd.Series([r.get("barcode") or "" for r in records], dtype=object),
+            "revenue": pd.Series([to_kurus(r.get("sellerRevenue")) for r in records], dtype="int64"),
+            "type": pd.Series([r.get("transactionType") or "" for r in records], dtype=object),
+            "ts": pd.Series([r.get("transactionDate") or 0 for r in records], dtype="int64"),
+        })
+
+    def _prepared(self) -> "pd.DataFrame":
+        """Birleştirilmiş, tekrarları atılmış, tarihi geçerli satırlar (tipli sütunlar)."""
+        self._flush()
+        if self._frame is not None:
+            return self._frame
+        if not self._frames:
+            frame = self._to_frame([])
+        else:
+            frame = pd.concat(self._frames, ignore_index=True) if len(self._frames) > 1 else self._frames[0]
+            self._frames = [frame]
+
+        # Aynı id ikinci kez gelirse (periyot sınırı) ilk kayıt kalır; id'siz kayıtlar hep kalır
+        ids = frame["id"]
+        duplicated = ids.notna() & ids.duplicated()
+        self.duplicates = int(duplicated.sum())
+        frame = frame[~duplicated & (frame["ts"] != 0)]
+
+        dt = pd.to_datetime(frame["ts"], unit="ms", utc=True)
+        prepared = frame.drop(columns="id").assign(
+            month=(dt.dt.year * 100 + dt.dt.month).astype("int64"),
+            sign=np.where(frame["type"].isin(RETURN_TYPES), -1, 1),
+        )
+        self._frame = prepared.reset_index(drop=True)
+        return self._frame
+
+    @property
+    def records(self) -> int:
+        return len(self._prepared())
+
+    @property
+    def barcodes(self) -> set:
+        barcodes = self._prepared()["barcode"]
+        return set(barcodes[barcodes != ""].unique())
+
+    def finalize(self, cargo_by_order: Dict[str, int], price_map: Dict[str, int]) -> tuple:
+        """
+        Döner: (monthly_list, missing_barcodes, order_list) — SettlementAccumulator.finalize ile aynı.
+        """
+        df = self._prepared()
+        if df.empty:
+            return [], [], []
+
+        price = df["barcode"].map(price_map)
+        missing_barcodes = sorted(set(df.loc[price.isna() & (df["barcode"] != ""), "barcode"].unique()))
+        price = price.fillna(0).astype("int64")
+        history = getattr(price_map, "history", {})
+        if history:
+            # Fiyatı değişmiş barkodlar: işlem zamanına göre searchsorted (bisect'in vektörel karşılığı)
+            dated = df.loc[df["barcode"].isin(history.keys()), ["barcode", "ts"]]
+            for barcode, group in dated.groupby("barcode", sort=False):
+                times, prices = history[barcode]
+                position = np.searchsorted(times, group["ts"].to_numpy(), side="right") - 1
+                price.loc[group.index] = np.asarray(prices, dtype="int64")[np.maximum(position, 0)]
+        df = df.assign(price=price, line_cost=price * df["sign"])
+
+        # ── Aylık kovalar
+        month_codes, months = pd.factorize(df["month"], sort=True)
+        revenue = _kurus_sum(month_codes, df["revenue"], len(months))
+        purchase = _kurus_sum(month_codes, df["line_cost"], len(months))
+
+        with_order = df[df["order"] != ""]
+        order_codes, order_numbers = pd.factorize(with_order["order"], sort=False)
+        # Kargo + işlem ücreti siparişin ilk göründüğü aya yazılır
+        first_rows = np.unique(order_codes, return_index=True)[1] if len(order_codes) else np.array([], dtype="int64")
+        first_month = month_codes[with_order.index.to_numpy()[first_rows]]
+        shipping = pd.Series(order_numbers, dtype=object).map(cargo_by_order).fillna(0).to_numpy(dtype="int64")
+        order_count = np.bincount(first_month, minlength=len(months))
+        cargo = _kurus_sum(first_month, shipping, len(months))
+
+        barcode_rows = _barcode_rows(df, with_order, order_codes, months.to_numpy()[first_month], shipping, price_map)
+
+        monthly_list = []
+        for i, month in enumerate(months.tolist()):
+            year, month_num = divmod(month, 100)
+            count = int(order_count[i])
+            seller_revenue, cargo_cost, purchase_cost = int(revenue[i]), int(cargo[i]), int(purchase[i])
+            transaction_fee = TRANSACTION_FEE * count
+            monthly_list.append({
+                "month_key": f"{year:04d}-{month_num:02d}",
+                "month_label": f"{TURKISH_MONTHS[month_num]} {year}",
+                "seller_revenue": seller_revenue / KURUS_PER_LIRA,
+                "cargo_cost": cargo_cost / KURUS_PER_LIRA,
+                "purchase_cost": purchase_cost / KURUS_PER_LIRA,
+                "transaction_fee": transaction_fee / KURUS_PER_LIRA,
+                "order_count": count,
+                "net_profit": (seller_revenue - cargo_cost - purchase_cost - transaction_fee) / KURUS_PER_LIRA,
+                "barcodes": barcode_rows.get(month, []),
+            })
+
+        # ── Sipariş pivotu (kuruş → ₺ bölmesi vektörel; int/100 ile aynı float)
+        item_count = np.bincount(order_codes, minlength=len(order_numbers))
+        order_revenue = _kurus_sum(order_codes, with_order["revenue"], len(order_numbers))
+        order_purchase = _kurus_sum(order_codes, with_order["line_cost"], len(order_numbers))
+        net_profit = (order_revenue - order_purchase - shipping - TRANSACTION_FEE) / KURUS_PER_LIRA
+
+        # Kalemler sipariş sırasına dizilir (stabil: sipariş içinde girdi sırası korunur)
+        position = np.argsort(order_codes, kind="stable")
+        items = [
+            {"barcode": barcode, "sellerRevenue": seller_revenue, "purchasePrice": purchase_price,
+             "transactionType": transaction_type}
+            for barcode, seller_revenue, purchase_price, transaction_type in zip(
+                with_order["barcode"].to_numpy()[position].tolist(),
+                (with_order["revenue"].to_numpy()[position] / KURUS_PER_LIRA).tolist(),
+                (with_order["price"].to_numpy()[position] / KURUS_PER_LIRA).tolist(),
+                with_order["type"].to_numpy()[position].tolist(),
+            )
+        ]
+        offsets = np.concatenate(([0], np.cumsum(item_count))).tolist()
+
+        first_ts = with_order["ts"].to_numpy()[first_rows]
+        dates = pd.to_datetime(first_ts, unit="ms", utc=True).to_pydatetime().tolist()
+        columns = zip(
+            order_numbers.tolist(), dates, item_count.tolist(),
+            (order_revenue / KURUS_PER_LIRA).tolist(), (order_purchase / KURUS_PER_LIRA).tolist(),
+            (shipping / KURUS_PER_LIRA).tolist(), (shipping > 0).tolist(), net_profit.tolist(),
+        )
+        orders = [
+            {
+                "orderNumber": order_number,
+                "transactionDate": transaction_date,
+                "items": items[offsets[i]:offsets[i + 1]],
+                "totalSellerRevenue": total_revenue,
+                "totalPurchasePrice": total_purchase,
+                "totalShippingFee": total_shipping,
+                "cargoFound": cargo_found,
+                "itemCount": count,
+                "totalNetProfit": net,
+            }
+            for i, (order_number, transaction_date, count, total_revenue, total_purchase,
+                    total_shipping, cargo_found, net) in enumerate(columns)
+        ]
+        # En yeni sipariş üstte; eşit tarihlerde ilk görülme sırası (sorted(reverse=True) ile aynı)
+        order_list = [orders[i] for i in np.argsort(-first_ts, kind="stable").tolist()]
+        return monthly_list, missing_barcodes, order_list
+
+
+def _barcode_rows(df, with_order, order_codes, order_months, shipping, price_map) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    SettlementAccumulator.finalize'daki (ay, barkod) kovalarının vektörel karşılığı:
+    gelir/adet/alış kalemin ayına, kargo ve işlem ücreti siparişin ayına (satış kalemlerine,
+    satış yoksa tüm kalemlere eşit; artan kuruş ilk kalemlere) yazılır. Döner: {ay: satırlar}
+    """
+    barcoded = df[df["barcode"] != ""]
+    parts = [
+        barcoded.assign(
+            units_sold=(barcoded["sign"] > 0).astype("int64"),
+            units_returned=(barcoded["sign"] < 0).astype("int64"),
+            seller_revenue=barcoded["revenue"],
+            purchase_cost=barcoded["line_cost"],
+        ).groupby(["month", "barcode"], sort=False)[
+            ["units_sold", "units_returned", "seller_revenue", "purchase_cost"]
+        ].sum()
+    ]
+
+    lines = with_order.assign(code=order_codes, order_month=order_months[order_codes] if len(order_codes) else [])
+    lines = lines[lines["barcode"] != ""]
+    if not lines.empty:
+        pairs = lines.drop_duplicates(["code", "barcode"])
+        parts.append(pairs.groupby(["order_month", "barcode"], sort=False).size().to_frame("order_count"))
+
+        is_sale = lines["sign"] > 0
+        sales = lines[is_sale | ~is_sale.groupby(lines["code"]).transform("any")]
+        count = sales.groupby("code")["code"].transform("size").to_numpy()
+        rank = sales.groupby("code").cumcount().to_numpy()
+        cargo = shipping[sales["code"].to_numpy()]
+        parts.append(sales.assign(
+            cargo_cost=cargo // count + (rank < cargo % count),
+            transaction_fee=TRANSACTION_FEE // count + (rank < TRANSACTION_FEE % count),
+        ).groupby(["order_month", "barcode"], sort=False)[["cargo_cost", "transaction_fee"]].sum())
+
+    for part in parts:
+        part.index.names = ["month", "barcode"]
+    totals = pd.concat(parts).groupby(level=["month", "barcode"], sort=True).sum()
+    totals = totals.reindex(columns=list(BARCODE_ROLLUP_FIELDS), fill_value=0).fillna(0).astype("int64")
+
+    # Satır sözlükleri _barcode_row ile aynı alanlarla, sütunlardan tek geçişte kurulur
+    # (to_dict("records") + satır başına çağrı finalize süresinin yarısını alıyordu)
+    columns = {field: totals[field].to_numpy() for field in BARCODE_ROLLUP_FIELDS}
+    net = columns["seller_revenue"] - columns["purchase_cost"] - columns["cargo_cost"] - columns["transaction_fee"]
+    barcodes = totals.index.get_level_values("barcode").tolist()
+    values = zip(
+        barcodes,
+        columns["units_sold"].tolist(), columns["units_returned"].tolist(), columns["order_count"].tolist(),
+        *((columns[field] / KURUS_PER_LIRA).tolist() for field in _MONEY_FIELDS),
+        (net / KURUS_PER_LIRA).tolist(),
+        [barcode not in price_map for barcode in barcodes],
+    )
+    keys = ("barcode", "units_sold", "units_returned", "order_count", *_MONEY_FIELDS, "net_profit", "cost_missing")
+    flat = [dict(zip(keys, row)) for row in values]
+
+    month_values = totals.index.get_level_values("month").to_numpy()
+    months, starts = np.unique(month_values, return_index=True)
+    bounds = starts.tolist() + [len(flat)]
+    return {month: flat[bounds[i]:bounds[i + 1]] for i, month in enumerate(months.tolist())}
+
+
+_MONEY_FIELDS = ("seller_revenue", "purchase_cost", "cargo_cost", "transaction_fee")
+
+
+def _kurus_sum(codes, values, length: int):
+    """Kod bazında int64 kuruş toplamı (bincount float64 toplar; 2**53 kuruşa kadar tamdır)."""
+    weights = np.asarray(values, dtype="float64")
+    return np.rint(np.bincount(codes, weights=weights, minlength=length)).astype("int64")
+
+
+def make_settlement_accumulator():
+    """settings.TRENDYOL_AGGREGATION_ENGINE'e göre Python veya pandas accumulator'ı."""
+    engine = getattr(settings, "TRENDYOL_AGGREGATION_ENGINE", "python")
+    if engine == "pandas":
+        if pandas_available():
+            return ColumnarSettlementAccumulator()
+        logger.warning("TRENDYOL_AGGREGATION_ENGINE=pandas ama pandas kurulu değil; Python motoru kullanılıyor")
+    return SettlementAccumulator()
@@ -0,0 +1,189 @@
+"""
+Trendyol kâr raporunun CSV / XLSX dışa aktarımı.
+
+Kaynak, sayfanın kendisiyle aynıdır: ay materyalize edilmişse
+MonthlyProfitSummary / OrderProfitSummary tablolarından (sipariş satırları
+.iterator() ile parça parça okunur), değilse tamamlanmış rapor işinin saklanan
+sonucundan. CSV StreamingHttpResponse ile satır satır, XLSX openpyxl'in
+write-only modunda geçici dosyaya yazılıp dosya olarak akıtılır; sipariş sayısı
+arttıkça bellek kullanımı sabit kalır.
+"""
+import csv
+import tempfile
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.utils import timezone
+
+from .models import MonthlyProfitSummary, OrderProfitSummary, ReportJob
+from .report_jobs import deserialize_result
+
+SECTIONS: Dict[str, Dict[str, Any]] = {
+    "monthly": {
+        "title": "Aylık Özet",
+        "header": ("Ay", "Ay Anahtarı", "Hakediş Geliri", "Kargo Gideri", "İşlem Ücreti",
+                   "Ürün Maliyeti", "Net Kâr", "Sipariş Sayısı"),
+    },
+    "orders": {
+        "title": "Siparişler",
+        "header": ("Sipariş No", "Tarih", "Kalem", "Barkodlar", "Hakediş Geliri", "Ürün Maliyeti",
+                   "Kargo Ücreti", "Net Kâr", "Kargo Faturası"),
+    },
+    "missing": {
+        "title": "Maliyeti Eksik Barkodlar",
+        "header": ("Barkod",),
+    },
+}
+
+ORDER_CHUNK_SIZE = 2000
+
+
+def _local(value):
+    return timezone.localtime(value) if timezone.is_aware(value) else value
+
+
+class ExportSource:
+    """Bir rapor görünümünün (materyalize ay veya rapor işi sonucu) satır kaynağı."""
+
+    def __init__(self, name: str, month_key: Optional[str] = None, job: Optional[ReportJob] = None) -> None:
+        self.name = name
+        self.month_key = month_key
+        self.job = job
+        self._result = None
+
+    @classmethod
+    def for_month(cls, month_key: str) -> Optional["ExportSource"]:
+        if not MonthlyProfitSummary.objects.filter(month_key=month_key).exists():
+            return None
+        return cls(month_key, month_key=month_key)
+
+    @classmethod
+    def for_job(cls, job: ReportJob) -> Optional["ExportSource"]:
+        if job.status != ReportJob.STATUS_DONE:
+            return None
+        month_key = job.start_date.strftime("%Y-%m")
+        # İş ayı materyalize ettiyse sayfa gibi tablodan okunur
+        if MonthlyProfitSummary.objects.filter(month_key=month_key, refreshed_at__gte=job.started_at).exists():
+            return cls(month_key, month_key=month_key)
+        return cls(f"{month_key}-is{job.pk}", job=job)
+
+    def _job_result(self) -> tuple:
+        if self._result is None:
+            self._result = deserialize_result(self.job.result)
+        return self._result
+
+    def rows(self, section: str) -> Iterator[Sequence[Any]]:
+        return getattr(self, f"_{section}_rows")()
+
+    def _monthly_rows(self) -> Iterator[Sequence[Any]]:
+        if self.month_key is not None:
+            months = (
+                MonthlyProfitSummary.objects.filter(month_key=self.month_key)
+                .values("month_label", "month_key", "seller_revenue", "cargo_cost", "transaction_fee",
+                        "purchase_cost", "net_profit", "order_count")
+            )
+        else:
+            months = self._job_result()[0]
+        for m in months:
+            yield (m["month_label"], m["month_key"], m["seller_revenue"], m["cargo_cost"], m["transaction_fee"],
+                   m["purchase_cost"], m["net_profit"], m["order_count"])
+
+    def _orders_rows(self) -> Iterator[Sequence[Any]]:
+        if self.month_key is not None:
+            orders: Iterable[Dict[str, Any]] = (
+                {
+                    "orderNumber": row.order_number,
+                    "transactionDate": row.transaction_date,
+                    "itemCount": row.item_count,
+                    "items": row.items,
+                    "totalSellerRevenue": row.total_seller_revenue,
+                    "totalPurchasePrice": row.total_purchase_price,
+                    "totalShippingFee": row.total_shipping_fee,
+                    "totalNetProfit": row.total_net_profit,
+                    "cargoFound": row.cargo_found,
+                }
+                for row in OrderProfitSummary.objects.filter(month_key=self.month_key)
+                .order_by("-transaction_date")
+                .iterator(chunk_size=ORDER_CHUNK_SIZE)
+            )
+        else:
+            orders = self._job_result()[2]
+        for order in orders:
+            tx_dt = order.get("transactionDate")
+            barcodes = ", ".join(dict.fromkeys(i["barcode"] for i in order.get("items") or [] if i.get("barcode")))
+            yield (
+                order["orderNumber"],
+                _local(tx_dt).strftime("%Y-%m-%d %H:%M") if tx_dt else "",
+                order.get("itemCount", 0),
+                barcodes,
+                order.get("totalSellerRevenue"),
+                order.get("totalPurchasePrice"),
+                order.get("totalShippingFee"),
+                order.get("totalNetProfit"),
+                "Var" if order.get("cargoFound") else "Yok",
+            )
+
+    def _missing_rows(self) -> Iterator[Sequence[Any]]:
+        if self.month_key is not None:
+            summary = MonthlyProfitSummary.objects.filter(month_key=self.month_key).only("missing_barcodes").first()
+            barcodes: List[str] = summary.missing_barcodes if summary else []
+        else:
+            barcodes = self._job_result()[1]
+        for barcode in barcodes:
+            yield (barcode,)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CSV
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Echo:
+    """csv.writer'ın yazdığı satırı olduğu gibi döndürür (dosya yerine)."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (float, Decimal)):
+        return f"{value:.2f}"
+    return value
+
+
+def iter_csv(source: ExportSource, section: str) -> Iterator[str]:
+    """Bölümü CSV satırları olarak üretir (Excel Türkçe karakterleri doğru açsın diye BOM ile)."""
+    writer = csv.writer(_Echo())
+    yield "\ufeff" + writer.writerow(SECTIONS[section]["header"])
+    for row in source.rows(section):
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# XLSX
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _xlsx_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def write_xlsx(source: ExportSource, sections: Sequence[str]):
+    """
+    Bölümleri write-only çalışma kitabına (her bölüm bir sayfa) yazar ve
+    başa sarılmış geçici dosyayı döner. Satırlar openpyxl tarafından diske
+    akıtıldığından bellekte tutulmaz.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for section in sections:
+        sheet = workbook.create_sheet(title=SECTIONS[section]["title"][:31])
+        sheet.append(SECTIONS[section]["header"])
+        for row in source.rows(section):
+            sheet.append([_xlsx_value(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
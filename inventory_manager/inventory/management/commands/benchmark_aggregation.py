@@ -0,0 +1,103 @@
+"""
+Settlement aggregation motorlarını (Python / pandas) karşılaştırır.
+
+Kullanım:
+    python manage.py benchmark_aggregation                       # 200k sentetik satır
+    python manage.py benchmark_aggregation --rows 1000000 --orders 300000
+    python manage.py benchmark_aggregation --json settlements.json   # gerçek export (kayıt listesi)
+
+Her iki motor aynı girdiyi sayfa sayfa (500'lük) katlar; sonuçlar birebir aynı
+değilse komut hata verir. DB'ye ve Trendyol API'ye gidilmez.
+"""
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.columnar import ColumnarSettlementAccumulator, pandas_available
+from inventory.trendyol_integration import SettlementAccumulator
+
+PAGE_SIZE = 500
+
+
+def _synthetic_settlements(rows: int, orders: int, months: int, seed: int) -> list:
+    rng = random.Random(seed)
+    start_ms = 1735689600000  # 2025-01-01 UTC
+    span_ms = months * 30 * 86_400_000
+    timestamps = sorted(start_ms + rng.randrange(span_ms) for _ in range(rows))
+    records = []
+    for n, transaction_date in enumerate(timestamps):
+        is_return = rng.random() < 0.12
+        records.append({
+            "id": n,
+            "orderNumber": str(10_000_000 + rng.randrange(orders)),
+            "barcode": f"BC{rng.randrange(2000)}",
+            "sellerRevenue": round(rng.uniform(-250, -20) if is_return else rng.uniform(20, 600), 2),
+            "transactionType": "Return" if is_return else "Sale",
+            "transactionDate": transaction_date,
+        })
+    # API akışı gibi tarih sırasında; periyot sınırı çakışması: her 100 sayfada bir,
+    # son sayfa hemen ardından ikinci kez gelir (sayfaların %1'i)
+    stream = []
+    for page_start in range(0, rows, PAGE_SIZE * 100):
+        block = records[page_start:page_start + PAGE_SIZE * 100]
+        stream.extend(block)
+        stream.extend(block[-PAGE_SIZE:])
+    return stream
+
+
+class Command(BaseCommand):
+    help = "Python ve pandas settlement aggregation motorlarını karşılaştırır"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000, help="Sentetik settlement satırı")
+        parser.add_argument("--orders", type=int, default=60_000, help="Sentetik sipariş sayısı")
+        parser.add_argument("--months", type=int, default=12, help="Sentetik verinin yayıldığı ay sayısı")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--json", dest="json_path", help="Settlement kayıt listesi içeren JSON dosyası")
+
+    def handle(self, *args, **options):
+        if not pandas_available():
+            raise CommandError("pandas kurulu değil")
+
+        if options["json_path"]:
+            with open(options["json_path"], encoding="utf-8") as f:
+                records = json.load(f)
+            if isinstance(records, dict):
+                records = records.get("content", [])
+        else:
+            records = _synthetic_settlements(options["rows"], options["orders"], options["months"], options["seed"])
+
+        rng = random.Random(options["seed"])
+        barcodes = {r.get("barcode") for r in records if r.get("barcode")}
+        order_numbers = {str(r.get("orderNumber")) for r in records if r.get("orderNumber")}
+        # Barkodların ~%95'inin maliyeti var, siparişlerin ~%85'inin kargo faturası (kuruş)
+        price_map = {b: rng.randint(1000, 20000) for b in sorted(barcodes) if rng.random() < 0.95}
+        cargo_by_order = {o: rng.randint(2000, 9000) for o in sorted(order_numbers) if rng.random() < 0.85}
+        pages = [records[i:i + PAGE_SIZE] for i in range(0, len(records), PAGE_SIZE)]
+        self.stdout.write(f"{len(records)} satır, {len(pages)} sayfa, {len(order_numbers)} sipariş")
+
+        results = {}
+        timings = {}
+        for name, factory in (("python", SettlementAccumulator), ("pandas", ColumnarSettlementAccumulator)):
+            started = time.perf_counter()
+            accumulator = factory()
+            for page in pages:
+                accumulator.extend(page)
+            folded = time.perf_counter()
+            results[name] = accumulator.finalize(cargo_by_order, price_map)
+            finished = time.perf_counter()
+            timings[name] = finished - started
+            self.stdout.write(
+                f"  {name:<7} katlama {folded - started:7.2f}s  finalize {finished - folded:7.2f}s  "
+                f"toplam {timings[name]:7.2f}s  ({accumulator.duplicates} tekrar atlandı)"
+            )
+
+        if results["python"] != results["pandas"]:
+            raise CommandError("Motor sonuçları farklı!")
+        monthly = results["python"][0]
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Sonuçlar aynı ({len(monthly)} ay, {len(results['python'][2])} sipariş) — "
+            f"pandas hızlanma: {timings['python'] / timings['pandas']:.2f}x"
+        ))
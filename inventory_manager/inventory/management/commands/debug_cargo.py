@@ -13,11 +13,11 @@ import os
 
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from requests.auth import HTTPBasicAuth
-import requests
 
+from inventory.trendyol_client import FINANCE_BASE_URL, get_client
 
-BASE_URL = "https://apigw.trendyol.com/integration/finance/che/sellers"
+
+BASE_URL = FINANCE_BASE_URL
 
 
 def _ts(dt: datetime.datetime) -> int:
@@ -81,12 +81,7 @@ class Command(BaseCommand):
         periods = _split_periods(cargo_start, cargo_end)
         self.stdout.write(f"Toplam {len(periods)} periyot\n")
 
-        auth = HTTPBasicAuth(api_key, api_secret)
-        headers = {
-            "User-Agent": f"{seller_id}-SelfIntegration",
-            "storeFrontCode": "TRENDYOLTR",
-            "Content-Type": "application/json",
-        }
+        client = get_client(seller_id=seller_id, api_key=api_key, api_secret=api_secret)
 
         # ADIM 1: Settlements'ta sipariş var mı?
         self.stdout.write(f"{'─'*50}")
@@ -108,9 +103,7 @@ class Command(BaseCommand):
                     "size": 500,
                 }
                 try:
-                    r = requests.get(url, params=params, headers=headers, auth=auth, timeout=30)
-                    r.raise_for_status()
-                    data = r.json()
+                    data = client.get_json(url, params)
                 except Exception as e:
                     self.stderr.write(f"  {title} çekme hatası: {e}")
                     break
@@ -155,9 +148,7 @@ class Command(BaseCommand):
                     "size": 500,
                 }
                 try:
-                    r = requests.get(url, params=params, headers=headers, auth=auth, timeout=30)
-                    r.raise_for_status()
-                    data = r.json()
+                    data = client.get_json(url, params)
                 except Exception as e:
                     self.stderr.write(f"  Hata ({period_start.date()}): {e}")
                     break
@@ -210,9 +201,7 @@ class Command(BaseCommand):
             while True:
                 params = {"page": page, "size": 500}
                 try:
-                    r = requests.get(url, params=params, headers=headers, auth=auth, timeout=30)
-                    r.raise_for_status()
-                    data = r.json()
+                    data = client.get_json(url, params)
                 except Exception as e:
                     self.stderr.write(f"  Fatura {serial_id} hata: {e}")
                     self.stderr.write(f"  URL: {url}")
@@ -0,0 +1,74 @@
+"""
+Ürünü bulunamayan pazaryeri barkodları için ProductBarcodeAlias önerir.
+
+Eksik barkodlar materyalize aylık özetlerin missing_barcodes listelerinden,
+"bulunamadı" hatasıyla düşmüş webhook loglarından ve yerel settlement
+deposundan toplanır; Product.barcode'u ya da eşlemesi olanlar atlanır.
+
+Kullanım:
+    python manage.py propose_barcode_aliases            # yalnızca önerileri listeler
+    python manage.py propose_barcode_aliases --apply    # önerileri eşleme olarak kaydeder
+"""
+from django.core.management.base import BaseCommand
+
+from inventory.barcode_aliases import invalidate_alias_index, propose_aliases
+from inventory.models import (
+    MonthlyProfitSummary, Product, ProductBarcodeAlias, TrendyolSettlement, TrendyolWebhookLog,
+)
+
+
+def missing_barcodes() -> set:
+    barcodes = set()
+    for month_barcodes in MonthlyProfitSummary.objects.values_list("missing_barcodes", flat=True):
+        barcodes.update(month_barcodes or [])
+    barcodes.update(
+        TrendyolWebhookLog.objects.filter(success=False, error_message__contains="bulunamadı")
+        .values_list("barcode", flat=True).distinct()
+    )
+    barcodes.update(TrendyolSettlement.objects.exclude(barcode="").values_list("barcode", flat=True).distinct())
+    barcodes.discard("")
+    barcodes.discard(None)
+    known = set(Product.objects.filter(barcode__in=barcodes).values_list("barcode", flat=True))
+    known.update(ProductBarcodeAlias.objects.filter(barcode__in=barcodes).values_list("barcode", flat=True))
+    return barcodes - known
+
+
+class Command(BaseCommand):
+    help = "Ürünü bulunamayan Trendyol barkodları için barkod eşlemesi önerir"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--apply", action="store_true",
+                            help="Önerileri ProductBarcodeAlias olarak kaydet")
+
+    def handle(self, *args, **options):
+        barcodes = missing_barcodes()
+        if not barcodes:
+            self.stdout.write(self.style.SUCCESS("✅ Ürünü bulunamayan barkod yok"))
+            return
+
+        proposals = propose_aliases(barcodes)
+        self.stdout.write(f"{len(barcodes)} eksik barkod, {len(proposals)} öneri:")
+        for barcode, product, reason in proposals:
+            self.stdout.write(f"  {barcode:<24} → {product.barcode:<20} {product.name}  ({reason})")
+
+        unmatched = len(barcodes) - len(proposals)
+        if unmatched:
+            self.stdout.write(self.style.WARNING(f"⚠️ {unmatched} barkod için aday bulunamadı"))
+
+        if options["apply"] and proposals:
+            # ignore_conflicts ile bulk_create çakışan satırları da döndürür; gerçekten
+            # eklenenler önce/sonra sayımıyla bulunur (arada başka çalıştırma eşlemiş olabilir)
+            proposed = ProductBarcodeAlias.objects.filter(barcode__in=[barcode for barcode, _, _ in proposals])
+            existing = proposed.count()
+            ProductBarcodeAlias.objects.bulk_create(
+                [
+                    ProductBarcodeAlias(product=product, barcode=barcode, note=f"Önerildi: {reason}")
+                    for barcode, product, reason in proposals
+                ],
+                ignore_conflicts=True,
+            )
+            invalidate_alias_index()
+            created = proposed.count() - existing
+            self.stdout.write(self.style.SUCCESS(f"✅ {created} barkod eşlemesi kaydedildi"))
+            if created < len(proposals):
+                self.stdout.write(self.style.WARNING(f"⚠️ {len(proposals) - created} barkod zaten eşlenmişti"))
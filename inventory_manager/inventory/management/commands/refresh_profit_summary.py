@@ -0,0 +1,69 @@
+"""
+Materyalize aylık kâr özetini (MonthlyProfitSummary / OrderProfitSummary) yeniler.
+
+Kullanım:
+    python manage.py refresh_profit_summary                 # bu ay + geçen ay
+    python manage.py refresh_profit_summary --months 3
+    python manage.py refresh_profit_summary --month 2025-01 --month 2025-02
+    python manage.py refresh_profit_summary -v 2           # aşama süreleri tablosu
+
+Cron ile her gece çalıştırılır; /trendyol-profit/ sayfası bu tablolardan okur.
+"""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.profit_summary import parse_month_key, refresh_month
+from inventory.tracing import start_trace
+
+
+class Command(BaseCommand):
+    help = "Aylık Trendyol kâr özeti tablolarını yeniler"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months", type=int, default=2,
+            help="İçinde bulunulan aydan geriye kaç ay yenilensin (varsayılan: 2)",
+        )
+        parser.add_argument(
+            "--month", action="append", dest="month_keys",
+            help="Yenilenecek ay YYYY-MM (birden fazla verilebilir; --months'u geçersiz kılar)",
+        )
+        parser.add_argument(
+            "--source", default="auto", choices=["auto", "api", "local"],
+            help="Settlement kaynağı",
+        )
+
+    def handle(self, *args, **options):
+        if options.get("month_keys"):
+            try:
+                months = [parse_month_key(key) for key in options["month_keys"]]
+            except ValueError:
+                raise CommandError("Ay formatı YYYY-MM olmalı")
+        else:
+            today = datetime.date.today()
+            year, month = today.year, today.month
+            months = []
+            for _ in range(max(1, options["months"])):
+                months.append((year, month))
+                year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+
+        failed = []
+        for year, month in months:
+            with start_trace(f"refresh {year:04d}-{month:02d}") as trace:
+                try:
+                    refresh_month(year, month, source=options["source"])
+                except Exception as e:
+                    error = e
+                else:
+                    error = None
+            if options["verbosity"] >= 2:
+                self.stdout.write(trace.format_table())
+            if error is not None:
+                failed.append(f"{year:04d}-{month:02d}")
+                self.stderr.write(self.style.ERROR(f"❌ {year:04d}-{month:02d}: {error}"))
+                continue
+            self.stdout.write(self.style.SUCCESS(f"✅ {year:04d}-{month:02d} yenilendi"))
+
+        if failed:
+            raise CommandError(f"Yenilenemeyen aylar: {', '.join(failed)}")
@@ -0,0 +1,43 @@
+"""
+Sıradaki /trendyol-profit/ rapor işlerini (ReportJob) çalıştıran worker.
+
+Kullanım:
+    python manage.py run_report_jobs            # sürekli çalışır, yeni işleri bekler
+    python manage.py run_report_jobs --once     # sıradakileri bitirip çıkar (cron için)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.report_jobs import fail_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Sıradaki Trendyol kâr raporu işlerini çalıştırır"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Sıradaki işleri çalıştır ve çık",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=2.0,
+            help="Sıra boşken yoklama aralığı (saniye)",
+        )
+        parser.add_argument(
+            "--stale-minutes", type=int, default=60, dest="stale_minutes",
+            help="Bu süreden uzun 'running' kalan işler hata olarak kapatılır",
+        )
+
+    def handle(self, *args, **options):
+        stale = fail_stale_jobs(options["stale_minutes"])
+        if stale:
+            self.stdout.write(self.style.WARNING(f"⚠️ {stale} takılı iş hata olarak kapatıldı"))
+
+        while True:
+            count = run_pending_jobs()
+            if count:
+                self.stdout.write(self.style.SUCCESS(f"✅ {count} rapor işi çalıştırıldı"))
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
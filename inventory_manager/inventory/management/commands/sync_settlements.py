@@ -0,0 +1,63 @@
+"""
+Trendyol Sale/Return settlement'larını yerel TrendyolSettlement tablosuna senkronlar.
+
+Kullanım:
+    python manage.py sync_settlements
+    python manage.py sync_settlements --since 2025-01-01 --recheck-days 7
+
+Her transaction type için yerelde tam olan tarih aralığı tutulur; sadece son
+senkrondan (eksi --recheck-days) sonrası çekilir. --since mevcut aralığın
+başlangıcından önceyse depo o tarihe kadar geriye doldurulur. Cron ile her
+gece çalıştırılabilir.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.trendyol_integration import SETTLEMENT_TYPES, sync_settlements
+
+
+class Command(BaseCommand):
+    help = "Trendyol settlement'larını yerel depoya artımlı olarak senkronlar"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--types", nargs="+", default=SETTLEMENT_TYPES,
+            help="Senkronlanacak transaction type'lar (varsayılan: Sale Return)",
+        )
+        parser.add_argument(
+            "--since",
+            help="Deponun başlangıç tarihi YYYY-MM-DD (ilk senkron ya da geriye doldurma için)",
+        )
+        parser.add_argument(
+            "--recheck-days", type=int, dest="recheck_days",
+            help="Son senkrondan geriye doğru tekrar kontrol edilecek gün sayısı",
+        )
+
+    def handle(self, *args, **options):
+        seller_id = settings.TRENDYOL_SUPPLIER_ID
+        if not seller_id:
+            raise CommandError("TRENDYOL_SUPPLIER_ID boş! .env dosyasını kontrol et.")
+
+        initial_start = None
+        if options.get("since"):
+            initial_start = datetime.datetime.strptime(options["since"], "%Y-%m-%d").replace(
+                tzinfo=datetime.timezone.utc
+            )
+
+        try:
+            counts = sync_settlements(
+                seller_id=seller_id,
+                api_key=settings.TRENDYOL_API_KEY,
+                api_secret=settings.TRENDYOL_API_SECRET,
+                transaction_types=options["types"],
+                initial_start=initial_start,
+                recheck_days=options.get("recheck_days"),
+                user_agent=f"{seller_id}-OzlemFiratTasdelen",
+            )
+        except Exception as e:
+            raise CommandError(f"Senkronizasyon başarısız, durum ilerletilmedi: {e}")
+
+        for transaction_type, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f"✅ {transaction_type}: {count} kayıt senkronlandı"))
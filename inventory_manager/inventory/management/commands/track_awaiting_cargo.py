@@ -0,0 +1,64 @@
+"""
+Kargo faturası bekleyen siparişler tablosunu (AwaitingCargoInvoice) ilerletir ve
+yasal süreyi aşmış olanları raporlar.
+
+Kullanım:
+    python manage.py track_awaiting_cargo                  # artımlı senkron + rapor
+    python manage.py track_awaiting_cargo --no-sync        # API'ye gitmeden, yalnızca tablodan
+    python manage.py track_awaiting_cargo --min-days 30
+
+Yalnızca son çalıştırmadan sonraki settlement'lar ve taranmamış kargo faturası
+günleri çekilir; cron ile her gün çalıştırılabilir.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.trendyol_integration import advance_awaiting_cargo_invoices, awaiting_cargo_report
+
+
+class Command(BaseCommand):
+    help = "Kargo faturası bekleyen Trendyol siparişlerini artımlı takip eder ve raporlar"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-sync", action="store_true", dest="no_sync",
+            help="Trendyol API'ye gitme; yalnızca yerel depo ve tablo kullanılır",
+        )
+        parser.add_argument("--legal-days", type=int, default=7, dest="legal_days",
+                            help="Fatura kesimi için yasal süre (gün)")
+        parser.add_argument("--min-days", type=int, default=60, dest="min_days",
+                            help="Settlement'tan bu kadar gün geçmemiş siparişler raporlanmaz")
+        parser.add_argument("--lookback-days", type=int, default=90, dest="lookback_days",
+                            help="Bu günden eski siparişler takipten çıkarılır")
+
+    def handle(self, *args, **options):
+        seller_id = settings.TRENDYOL_SUPPLIER_ID
+        if not seller_id and not options["no_sync"]:
+            raise CommandError("TRENDYOL_SUPPLIER_ID boş! .env dosyasını kontrol et.")
+
+        try:
+            counts = advance_awaiting_cargo_invoices(
+                seller_id=seller_id,
+                api_key=settings.TRENDYOL_API_KEY,
+                api_secret=settings.TRENDYOL_API_SECRET,
+                lookback_days=options["lookback_days"],
+                sync=not options["no_sync"],
+                user_agent=f"{seller_id}-OzlemFiratTasdelen",
+            )
+        except Exception as e:
+            raise CommandError(f"Takip tablosu güncellenemedi: {e}")
+        self.stdout.write(
+            f"+{counts['added']} eklendi/güncellendi, -{counts['resolved']} faturası geldi, "
+            f"-{counts['expired']} süresi doldu, {counts['awaiting']} sipariş bekliyor"
+        )
+
+        overdue = awaiting_cargo_report(legal_days=options["legal_days"], min_days=options["min_days"])
+        if not overdue:
+            self.stdout.write(self.style.SUCCESS("✅ Yasal süreyi aşmış kargo faturası eksik sipariş yok"))
+            return
+        self.stdout.write(self.style.WARNING(f"⚠️ {len(overdue)} siparişin kargo faturası eksik:"))
+        for row in overdue:
+            self.stdout.write(
+                f"  {row['order_number']:<16} {row['transaction_date']:%Y-%m-%d}  "
+                f"{row['days_overdue']:>3} gün gecikmiş  {row['barcode']}  {row['seller_revenue']:.2f} ₺"
+            )
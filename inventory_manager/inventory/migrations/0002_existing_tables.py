@@ -0,0 +1,89 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# 0001'den sonra migration'sız eklenmiş tabloları/alanları kayda geçirir. Bu
+# tabloları zaten olan veritabanlarında: python manage.py migrate inventory 0002 --fake
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='low_stock_notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='purchase_barcode',
+            field=models.CharField(blank=True, db_index=True, help_text='Tedarikçinin/alış fişinin barkodu (opsiyonel).', max_length=128, null=True, verbose_name='Alış barkodu'),
+        ),
+        migrations.CreateModel(
+            name='PurchaseItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Ürün Adı')),
+                ('purchase_barcode', models.CharField(db_index=True, max_length=128, verbose_name='Alış Barkodu')),
+                ('purchase_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Alış Fiyatı')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Miktar')),
+                ('image_url', models.CharField(blank=True, max_length=1024, null=True, verbose_name='Görsel URL')),
+                ('is_archived', models.BooleanField(db_index=True, default=False, help_text='Arşivlenmiş ürünler')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Satın Alınan Ürün',
+                'verbose_name_plural': 'Satın Alınan Ürünler',
+                'db_table': 'purchase_items',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ListingComponent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('qty_per_listing', models.DecimalField(decimal_places=2, default=1, max_digits=10, verbose_name='Bu ilanda kaç adet')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('inventory_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='components', to='inventory.product', verbose_name='İlan')),
+                ('purchase_item', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='listing_usages', to='inventory.purchaseitem', verbose_name='SKU (Alış Ürünü)')),
+            ],
+            options={
+                'verbose_name': 'İlan Bileşeni',
+                'verbose_name_plural': 'İlan Bileşenleri',
+                'db_table': 'listing_components',
+                'constraints': [models.CheckConstraint(condition=models.Q(('qty_per_listing__gt', 0)), name='qty_positive_check')],
+                'unique_together': {('inventory_product', 'purchase_item')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendyolWebhookLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_number', models.CharField(db_index=True, max_length=100, verbose_name='Sipariş No')),
+                ('barcode', models.CharField(db_index=True, max_length=100, verbose_name='Barkod')),
+                ('status', models.CharField(max_length=50, verbose_name='Durum')),
+                ('line_item_status', models.CharField(blank=True, db_index=True, max_length=50, null=True, verbose_name='Line Item Durumu')),
+                ('quantity', models.IntegerField(default=1, verbose_name='Adet')),
+                ('success', models.BooleanField(default=False, verbose_name='Başarılı')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='Hata Mesajı')),
+                ('processed', models.BooleanField(db_index=True, default=True, help_text='Stok düşürme işlemi yapıldı mı?', verbose_name='İşlendi')),
+                ('affected_product_id', models.IntegerField(blank=True, null=True, verbose_name='Ürün ID')),
+                ('affected_components', models.JSONField(blank=True, default=list, verbose_name='Etkilenen Bileşenler')),
+                ('raw_payload', models.JSONField(blank=True, default=dict, verbose_name='Ham Veri')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Trendyol Webhook Log',
+                'verbose_name_plural': 'Trendyol Webhook Logları',
+                'db_table': 'trendyol_webhook_logs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['order_number', 'barcode'], name='trendyol_we_order_n_8ec58b_idx'), models.Index(fields=['line_item_status'], name='trendyol_we_line_it_0fff29_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_existing_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargoInvoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial_number', models.CharField(max_length=64, unique=True, verbose_name='Fatura Seri No')),
+                ('transaction_date', models.DateTimeField(db_index=True, verbose_name='İşlem Tarihi')),
+                ('items_fetched', models.BooleanField(db_index=True, default=False, verbose_name='Kalemler Çekildi')),
+                ('item_count', models.PositiveIntegerField(default=0, verbose_name='Kalem Sayısı')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Kargo Faturası',
+                'verbose_name_plural': 'Kargo Faturaları',
+                'db_table': 'cargo_invoices',
+            },
+        ),
+        migrations.CreateModel(
+            name='CargoInvoiceScanDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('scanned_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'cargo_invoice_scan_days',
+            },
+        ),
+        migrations.CreateModel(
+            name='CargoInvoiceItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_number', models.CharField(db_index=True, max_length=100, verbose_name='Sipariş No')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Tutar')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='inventory.cargoinvoice')),
+            ],
+            options={
+                'db_table': 'cargo_invoice_items',
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_cargo_invoice_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendyolSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('synced_until', models.DateTimeField()),
+                ('last_success_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'trendyol_sync_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendyolSettlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('settlement_id', models.CharField(max_length=128, unique=True, verbose_name='Settlement ID')),
+                ('sync_type', models.CharField(db_index=True, max_length=50, verbose_name='Senkron Tipi')),
+                ('transaction_type', models.CharField(max_length=50, verbose_name='İşlem Tipi')),
+                ('transaction_date', models.DateTimeField(db_index=True, verbose_name='İşlem Tarihi')),
+                ('order_number', models.CharField(blank=True, db_index=True, max_length=100, verbose_name='Sipariş No')),
+                ('barcode', models.CharField(blank=True, db_index=True, max_length=100, verbose_name='Barkod')),
+                ('seller_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Satıcı Geliri')),
+                ('commission_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Komisyon')),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Trendyol Settlement',
+                'verbose_name_plural': 'Trendyol Settlements',
+                'db_table': 'trendyol_settlements',
+                'indexes': [models.Index(fields=['sync_type', 'transaction_date'], name='trendyol_se_sync_ty_605bde_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_settlement_warehouse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateTimeField(verbose_name='Başlangıç')),
+                ('end_date', models.DateTimeField(verbose_name='Bitiş')),
+                ('source', models.CharField(default='auto', max_length=10, verbose_name='Settlement Kaynağı')),
+                ('status', models.CharField(choices=[('queued', 'Sırada'), ('running', 'Çalışıyor'), ('done', 'Tamamlandı'), ('failed', 'Hata')], db_index=True, default='queued', max_length=20, verbose_name='Durum')),
+                ('phase', models.CharField(blank=True, max_length=50, verbose_name='Aşama')),
+                ('periods_done', models.PositiveIntegerField(default=0, verbose_name='Biten Periyot')),
+                ('periods_total', models.PositiveIntegerField(default=0, verbose_name='Toplam Periyot')),
+                ('serials_done', models.PositiveIntegerField(default=0, verbose_name='Biten Fatura')),
+                ('serials_total', models.PositiveIntegerField(default=0, verbose_name='Toplam Fatura')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Sonuç')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='Hata Mesajı')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Başlama Tarihi')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Bitiş Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Rapor İşi',
+                'verbose_name_plural': 'Rapor İşleri',
+                'db_table': 'report_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['start_date', 'end_date', 'source', 'status'], name='report_jobs_start_d_3fad7f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_report_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyProfitSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_key', models.CharField(max_length=7, unique=True, verbose_name='Ay')),
+                ('month_label', models.CharField(max_length=30, verbose_name='Ay Adı')),
+                ('seller_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Hakediş Geliri')),
+                ('cargo_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Kargo Gideri')),
+                ('purchase_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ürün Maliyeti')),
+                ('transaction_fee', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='İşlem Ücreti')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='Sipariş Sayısı')),
+                ('net_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Net Kâr')),
+                ('missing_barcodes', models.JSONField(blank=True, default=list, verbose_name='Maliyeti Olmayan Barkodlar')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Son Güncelleme')),
+            ],
+            options={
+                'verbose_name': 'Aylık Kâr Özeti',
+                'verbose_name_plural': 'Aylık Kâr Özetleri',
+                'db_table': 'monthly_profit_summaries',
+                'ordering': ['month_key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderProfitSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_key', models.CharField(db_index=True, max_length=7, verbose_name='Ay')),
+                ('order_number', models.CharField(max_length=100, verbose_name='Sipariş No')),
+                ('transaction_date', models.DateTimeField(blank=True, null=True, verbose_name='İşlem Tarihi')),
+                ('item_count', models.PositiveIntegerField(default=0, verbose_name='Ürün Sayısı')),
+                ('total_seller_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Satıcı Geliri')),
+                ('total_purchase_price', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ürün Maliyeti')),
+                ('total_shipping_fee', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Kargo')),
+                ('total_net_profit', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Net Kâr')),
+                ('cargo_found', models.BooleanField(default=False, verbose_name='Kargo Bulundu')),
+                ('items', models.JSONField(blank=True, default=list, verbose_name='Kalemler')),
+            ],
+            options={
+                'verbose_name': 'Sipariş Kâr Özeti',
+                'verbose_name_plural': 'Sipariş Kâr Özetleri',
+                'db_table': 'order_profit_summaries',
+                'ordering': ['-transaction_date'],
+                'indexes': [models.Index(fields=['month_key', 'transaction_date'], name='order_profi_month_k_260277_idx')],
+                'constraints': [models.UniqueConstraint(fields=('month_key', 'order_number'), name='unique_order_profit_per_month')],
+            },
+        ),
+    ]
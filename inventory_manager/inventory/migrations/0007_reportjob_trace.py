@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_profit_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='trace',
+            field=models.JSONField(blank=True, null=True, verbose_name='Performans İzi'),
+        ),
+    ]
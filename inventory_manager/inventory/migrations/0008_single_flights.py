@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_reportjob_trace'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SingleFlight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Anahtar')),
+                ('owner', models.CharField(max_length=255, verbose_name='Sahip')),
+                ('status', models.CharField(choices=[('running', 'Çalışıyor'), ('done', 'Tamamlandı'), ('failed', 'Hata')], default='running', max_length=20, verbose_name='Durum')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Sonuç')),
+                ('error_message', models.TextField(blank=True, default='', verbose_name='Hata Mesajı')),
+                ('started_at', models.DateTimeField(verbose_name='Başlama Tarihi')),
+                ('expires_at', models.DateTimeField(verbose_name='Kira Bitişi')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Bitiş Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Paylaşılan Hesaplama',
+                'verbose_name_plural': 'Paylaşılan Hesaplamalar',
+                'db_table': 'single_flights',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_single_flights'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AwaitingCargoInvoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_number', models.CharField(max_length=100, unique=True, verbose_name='Sipariş No')),
+                ('barcode', models.CharField(blank=True, max_length=100, verbose_name='Barkod')),
+                ('transaction_type', models.CharField(blank=True, max_length=50, verbose_name='İşlem Tipi')),
+                ('transaction_date', models.DateTimeField(db_index=True, verbose_name='İlk Settlement Tarihi')),
+                ('seller_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Satıcı Geliri')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Eklenme Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Kargo Faturası Bekleyen Sipariş',
+                'verbose_name_plural': 'Kargo Faturası Bekleyen Siparişler',
+                'db_table': 'awaiting_cargo_invoices',
+                'ordering': ['transaction_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_awaiting_cargo_invoices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BarcodeMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_key', models.CharField(db_index=True, max_length=7, verbose_name='Ay')),
+                ('barcode', models.CharField(db_index=True, max_length=100, verbose_name='Barkod')),
+                ('units_sold', models.PositiveIntegerField(default=0, verbose_name='Satış Adedi')),
+                ('units_returned', models.PositiveIntegerField(default=0, verbose_name='İade Adedi')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='Sipariş Sayısı')),
+                ('seller_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Hakediş Geliri')),
+                ('purchase_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ürün Maliyeti')),
+                ('cargo_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Kargo Payı')),
+                ('transaction_fee', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='İşlem Ücreti Payı')),
+                ('net_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Net Kâr')),
+                ('cost_missing', models.BooleanField(default=False, verbose_name='Maliyeti Yok')),
+            ],
+            options={
+                'verbose_name': 'Barkod Aylık Kârlılık',
+                'verbose_name_plural': 'Barkod Aylık Kârlılıkları',
+                'db_table': 'barcode_monthly_rollups',
+                'ordering': ['month_key', 'barcode'],
+                'constraints': [models.UniqueConstraint(fields=('month_key', 'barcode'), name='unique_barcode_rollup_per_month')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_barcode_monthly_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchasePriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('product', 'Ürün'), ('purchase_item', 'Satın Alınan Ürün')], max_length=20, verbose_name='Kaynak')),
+                ('barcode', models.CharField(max_length=128, verbose_name='Barkod')),
+                ('purchase_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Alış Fiyatı')),
+                ('effective_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Geçerlilik Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Alış Fiyatı Geçmişi',
+                'verbose_name_plural': 'Alış Fiyatı Geçmişi',
+                'db_table': 'purchase_price_history',
+                'ordering': ['source', 'barcode', 'effective_at'],
+                'indexes': [models.Index(fields=['source', 'barcode', 'effective_at'], name='purchase_pr_source_02df05_idx')],
+            },
+        ),
+    ]
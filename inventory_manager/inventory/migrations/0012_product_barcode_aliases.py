@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_purchase_price_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBarcodeAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('barcode', models.CharField(max_length=128, unique=True, verbose_name='Dış Barkod')),
+                ('note', models.CharField(blank=True, default='', max_length=255, verbose_name='Not')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='barcode_aliases', to='inventory.product', verbose_name='Ürün')),
+            ],
+            options={
+                'verbose_name': 'Barkod Eşlemesi',
+                'verbose_name_plural': 'Barkod Eşlemeleri',
+                'db_table': 'product_barcode_aliases',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def fill_synced_from(apps, schema_editor):
+    # Mevcut settlement durumları için güvenli alt sınır: depodaki en eski kayıt
+    TrendyolSyncState = apps.get_model('inventory', 'TrendyolSyncState')
+    TrendyolSettlement = apps.get_model('inventory', 'TrendyolSettlement')
+    for state in TrendyolSyncState.objects.filter(key__startswith='settlements:'):
+        sync_type = state.key.split(':', 1)[1]
+        oldest = TrendyolSettlement.objects.filter(sync_type=sync_type).aggregate(oldest=Min('transaction_date'))['oldest']
+        if oldest is not None:
+            state.synced_from = oldest
+            state.save(update_fields=['synced_from'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_product_barcode_aliases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendyolsyncstate',
+            name='synced_from',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_synced_from, migrations.RunPython.noop),
+    ]
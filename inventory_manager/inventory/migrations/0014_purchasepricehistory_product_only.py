@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_trendyolsyncstate_synced_from'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='purchasepricehistory',
+            options={'ordering': ['barcode', 'effective_at'], 'verbose_name': 'Alış Fiyatı Geçmişi', 'verbose_name_plural': 'Alış Fiyatı Geçmişi'},
+        ),
+        migrations.RemoveIndex(
+            model_name='purchasepricehistory',
+            name='purchase_pr_source_02df05_idx',
+        ),
+        migrations.RemoveField(
+            model_name='purchasepricehistory',
+            name='source',
+        ),
+        migrations.AddIndex(
+            model_name='purchasepricehistory',
+            index=models.Index(fields=['barcode', 'effective_at'], name='purchase_pr_barcode_21fd6b_idx'),
+        ),
+    ]
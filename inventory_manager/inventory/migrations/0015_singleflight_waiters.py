@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_purchasepricehistory_product_only'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='singleflight',
+            name='waiters',
+            field=models.PositiveIntegerField(default=0, verbose_name='Bekleyen'),
+        ),
+    ]
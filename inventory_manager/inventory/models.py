@@ -1,5 +1,11 @@
-from django.db import models
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .money import from_kurus, to_kurus
 
 
 class Product(models.Model):
@@ -28,10 +34,75 @@ class Product(models.Model):
         """Calculates profit margin for the product"""
         return self.selling_price - self.purchase_price
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Ertelenmiş (only/defer) yüklemede alan __dict__'te yoktur → None
+        instance._recorded_purchase_price = instance.__dict__.get("purchase_price")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        purchase_price değiştiyse PurchasePriceHistory'ye satır yazar. Yalnızca
+        save() üzerinden yapılan değişiklikler yakalanır; queryset.update() ve
+        bulk_update tarihçeyi atlar. Fiyat ertelenmiş yüklendiyse (önceki değer
+        bilinmiyor) ya da update_fields dışındaysa tarihçe yazılmaz.
+        """
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        price = self.__dict__.get("purchase_price")
+        if price is None or (update_fields is not None and "purchase_price" not in update_fields):
+            return
+        recorded = getattr(self, "_recorded_purchase_price", None)
+        if recorded is None and not adding:
+            return
+        if recorded is not None and Decimal(str(recorded)) == Decimal(str(price)):
+            return
+        history = PurchasePriceHistory.objects.filter(barcode=self.barcode)
+        if recorded is not None and not history.exists():
+            # Tarihçeden önce oluşturulmuş ürün: eski fiyat oluşturulma tarihinden geçerli sayılır
+            history.create(barcode=self.barcode, purchase_price=recorded, effective_at=self.created_at)
+        history.create(barcode=self.barcode, purchase_price=price)
+        self._recorded_purchase_price = price
+
     class Meta:
         db_table = "inventory_product"
 
 
+class ProductBarcodeAlias(models.Model):
+    """Product.barcode'dan farklı gelen pazaryeri barkodunun (varyant, yeniden listeleme) ürüne eşlemesi."""
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='barcode_aliases',
+        verbose_name="Ürün",
+    )
+    barcode = models.CharField("Dış Barkod", max_length=128, unique=True)
+    note = models.CharField("Not", max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.barcode} → {self.product_id}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .barcode_aliases import invalidate_alias_index
+        invalidate_alias_index()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .barcode_aliases import invalidate_alias_index
+        invalidate_alias_index()
+        return result
+
+    class Meta:
+        db_table = "product_barcode_aliases"
+        verbose_name = "Barkod Eşlemesi"
+        verbose_name_plural = "Barkod Eşlemeleri"
+
+
 class ProfitCalculator(models.Model):
     barcode = models.CharField(max_length=50, unique=True)
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -69,6 +140,40 @@ class PurchaseItem(models.Model):
     def __str__(self):
         return f"{self.name} - {self.purchase_barcode}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._recorded_purchase_price = instance.__dict__.get("purchase_price")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        purchase_price değiştiyse farkı bu SKU'yu kullanan ilanların (ListingComponent)
+        alış fiyatına qty_per_listing katıyla yansıtır. Product.save() tarihçeyi ilan
+        barkoduyla yazar; kâr hesabının as-of indeksi SKU fiyat değişikliğini de
+        böylece satış tarihine göre çözer. Product ile aynı kurallar geçerlidir:
+        yeni kayıt, ertelenmiş yükleme ve update_fields dışı fiyat yansıtılmaz.
+        """
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            update_fields = kwargs.get("update_fields")
+            price = self.__dict__.get("purchase_price")
+            if price is None or (update_fields is not None and "purchase_price" not in update_fields):
+                return
+            recorded = getattr(self, "_recorded_purchase_price", None)
+            self._recorded_purchase_price = price
+            if adding or recorded is None:
+                return
+            delta = Decimal(str(price)) - Decimal(str(recorded))
+            if not delta:
+                return
+            for component in self.listing_usages.select_related("inventory_product"):
+                product = component.inventory_product
+                cost = product.purchase_price + delta * component.qty_per_listing
+                product.purchase_price = from_kurus(to_kurus(cost))
+                product.save(update_fields=["purchase_price"])
+
     class Meta:
         db_table = "purchase_items"
         ordering = ['-created_at']
@@ -76,6 +181,30 @@ class PurchaseItem(models.Model):
         verbose_name_plural = "Satın Alınan Ürünler"
 
 
+class PurchasePriceHistory(models.Model):
+    """
+    Ürün alış fiyatı değişiklik kaydı (Product.save() yazar; PurchaseItem fiyat
+    değişiklikleri kullanıldıkları ilanların fiyatı üzerinden buraya düşer).
+    Kâr hesabı satışın tarihindeki fiyatı buradan çözer; geçmiş aylar fiyat
+    güncellendiğinde yeniden yazılmaz.
+    """
+    barcode = models.CharField("Barkod", max_length=128)
+    purchase_price = models.DecimalField("Alış Fiyatı", max_digits=10, decimal_places=2)
+    effective_at = models.DateTimeField("Geçerlilik Tarihi", default=timezone.now)
+
+    def __str__(self):
+        return f"{self.barcode}: {self.purchase_price} ₺ ({self.effective_at:%Y-%m-%d})"
+
+    class Meta:
+        db_table = "purchase_price_history"
+        ordering = ['barcode', 'effective_at']
+        verbose_name = "Alış Fiyatı Geçmişi"
+        verbose_name_plural = "Alış Fiyatı Geçmişi"
+        indexes = [
+            models.Index(fields=['barcode', 'effective_at']),
+        ]
+
+
 class ListingComponent(models.Model):
     """Bir ilanın hangi SKU'lardan (purchase_items) oluştuğunu tutar."""
     inventory_product = models.ForeignKey(
@@ -150,3 +279,272 @@ class TrendyolWebhookLog(models.Model):
             models.Index(fields=['line_item_status']),
         ]
 
+
+
+class CargoInvoice(models.Model):
+    """DeductionInvoices içindeki 'Kargo Fatura' kaydı. Kesildikten sonra değişmez."""
+    serial_number = models.CharField("Fatura Seri No", max_length=64, unique=True)
+    transaction_date = models.DateTimeField("İşlem Tarihi", db_index=True)
+    items_fetched = models.BooleanField("Kalemler Çekildi", default=False, db_index=True)
+    item_count = models.PositiveIntegerField("Kalem Sayısı", default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.serial_number
+
+    class Meta:
+        db_table = "cargo_invoices"
+        verbose_name = "Kargo Faturası"
+        verbose_name_plural = "Kargo Faturaları"
+
+
+class CargoInvoiceItem(models.Model):
+    """Kargo faturasındaki tek satır: orderNumber → amount."""
+    invoice = models.ForeignKey(
+        CargoInvoice,
+        on_delete=models.CASCADE,
+        related_name='items',
+    )
+    order_number = models.CharField("Sipariş No", max_length=100, db_index=True)
+    amount = models.DecimalField("Tutar", max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.invoice.serial_number} - {self.order_number}: {self.amount}"
+
+    class Meta:
+        db_table = "cargo_invoice_items"
+
+
+class CargoInvoiceScanDay(models.Model):
+    """DeductionInvoices taraması tamamlanmış (kapanmış) gün. Bu günler bir daha taranmaz."""
+    day = models.DateField(unique=True)
+    scanned_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return str(self.day)
+
+    class Meta:
+        db_table = "cargo_invoice_scan_days"
+
+
+class TrendyolSettlement(models.Model):
+    """Trendyol settlements API kaydının yerel kopyası (Sale / Return)."""
+    settlement_id = models.CharField("Settlement ID", max_length=128, unique=True)
+    sync_type = models.CharField("Senkron Tipi", max_length=50, db_index=True)  # Sale / Return
+    transaction_type = models.CharField("İşlem Tipi", max_length=50)
+    transaction_date = models.DateTimeField("İşlem Tarihi", db_index=True)
+    order_number = models.CharField("Sipariş No", max_length=100, blank=True, db_index=True)
+    barcode = models.CharField("Barkod", max_length=100, blank=True, db_index=True)
+    seller_revenue = models.DecimalField("Satıcı Geliri", max_digits=12, decimal_places=2, default=0)
+    commission_amount = models.DecimalField("Komisyon", max_digits=12, decimal_places=2, default=0)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.order_number} - {self.barcode} [{self.transaction_type}]"
+
+    class Meta:
+        db_table = "trendyol_settlements"
+        verbose_name = "Trendyol Settlement"
+        verbose_name_plural = "Trendyol Settlements"
+        indexes = [
+            models.Index(fields=['sync_type', 'transaction_date']),
+        ]
+
+
+class AwaitingCargoInvoice(models.Model):
+    """
+    Settlement'ı gelmiş ama henüz kargo faturası görülmemiş sipariş.
+    Yeni settlement'lar ekler, yeni kargo faturası kalemleri siler (track_awaiting_cargo).
+    """
+    order_number = models.CharField("Sipariş No", max_length=100, unique=True)
+    barcode = models.CharField("Barkod", max_length=100, blank=True)
+    transaction_type = models.CharField("İşlem Tipi", max_length=50, blank=True)
+    transaction_date = models.DateTimeField("İlk Settlement Tarihi", db_index=True)
+    seller_revenue = models.DecimalField("Satıcı Geliri", max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField("Eklenme Tarihi", auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.order_number} ({self.transaction_date:%Y-%m-%d})"
+
+    class Meta:
+        db_table = "awaiting_cargo_invoices"
+        ordering = ['transaction_date']
+        verbose_name = "Kargo Faturası Bekleyen Sipariş"
+        verbose_name_plural = "Kargo Faturası Bekleyen Siparişler"
+
+
+class TrendyolSyncState(models.Model):
+    """Senkronizasyon durumu: synced_from - synced_until aralığındaki kayıtlar yerelde tam."""
+    key = models.CharField(max_length=100, unique=True)  # örn. "settlements:Sale"
+    synced_from = models.DateTimeField(null=True, blank=True)  # None: alt sınır bilinmiyor
+    synced_until = models.DateTimeField()
+    last_success_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.synced_from} → {self.synced_until}"
+
+    class Meta:
+        db_table = "trendyol_sync_state"
+
+
+class ReportJob(models.Model):
+    """/trendyol-profit/ raporunun arka planda (run_report_jobs) hesaplanan çalıştırması."""
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Sırada"),
+        (STATUS_RUNNING, "Çalışıyor"),
+        (STATUS_DONE, "Tamamlandı"),
+        (STATUS_FAILED, "Hata"),
+    ]
+
+    start_date = models.DateTimeField("Başlangıç")
+    end_date = models.DateTimeField("Bitiş")
+    source = models.CharField("Settlement Kaynağı", max_length=10, default="auto")
+    status = models.CharField("Durum", max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+
+    # İlerleme (calculate_monthly_summary progress callback'i ile güncellenir)
+    phase = models.CharField("Aşama", max_length=50, blank=True)
+    periods_done = models.PositiveIntegerField("Biten Periyot", default=0)
+    periods_total = models.PositiveIntegerField("Toplam Periyot", default=0)
+    serials_done = models.PositiveIntegerField("Biten Fatura", default=0)
+    serials_total = models.PositiveIntegerField("Toplam Fatura", default=0)
+
+    # {monthly_summary, missing_barcodes, order_details}
+    result = models.JSONField("Sonuç", null=True, blank=True, encoder=DjangoJSONEncoder)
+    error_message = models.TextField("Hata Mesajı", blank=True, null=True)
+    # tracing.Trace.to_dict(): aşama/HTTP çağrısı bazında süre, bayt, kayıt, retry, cache
+    trace = models.JSONField("Performans İzi", null=True, blank=True)
+
+    created_at = models.DateTimeField("Oluşturulma Tarihi", auto_now_add=True)
+    started_at = models.DateTimeField("Başlama Tarihi", null=True, blank=True)
+    finished_at = models.DateTimeField("Bitiş Tarihi", null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.start_date:%Y-%m-%d} - {self.end_date:%Y-%m-%d} [{self.status}]"
+
+    class Meta:
+        db_table = "report_jobs"
+        ordering = ['-created_at']
+        verbose_name = "Rapor İşi"
+        verbose_name_plural = "Rapor İşleri"
+        indexes = [
+            models.Index(fields=['start_date', 'end_date', 'source', 'status']),
+        ]
+
+
+class SingleFlight(models.Model):
+    """
+    Aynı anahtarlı eşzamanlı hesaplamanın süreçler arası kilidi (inventory.singleflight).
+    Sonuç yalnızca bekleyen varken saklanır; son bekleyen aldığında silinir.
+    """
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "Çalışıyor"),
+        (STATUS_DONE, "Tamamlandı"),
+        (STATUS_FAILED, "Hata"),
+    ]
+
+    key = models.CharField("Anahtar", max_length=255, unique=True)
+    owner = models.CharField("Sahip", max_length=255)
+    status = models.CharField("Durum", max_length=20, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    result = models.JSONField("Sonuç", null=True, blank=True, encoder=DjangoJSONEncoder)
+    waiters = models.PositiveIntegerField("Bekleyen", default=0)
+    error_message = models.TextField("Hata Mesajı", blank=True, default="")
+    started_at = models.DateTimeField("Başlama Tarihi")
+    expires_at = models.DateTimeField("Kira Bitişi")
+    finished_at = models.DateTimeField("Bitiş Tarihi", null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.key} [{self.status}]"
+
+    class Meta:
+        db_table = "single_flights"
+        verbose_name = "Paylaşılan Hesaplama"
+        verbose_name_plural = "Paylaşılan Hesaplamalar"
+
+
+class MonthlyProfitSummary(models.Model):
+    """Aylık kâr özetinin materyalize kopyası (refresh_profit_summary / rapor işleri doldurur)."""
+    month_key = models.CharField("Ay", max_length=7, unique=True)  # YYYY-MM
+    month_label = models.CharField("Ay Adı", max_length=30)
+    seller_revenue = models.DecimalField("Hakediş Geliri", max_digits=14, decimal_places=2, default=0)
+    cargo_cost = models.DecimalField("Kargo Gideri", max_digits=14, decimal_places=2, default=0)
+    purchase_cost = models.DecimalField("Ürün Maliyeti", max_digits=14, decimal_places=2, default=0)
+    transaction_fee = models.DecimalField("İşlem Ücreti", max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField("Sipariş Sayısı", default=0)
+    net_profit = models.DecimalField("Net Kâr", max_digits=14, decimal_places=2, default=0)
+    missing_barcodes = models.JSONField("Maliyeti Olmayan Barkodlar", default=list, blank=True)
+    refreshed_at = models.DateTimeField("Son Güncelleme")
+
+    def __str__(self):
+        return f"{self.month_label}: {self.net_profit} ₺"
+
+    class Meta:
+        db_table = "monthly_profit_summaries"
+        ordering = ['month_key']
+        verbose_name = "Aylık Kâr Özeti"
+        verbose_name_plural = "Aylık Kâr Özetleri"
+
+
+class OrderProfitSummary(models.Model):
+    """Bir ayın sipariş bazlı kâr satırı (MonthlyProfitSummary ile birlikte yenilenir)."""
+    month_key = models.CharField("Ay", max_length=7, db_index=True)
+    order_number = models.CharField("Sipariş No", max_length=100)
+    transaction_date = models.DateTimeField("İşlem Tarihi", null=True, blank=True)
+    item_count = models.PositiveIntegerField("Ürün Sayısı", default=0)
+    total_seller_revenue = models.DecimalField("Satıcı Geliri", max_digits=12, decimal_places=2, default=0)
+    total_purchase_price = models.DecimalField("Ürün Maliyeti", max_digits=12, decimal_places=2, default=0)
+    total_shipping_fee = models.DecimalField("Kargo", max_digits=12, decimal_places=2, default=0)
+    total_net_profit = models.DecimalField("Net Kâr", max_digits=12, decimal_places=2, default=0)
+    cargo_found = models.BooleanField("Kargo Bulundu", default=False)
+    items = models.JSONField("Kalemler", default=list, blank=True)
+
+    def __str__(self):
+        return f"{self.month_key} {self.order_number}: {self.total_net_profit} ₺"
+
+    class Meta:
+        db_table = "order_profit_summaries"
+        ordering = ['-transaction_date']
+        verbose_name = "Sipariş Kâr Özeti"
+        verbose_name_plural = "Sipariş Kâr Özetleri"
+        constraints = [
+            models.UniqueConstraint(fields=['month_key', 'order_number'], name='unique_order_profit_per_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month_key', 'transaction_date']),
+        ]
+
+
+class BarcodeMonthlyRollup(models.Model):
+    """
+    Bir ayın barkod bazlı kârlılığı (sipariş satırlarıyla birlikte yenilenir).
+    Siparişin kargo ve işlem ücreti, siparişteki satış kalemlerine eşit paylaştırılır.
+    """
+    month_key = models.CharField("Ay", max_length=7, db_index=True)
+    barcode = models.CharField("Barkod", max_length=100, db_index=True)
+    units_sold = models.PositiveIntegerField("Satış Adedi", default=0)
+    units_returned = models.PositiveIntegerField("İade Adedi", default=0)
+    order_count = models.PositiveIntegerField("Sipariş Sayısı", default=0)
+    seller_revenue = models.DecimalField("Hakediş Geliri", max_digits=14, decimal_places=2, default=0)
+    purchase_cost = models.DecimalField("Ürün Maliyeti", max_digits=14, decimal_places=2, default=0)
+    cargo_cost = models.DecimalField("Kargo Payı", max_digits=14, decimal_places=2, default=0)
+    transaction_fee = models.DecimalField("İşlem Ücreti Payı", max_digits=14, decimal_places=2, default=0)
+    net_profit = models.DecimalField("Net Kâr", max_digits=14, decimal_places=2, default=0)
+    cost_missing = models.BooleanField("Maliyeti Yok", default=False)
+
+    def __str__(self):
+        return f"{self.month_key} {self.barcode}: {self.net_profit} ₺"
+
+    class Meta:
+        db_table = "barcode_monthly_rollups"
+        ordering = ['month_key', 'barcode']
+        verbose_name = "Barkod Aylık Kârlılık"
+        verbose_name_plural = "Barkod Aylık Kârlılıkları"
+        constraints = [
+            models.UniqueConstraint(fields=['month_key', 'barcode'], name='unique_barcode_rollup_per_month'),
+        ]
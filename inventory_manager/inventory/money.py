@@ -0,0 +1,59 @@
+"""
+Kuruş cinsinden tam sayı para aritmetiği.
+
+Kâr hesaplarında tutarlar int kuruş olarak toplanır; Decimal / float yalnızca
+kenarlarda (API yanıtı, form girdisi, DB alanı, şablon/JSON çıktısı) dönüştürülür.
+Böylece büyük aylık toplamlar birikimli float hatası olmadan, tam sayı
+toplamasıyla hesaplanır.
+
+Tek yuvarlama kuralı: ROUND_HALF_UP, kuruşa (0,005 ₺ → 0,01 ₺). Yüzde hesapları
+(komisyon, KDV) da aynı kuralla kuruşa yuvarlanır.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+KURUS_PER_LIRA = 100
+ROUNDING = ROUND_HALF_UP
+
+_ONE = Decimal(1)
+_CENT = Decimal("0.01")
+
+
+def to_decimal(value: Any) -> Decimal:
+    """Girdi (str / int / float / Decimal / None) → Decimal; float, kısa repr'i üzerinden çevrilir."""
+    if value is None or value == "":
+        return Decimal(0)
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(str(value).strip().replace(",", "."))
+
+
+def to_kurus(value: Any) -> int:
+    """Lira tutarı → int kuruş (ROUND_HALF_UP)."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value * KURUS_PER_LIRA
+    return int((to_decimal(value) * KURUS_PER_LIRA).quantize(_ONE, rounding=ROUNDING))
+
+
+def from_kurus(kurus: int) -> Decimal:
+    """int kuruş → 2 ondalıklı Decimal (DB alanları için)."""
+    return Decimal(kurus).scaleb(-2).quantize(_CENT)
+
+
+def kurus_to_float(kurus: int) -> float:
+    """int kuruş → float lira (JSON / şablon çıktısı için; 2 ondalığa en yakın float)."""
+    return kurus / KURUS_PER_LIRA
+
+
+def percent_of(kurus: int, rate: Any) -> int:
+    """kurus × rate / 100, kuruşa yuvarlanmış (ör. komisyon, KDV)."""
+    return int((Decimal(kurus) * to_decimal(rate) / 100).quantize(_ONE, rounding=ROUNDING))
+
+
+def ratio_percent(numerator_kurus: int, denominator_kurus: int) -> Decimal:
+    """numerator / denominator × 100, 2 ondalık (ör. kâr marjı); payda 0 ise 0."""
+    if not denominator_kurus:
+        return Decimal("0.00")
+    return (Decimal(numerator_kurus) * 100 / Decimal(denominator_kurus)).quantize(_CENT, rounding=ROUNDING)
@@ -0,0 +1,61 @@
+"""
+Alış fiyatının işlem tarihine göre (as-of) çözümü.
+
+PurchasePriceIndex, load_purchase_prices'ın döndürdüğü barkod → güncel fiyat
+(kuruş) haritasıdır; dict olduğu için mevcut `in` / get() / Series.map()
+kullanımları değişmeden çalışır. Fiyatı hiç değişmemiş barkodlar yalnızca bu
+haritada durur; tarihçesinde birden fazla fiyat olan barkodlar için ayrıca
+sıralı (zaman, fiyat) listeleri tutulur ve price_at() bisect ile çözer. Böylece
+satır başına sorgu atılmaz, tarihçesiz barkodların maliyeti bugünkü ile aynıdır.
+"""
+import datetime
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import PurchasePriceHistory
+from .money import to_kurus
+
+
+def _to_ms(value: datetime.datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+class PurchasePriceIndex(dict):
+    """barkod → güncel alış fiyatı (kuruş); history: barkod → (zamanlar ms, fiyatlar kuruş)."""
+
+    def __init__(self, current=(), history: Optional[Dict[str, Tuple[List[int], List[int]]]] = None) -> None:
+        super().__init__(current)
+        self.history: Dict[str, Tuple[List[int], List[int]]] = history or {}
+
+    def price_at(self, barcode: str, timestamp_ms: Optional[int]) -> int:
+        """
+        Barkodun timestamp_ms anındaki fiyatı. İlk kayıttan önceki satışlar ilk
+        bilinen fiyatı, tarihçesi olmayanlar ve zamanı bilinmeyenler güncel fiyatı alır.
+        """
+        entry = self.history.get(barcode)
+        if entry is None or timestamp_ms is None:
+            return self.get(barcode, 0)
+        times, prices = entry
+        return prices[max(bisect_right(times, timestamp_ms) - 1, 0)]
+
+
+def load_price_history(barcodes: Iterable[str]) -> Dict[str, Tuple[List[int], List[int]]]:
+    """
+    Verilen (ürün) barkodları için tarihçe listeleri; tek sorgu. Ardışık aynı
+    fiyatlar birleştirilir, tek fiyatlı barkodlar hiç döndürülmez.
+    """
+    rows = (
+        PurchasePriceHistory.objects
+        .filter(barcode__in=list(barcodes))
+        .order_by("barcode", "effective_at", "id")
+        .values_list("barcode", "effective_at", "purchase_price")
+    )
+    history: Dict[str, Tuple[List[int], List[int]]] = {}
+    for barcode, effective_at, purchase_price in rows:
+        times, prices = history.setdefault(barcode, ([], []))
+        price = to_kurus(purchase_price)
+        if prices and prices[-1] == price:
+            continue
+        times.append(_to_ms(effective_at))
+        prices.append(price)
+    return {barcode: entry for barcode, entry in history.items() if len(entry[1]) > 1}
@@ -0,0 +1,493 @@
+"""
+Aylık kâr özetinin materyalize tabloları (MonthlyProfitSummary / OrderProfitSummary /
+BarcodeMonthlyRollup).
+
+calculate_monthly_summary sonucu ay bazında bu tablolara yazılır; /trendyol-profit/
+sayfası ayı buradan tek indeksli sorguyla okur. Tablolar gece çalışan
+`python manage.py refresh_profit_summary` ve "Şimdi yenile" ile açılan rapor
+işleri tarafından yenilenir.
+"""
+import base64
+import binascii
+import calendar
+import datetime
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, When
+from django.utils import timezone
+
+from .models import BarcodeMonthlyRollup, MonthlyProfitSummary, OrderProfitSummary, ReportJob
+from .money import from_kurus, to_decimal, to_kurus
+from .tracing import span
+from .trendyol_integration import TURKISH_MONTHS
+
+logger = logging.getLogger(__name__)
+
+
+def _money(value) -> Decimal:
+    return from_kurus(to_kurus(value))
+
+
+def month_bounds(year: int, month: int) -> tuple:
+    """Ayın (ilk saniye, son saniye) aralığı, UTC."""
+    last_day = calendar.monthrange(year, month)[1]
+    start = datetime.datetime(year, month, 1, 0, 0, 0, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime(year, month, last_day, 23, 59, 59, tzinfo=datetime.timezone.utc)
+    return start, end
+
+
+def parse_month_key(month_key: str) -> tuple:
+    """"YYYY-MM" → (year, month); geçersizse ValueError."""
+    year, month = map(int, month_key.split("-"))
+    if not 1 <= month <= 12:
+        raise ValueError(f"Geçersiz ay: {month_key}")
+    return year, month
+
+
+def _covered_month_keys(start_date: datetime.datetime, end_date: datetime.datetime) -> List[str]:
+    """Aralığın tamamen kapsadığı ayların anahtarları."""
+    keys = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        month_start, month_end = month_bounds(year, month)
+        if month_start >= start_date and month_end <= end_date:
+            keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return keys
+
+
+def barcode_rollups(month_key: str, rows: List[Dict[str, Any]]) -> List[BarcodeMonthlyRollup]:
+    """
+    Ayın barkod bazlı kârlılık satırları. Satırlar settlement katlamasında hesaplanır
+    (SettlementAccumulator.finalize → monthly_list[...]["barcodes"]); sipariş numarası
+    olmayan kalemler de dahildir ve barkodlu kalemlerin toplamı ayın toplamına eşittir.
+    """
+    return [
+        BarcodeMonthlyRollup(
+            month_key=month_key,
+            barcode=row["barcode"],
+            units_sold=row["units_sold"],
+            units_returned=row["units_returned"],
+            order_count=row["order_count"],
+            seller_revenue=_money(row["seller_revenue"]),
+            purchase_cost=_money(row["purchase_cost"]),
+            cargo_cost=_money(row["cargo_cost"]),
+            transaction_fee=_money(row["transaction_fee"]),
+            net_profit=_money(row["net_profit"]),
+            cost_missing=row["cost_missing"],
+        )
+        for row in rows
+    ]
+
+
+def materialize_summary(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    monthly_list: List[Dict[str, Any]],
+    missing_barcodes: List[str],
+    order_list: List[Dict[str, Any]],
+) -> List[str]:
+    """
+    calculate_monthly_summary sonucunu aralığın tamamen kapsadığı aylar için
+    tablolara yazar (ayın sipariş satırları tamamen değiştirilir).
+    Kısmi kapsanan aylar yazılmaz. Yazılan ay anahtarlarını döner.
+    """
+    month_keys = _covered_month_keys(start_date, end_date)
+    if not month_keys:
+        return []
+
+    monthly_by_key = {m["month_key"]: m for m in monthly_list}
+    orders_by_month: Dict[str, List[OrderProfitSummary]] = {key: [] for key in month_keys}
+
+    for order in order_list:
+        tx_dt = order.get("transactionDate")
+        month_key = tx_dt.strftime("%Y-%m") if tx_dt else None
+        if month_key not in orders_by_month:
+            continue
+        orders_by_month[month_key].append(OrderProfitSummary(
+            month_key=month_key,
+            order_number=order["orderNumber"],
+            transaction_date=tx_dt,
+            item_count=order.get("itemCount", 0),
+            total_seller_revenue=_money(order.get("totalSellerRevenue")),
+            total_purchase_price=_money(order.get("totalPurchasePrice")),
+            total_shipping_fee=_money(order.get("totalShippingFee")),
+            total_net_profit=_money(order.get("totalNetProfit")),
+            cargo_found=bool(order.get("cargoFound")),
+            items=order.get("items") or [],
+        ))
+
+    now = timezone.now()
+    with span("db.materialize", records=len(order_list)), transaction.atomic():
+        for month_key in month_keys:
+            year, month = parse_month_key(month_key)
+            data = monthly_by_key.get(month_key, {})
+            barcode_rows = data.get("barcodes") or []
+            MonthlyProfitSummary.objects.update_or_create(
+                month_key=month_key,
+                defaults={
+                    "month_label": data.get("month_label") or f"{TURKISH_MONTHS[month]} {year}",
+                    "seller_revenue": _money(data.get("seller_revenue")),
+                    "cargo_cost": _money(data.get("cargo_cost")),
+                    "purchase_cost": _money(data.get("purchase_cost")),
+                    "transaction_fee": _money(data.get("transaction_fee")),
+                    "order_count": data.get("order_count", 0),
+                    "net_profit": _money(data.get("net_profit")),
+                    "missing_barcodes": [row["barcode"] for row in barcode_rows if row["cost_missing"]],
+                    "refreshed_at": now,
+                },
+            )
+            OrderProfitSummary.objects.filter(month_key=month_key).delete()
+            OrderProfitSummary.objects.bulk_create(orders_by_month[month_key], batch_size=500)
+            BarcodeMonthlyRollup.objects.filter(month_key=month_key).delete()
+            BarcodeMonthlyRollup.objects.bulk_create(
+                barcode_rollups(month_key, barcode_rows), batch_size=500,
+            )
+
+    logger.info(f"Kâr özeti materyalize edildi: {', '.join(month_keys)}")
+    return month_keys
+
+
+def load_month_summary(month_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Materyalize ayın özet kartlarını döner; ay hiç yenilenmemişse None.
+    Sipariş satırları sayfaya gömülmez, page_stored_orders ile sayfa sayfa okunur.
+    """
+    summary = MonthlyProfitSummary.objects.filter(month_key=month_key).first()
+    if summary is None:
+        return None
+
+    monthly_summary = [{
+        "month_key": summary.month_key,
+        "month_label": summary.month_label,
+        "seller_revenue": summary.seller_revenue,
+        "cargo_cost": summary.cargo_cost,
+        "purchase_cost": summary.purchase_cost,
+        "transaction_fee": summary.transaction_fee,
+        "order_count": summary.order_count,
+        "net_profit": summary.net_profit,
+    }]
+    return {
+        "refreshed_at": summary.refreshed_at,
+        "monthly_summary": monthly_summary,
+        "missing_barcodes": summary.missing_barcodes,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sipariş detayı sayfalama (keyset cursor)
+# ─────────────────────────────────────────────────────────────────────────────
+
+# sort parametresi → (OrderProfitSummary alanı, order_details anahtarı)
+ORDER_SORTS = {
+    "date": ("transaction_date", "transactionDate"),
+    "profit": ("total_net_profit", "totalNetProfit"),
+    "shipping": ("total_shipping_fee", "totalShippingFee"),
+}
+MAX_ORDER_PAGE_SIZE = 200
+
+_NO_DATE = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+
+def encode_order_cursor(sort: str, value: Any, order_number: str) -> str:
+    """
+    Son satırın (sıralama değeri, sipariş no) çifti → URL'de taşınabilir cursor.
+    Tarihi olmayan sipariş (None / _NO_DATE) cursor'a null olarak yazılır.
+    """
+    if sort == "date":
+        raw = None if value is None or value == _NO_DATE else value.isoformat()
+    else:
+        raw = str(value)
+    payload = json.dumps([raw, order_number], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_order_cursor(sort: str, cursor: str) -> tuple:
+    """Cursor → (sıralama değeri, sipariş no); bozuksa ValueError. Tarihsiz satır → None."""
+    try:
+        raw, order_number = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if sort != "date":
+            value = Decimal(raw)
+        elif raw is None:
+            value = None
+        else:
+            value = datetime.datetime.fromisoformat(raw)
+    except (TypeError, ValueError, ArithmeticError, binascii.Error) as e:
+        raise ValueError(f"Geçersiz cursor: {cursor}") from e
+    return value, str(order_number)
+
+
+def page_stored_orders(
+    month_key: str,
+    sort: str = "date",
+    descending: bool = True,
+    cargo_missing: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> tuple:
+    """
+    Materyalize ayın sipariş satırlarından bir sayfa.
+    (sıralama alanı, sipariş no) üzerinden keyset sayfalama yapılır; OFFSET yoktur.
+    Tarihi olmayan siparişler page_order_list'teki gibi en küçük değer sayılır:
+    azalan sırada en sonda, artan sırada en başta gelir.
+    Döner: (orders, next_cursor, total)
+    """
+    field = ORDER_SORTS[sort][0]
+    rows = OrderProfitSummary.objects.filter(month_key=month_key)
+    if cargo_missing:
+        rows = rows.filter(cargo_found=False)
+    total = rows.count()
+    if cursor:
+        value, order_number = decode_order_cursor(sort, cursor)
+        op = "lt" if descending else "gt"
+        if value is None:
+            # Cursor tarihsiz bir satırda: aynı (null) grupta sipariş no ile devam et;
+            # artan sırada tarihli satırların hepsi henüz gelmedi.
+            after = Q(**{f"{field}__isnull": True, f"order_number__{op}": order_number})
+            if not descending:
+                after |= Q(**{f"{field}__isnull": False})
+        else:
+            after = Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"order_number__{op}": order_number})
+            if descending:
+                after |= Q(**{f"{field}__isnull": True})
+        rows = rows.filter(after)
+    if descending:
+        ordering = (F(field).desc(nulls_last=True), F("order_number").desc())
+    else:
+        ordering = (F(field).asc(nulls_first=True), F("order_number").asc())
+    page = list(rows.order_by(*ordering)[:limit + 1])
+
+    orders = [
+        {
+            "orderNumber": row.order_number,
+            "transactionDate": row.transaction_date,
+            "items": row.items,
+            "itemCount": row.item_count,
+            "totalSellerRevenue": row.total_seller_revenue,
+            "totalPurchasePrice": row.total_purchase_price,
+            "totalShippingFee": row.total_shipping_fee,
+            "totalNetProfit": row.total_net_profit,
+            "cargoFound": row.cargo_found,
+        }
+        for row in page[:limit]
+    ]
+    next_cursor = None
+    if len(page) > limit:
+        last = page[limit - 1]
+        next_cursor = encode_order_cursor(sort, getattr(last, field), last.order_number)
+    return orders, next_cursor, total
+
+
+def page_order_list(
+    order_list: List[Dict[str, Any]],
+    sort: str = "date",
+    descending: bool = True,
+    cargo_missing: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> tuple:
+    """
+    Rapor işi sonucundaki (bellekteki) sipariş listesinden page_stored_orders ile
+    aynı sıralama ve cursor kurallarıyla bir sayfa. Döner: (orders, next_cursor, total)
+    """
+    key_name = ORDER_SORTS[sort][1]
+
+    def sort_key(order: Dict[str, Any]) -> tuple:
+        value = order.get(key_name)
+        if sort == "date":
+            value = value or _NO_DATE
+        else:
+            value = to_decimal(value)
+        return value, str(order["orderNumber"])
+
+    rows = [o for o in order_list if not (cargo_missing and o.get("cargoFound"))]
+    total = len(rows)
+    keyed = sorted(((sort_key(o), o) for o in rows), key=lambda pair: pair[0], reverse=descending)
+    if cursor:
+        value, order_number = decode_order_cursor(sort, cursor)
+        after = (_NO_DATE if value is None else value), order_number
+        keyed = [(k, o) for k, o in keyed if (k < after if descending else k > after)]
+
+    orders = [o for _, o in keyed[:limit]]
+    next_cursor = None
+    if len(keyed) > limit:
+        value, order_number = keyed[limit - 1][0]
+        next_cursor = encode_order_cursor(sort, value, order_number)
+    return orders, next_cursor, total
+
+
+def latest_month_trace(month_key: str) -> Optional[Dict[str, Any]]:
+    """Ayı en son hesaplayan rapor işinin performans izi (yoksa None)."""
+    start_date, end_date = month_bounds(*parse_month_key(month_key))
+    job = (
+        ReportJob.objects
+        .filter(start_date=start_date, end_date=end_date, status=ReportJob.STATUS_DONE, trace__isnull=False)
+        .order_by("-finished_at")
+        .only("trace")
+        .first()
+    )
+    return job.trace if job else None
+
+
+def month_keys_between(start_key: str, end_key: str) -> List[str]:
+    """start_key..end_key (dahil) arasındaki "YYYY-MM" anahtarları."""
+    year, month = parse_month_key(start_key)
+    end = parse_month_key(end_key)
+    keys = []
+    while (year, month) <= end:
+        keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return keys
+
+
+def shift_month_key(month_key: str, months: int) -> str:
+    year, month = parse_month_key(month_key)
+    index = year * 12 + (month - 1) + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _change_pct(current: Decimal, previous: Optional[Decimal]) -> Optional[float]:
+    if previous is None or previous == 0:
+        return None
+    return round(float((current - previous) / abs(previous) * 100), 1)
+
+
+REPORT_FIELDS = ("seller_revenue", "cargo_cost", "purchase_cost", "transaction_fee", "net_profit")
+
+
+def build_range_report(month_keys: List[str]) -> Dict[str, Any]:
+    """
+    Materyalize aylık özetlerden çok aylık rapor + geçen yılın aynı ayıyla karşılaştırma.
+
+    API'ye gidilmez; tabloda olmayan aylar `missing_months` içinde döner
+    (çağıran taraf bunlar için rapor işi açar).
+
+    Döner: {rows, totals, previous_totals, missing_months}
+      rows: her ay için {month_key, month_label, <alanlar>, order_count, previous,
+                         seller_revenue_change, net_profit_change, order_count_change}
+    """
+    previous_keys = [shift_month_key(key, -12) for key in month_keys]
+    stored = {
+        row.month_key: row
+        for row in MonthlyProfitSummary.objects.filter(month_key__in=month_keys + previous_keys)
+    }
+
+    zero = Decimal("0.00")
+    totals = {field: zero for field in REPORT_FIELDS}
+    totals["order_count"] = 0
+    previous_totals = dict(totals)
+    # Toplam değişim yalnızca iki yılı da hesaplanmış aylar üzerinden
+    matched = {field: [Decimal(0), Decimal(0)] for field in ("seller_revenue", "net_profit", "order_count")}
+    has_previous = False
+    rows = []
+    missing_months = []
+
+    for month_key, previous_key in zip(month_keys, previous_keys):
+        current = stored.get(month_key)
+        previous = stored.get(previous_key)
+        if current is None:
+            missing_months.append(month_key)
+        if previous is None:
+            missing_months.append(previous_key)
+
+        year, month = parse_month_key(month_key)
+        row: Dict[str, Any] = {
+            "month_key": month_key,
+            "month_label": current.month_label if current else f"{TURKISH_MONTHS[month]} {year}",
+            "available": current is not None,
+            "previous": None,
+        }
+        for field in REPORT_FIELDS + ("order_count",):
+            row[field] = getattr(current, field) if current else None
+            if current:
+                totals[field] += row[field]
+        if previous:
+            has_previous = True
+            row["previous"] = {field: getattr(previous, field) for field in REPORT_FIELDS + ("order_count",)}
+            for field in REPORT_FIELDS + ("order_count",):
+                previous_totals[field] += row["previous"][field]
+        if current and previous:
+            for field in matched:
+                row[f"{field}_change"] = _change_pct(Decimal(row[field]), Decimal(row["previous"][field]))
+                matched[field][0] += Decimal(row[field])
+                matched[field][1] += Decimal(row["previous"][field])
+        rows.append(row)
+
+    for field, (current_sum, previous_sum) in matched.items():
+        totals[f"{field}_change"] = _change_pct(current_sum, previous_sum)
+
+    return {
+        "rows": rows,
+        "totals": totals,
+        "previous_totals": previous_totals if has_previous else None,
+        "missing_months": missing_months,
+    }
+
+
+BARCODE_REPORT_SORTS = (
+    "net_profit", "margin", "seller_revenue", "purchase_cost", "cargo_cost", "units_sold", "units_returned",
+)
+_BARCODE_SUM_FIELDS = (
+    "units_sold", "units_returned", "order_count", "seller_revenue", "purchase_cost", "cargo_cost",
+    "transaction_fee", "net_profit",
+)
+
+
+def build_barcode_report(
+    month_keys: List[str],
+    sort: str = "net_profit",
+    descending: bool = True,
+    query: str = "",
+    cost_missing_only: bool = False,
+):
+    """
+    Seçilen aylar için barkod bazlı kârlılık (BarcodeMonthlyRollup toplamları).
+    Ham settlement'lara dönülmez; sıralama ve filtre DB'de yapılır.
+
+    Döner: (barkod satırları queryset'i, toplamlar dict'i)
+    """
+    rows = BarcodeMonthlyRollup.objects.filter(month_key__in=month_keys)
+    if query:
+        rows = rows.filter(barcode__icontains=query)
+    if cost_missing_only:
+        rows = rows.filter(cost_missing=True)
+    totals = rows.aggregate(**{field: Sum(field) for field in _BARCODE_SUM_FIELDS}, barcodes=Count("barcode", distinct=True))
+
+    # Toplam alanları model alanlarıyla çakışmasın diye total_ önekiyle adlandırılır
+    report = (
+        rows.values("barcode")
+        .annotate(**{f"total_{field}": Sum(field) for field in _BARCODE_SUM_FIELDS})
+        .annotate(
+            months=Count("month_key"),
+            cost_missing_months=Count("pk", filter=Q(cost_missing=True)),
+            margin=Case(
+                When(total_seller_revenue=0, then=None),
+                default=F("total_net_profit") * 100 / F("total_seller_revenue"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+    )
+    field = sort if sort == "margin" else f"total_{sort}"
+    order = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+    return report.order_by(order, "barcode"), totals
+
+
+def refresh_month(year: int, month: int, source: str = "auto") -> List[str]:
+    """
+    Bir ayı Trendyol verisinden yeniden hesaplayıp tablolara yazar. Aynı ay başka
+    bir süreçte (rapor işi) hesaplanıyorsa onun sonucu beklenir ve paylaşılır.
+    """
+    from .report_jobs import calculate_monthly_summary_once  # report_jobs bu modülü import eder
+
+    start_date, end_date = month_bounds(year, month)
+    (monthly_list, missing_list, order_list), shared = calculate_monthly_summary_once(
+        start_date, end_date, source=source,
+    )
+    if shared:
+        # Lider (rapor işi veya başka bir yenileme) ayı zaten materyalize etti
+        return _covered_month_keys(start_date, end_date)
+    return materialize_summary(start_date, end_date, monthly_list, missing_list, order_list)
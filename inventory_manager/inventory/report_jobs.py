@@ -0,0 +1,238 @@
+"""
+/trendyol-profit/ raporu için kalıcı arka plan işleri.
+
+View yalnızca ReportJob kaydı açar ve hemen döner; hesaplamayı
+`python manage.py run_report_jobs` worker'ı yapar. İlerleme (aşama, biten
+periyot/fatura sayısı) iş kaydına yazılır, sonuç JSON olarak saklanır; sayfa
+yenilendiğinde veya link paylaşıldığında tekrar hesaplanmaz. Tamamlanan
+işler kapsadıkları ayları MonthlyProfitSummary tablolarına da yazar.
+"""
+import datetime
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ReportJob
+from .profit_summary import materialize_summary
+from .singleflight import single_flight
+from .tracing import start_trace
+from .trendyol_integration import calculate_monthly_summary
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_monthly_summary(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    source: str = "auto",
+    force: bool = False,
+) -> ReportJob:
+    """
+    Aralık için rapor işi döner.
+
+    Aynı parametrelerle sırada/çalışan bir iş varsa o döner. Son
+    REPORT_JOB_REUSE_SECONDS içinde tamamlanmış bir iş varsa (force=False) o döner.
+    Aksi halde yeni iş sıraya eklenir.
+    """
+    jobs = ReportJob.objects.filter(start_date=start_date, end_date=end_date, source=source)
+    active = jobs.filter(status__in=[ReportJob.STATUS_QUEUED, ReportJob.STATUS_RUNNING]).first()
+    if active:
+        return active
+    if not force:
+        reuse_after = timezone.now() - datetime.timedelta(
+            seconds=getattr(settings, "REPORT_JOB_REUSE_SECONDS", 6 * 3600)
+        )
+        done = jobs.filter(status=ReportJob.STATUS_DONE, finished_at__gte=reuse_after).first()
+        if done:
+            return done
+    job = ReportJob.objects.create(start_date=start_date, end_date=end_date, source=source)
+    logger.info(f"Rapor işi #{job.pk} sıraya eklendi: {start_date.date()} - {end_date.date()}")
+    return job
+
+
+class _JobProgress:
+    """calculate_monthly_summary progress callback'i; DB'ye en fazla saniyede bir yazar."""
+
+    PHASE_FIELDS = {
+        "settlements": ("periods_done", "periods_total"),
+        "cargo_items": ("serials_done", "serials_total"),
+    }
+
+    def __init__(self, job: ReportJob, min_interval: float = 1.0) -> None:
+        self.job = job
+        self.min_interval = min_interval
+        self._last_phase = None
+        self._last_write = 0.0
+
+    def __call__(self, phase: str, done: int, total: int) -> None:
+        fields: Dict[str, Any] = {"phase": phase}
+        if phase in self.PHASE_FIELDS:
+            done_field, total_field = self.PHASE_FIELDS[phase]
+            fields[done_field] = done
+            fields[total_field] = total
+
+        now = time.monotonic()
+        if phase == self._last_phase and done != total and now - self._last_write < self.min_interval:
+            return
+        self._last_phase = phase
+        self._last_write = now
+        ReportJob.objects.filter(pk=self.job.pk).update(**fields)
+
+
+def serialize_result(monthly_summary, missing_barcodes, order_details) -> Dict[str, Any]:
+    return {
+        "monthly_summary": monthly_summary,
+        "missing_barcodes": missing_barcodes,
+        "order_details": order_details,
+    }
+
+
+def deserialize_result(result: Optional[Dict[str, Any]]) -> tuple:
+    """Saklanan sonucu (monthly_summary, missing_barcodes, order_details) olarak döner."""
+    if not result:
+        return [], [], []
+    order_details = result.get("order_details") or []
+    for order in order_details:
+        # DjangoJSONEncoder tarihleri ISO string olarak yazar
+        if isinstance(order.get("transactionDate"), str):
+            order["transactionDate"] = datetime.datetime.fromisoformat(order["transactionDate"])
+    return result.get("monthly_summary") or [], result.get("missing_barcodes") or [], order_details
+
+
+def summary_flight_key(seller_id: str, start_date: datetime.datetime, end_date: datetime.datetime, source: str) -> str:
+    return f"monthly_summary:{seller_id}:{start_date.isoformat()}:{end_date.isoformat()}:{source}"
+
+
+def calculate_monthly_summary_once(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    source: str = "auto",
+    progress=None,
+    on_wait=None,
+) -> tuple:
+    """
+    calculate_monthly_summary'nin single-flight sarmalı: aynı (satıcı, aralık, kaynak)
+    için başka bir süreçte süren hesaplama varsa yeni tarama başlatmaz, onun
+    sonucunu bekleyip paylaşır. Döner: ((monthly, missing, orders), paylaşıldı mı)
+    """
+    seller_id = settings.TRENDYOL_SUPPLIER_ID
+
+    def compute() -> tuple:
+        summarize = calculate_monthly_summary
+        if getattr(settings, "TRENDYOL_ASYNC_REPORTS", False):
+            # Settlement ve kargo taramaları tek event loop'ta, ortak httpx havuzuyla yürür
+            from .trendyol_async import run_monthly_summary as summarize
+        return summarize(
+            seller_id=seller_id,
+            api_key=settings.TRENDYOL_API_KEY,
+            api_secret=settings.TRENDYOL_API_SECRET,
+            start_date=start_date,
+            end_date=end_date,
+            source=source,
+            store_front_code="TRENDYOLTR",
+            user_agent=f"{seller_id}-OzlemFiratTasdelen",
+            progress=progress,
+        )
+
+    return single_flight(
+        summary_flight_key(seller_id, start_date, end_date, source),
+        compute,
+        encode=lambda value: serialize_result(*value),
+        decode=deserialize_result,
+        on_wait=on_wait,
+    )
+
+
+def run_job(job: ReportJob) -> bool:
+    """
+    Sıradaki işi sahiplenip çalıştırır. Başka bir worker önce sahiplendiyse False döner.
+    """
+    claimed = ReportJob.objects.filter(pk=job.pk, status=ReportJob.STATUS_QUEUED).update(
+        status=ReportJob.STATUS_RUNNING,
+        started_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+    job.refresh_from_db()
+    logger.info(f"Rapor işi #{job.pk} başladı: {job.start_date.date()} - {job.end_date.date()}")
+
+    with start_trace(f"report_job#{job.pk}") as trace:
+        try:
+            (monthly_summary, missing_barcodes, order_details), shared = calculate_monthly_summary_once(
+                job.start_date,
+                job.end_date,
+                source=job.source,
+                progress=_JobProgress(job),
+                on_wait=lambda flight: ReportJob.objects.filter(pk=job.pk).update(phase="coalesced"),
+            )
+            # Tamamen kapsanan aylar /trendyol-profit/ sayfasının okuduğu tablolara da yazılır
+            # (paylaşılan sonuçta lider zaten yazdı)
+            if not shared:
+                materialize_summary(job.start_date, job.end_date, monthly_summary, missing_barcodes, order_details)
+        except Exception as e:
+            error = e
+        else:
+            error = None
+    logger.info(f"Rapor işi #{job.pk} izi:\n{trace.format_table()}")
+
+    if error is not None:
+        logger.error(f"Rapor işi #{job.pk} hata: {error}", exc_info=error)
+        ReportJob.objects.filter(pk=job.pk).update(
+            status=ReportJob.STATUS_FAILED,
+            error_message=str(error),
+            trace=trace.to_dict(),
+            finished_at=timezone.now(),
+        )
+        return True
+
+    job.refresh_from_db()
+    job.result = serialize_result(monthly_summary, missing_barcodes, order_details)
+    job.trace = trace.to_dict()
+    job.status = ReportJob.STATUS_DONE
+    job.phase = "done"
+    job.finished_at = timezone.now()
+    job.save(update_fields=["result", "trace", "status", "phase", "finished_at"])
+    logger.info(f"Rapor işi #{job.pk} tamamlandı")
+    return True
+
+
+def run_pending_jobs(limit: Optional[int] = None) -> int:
+    """Sıradaki işleri oluşturulma sırasıyla çalıştırır; çalıştırılan iş sayısını döner."""
+    count = 0
+    while limit is None or count < limit:
+        job = ReportJob.objects.filter(status=ReportJob.STATUS_QUEUED).order_by("created_at").first()
+        if job is None:
+            break
+        if run_job(job):
+            count += 1
+    return count
+
+
+def fail_stale_jobs(stale_minutes: int) -> int:
+    """Worker çökmesi sonrası takılı kalan 'running' işleri hata olarak kapatır."""
+    cutoff = timezone.now() - datetime.timedelta(minutes=stale_minutes)
+    return ReportJob.objects.filter(status=ReportJob.STATUS_RUNNING, started_at__lt=cutoff).update(
+        status=ReportJob.STATUS_FAILED,
+        error_message=f"Worker {stale_minutes} dakika içinde bitirmedi",
+        finished_at=timezone.now(),
+    )
+
+
+def job_progress(job: ReportJob) -> Dict[str, Any]:
+    """Progress endpoint'inin döndüğü JSON."""
+    return {
+        "id": job.pk,
+        "status": job.status,
+        "phase": job.phase,
+        "periods_done": job.periods_done,
+        "periods_total": job.periods_total,
+        "serials_done": job.serials_done,
+        "serials_total": job.serials_total,
+        "error": job.error_message,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
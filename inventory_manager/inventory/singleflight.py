@@ -0,0 +1,149 @@
+"""
+Aynı anahtarlı eşzamanlı hesaplamaların tek sefer çalıştırılması (single-flight).
+
+İki kullanıcı aynı ayı aynı anda açtığında, "Şimdi yenile"ye basıldığında veya
+gece yenilemesi bir rapor işiyle çakıştığında aynı aralık için iki tam Trendyol
+taraması başlamasın diye kullanılır. Koordinasyon SingleFlight tablosu
+üzerinden yapılır; bu yüzden farklı worker süreçleri (ve sunucular) arasında da
+çalışır:
+
+- İlk gelen anahtarın satırını oluşturur (unique key) ve hesaplamayı yapar (lider).
+- Sonradan gelenler bekleyen olarak kaydolur, satır tamamlanana kadar yoklar ve
+  liderin sonucunu paylaşır. Sonuç yalnızca bekleyen varsa yazılır ve son bekleyen
+  aldığında silinir; tabloda büyük sonuçlar birikmez.
+- Lider çökerse kira (expires_at) dolunca bekleyenlerden biri devralır.
+"""
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlightError(Exception):
+    """Paylaşılan hesaplama liderde hata ile bitti."""
+
+
+def _owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+def _acquire(key: str, owner: str, lease_seconds: float) -> Tuple[bool, Optional[SingleFlight]]:
+    """Liderliği almayı dener. Döner: (lider mi, lider değilse mevcut uçuş satırı)."""
+    now = timezone.now()
+    expires_at = now + datetime.timedelta(seconds=lease_seconds)
+    try:
+        with transaction.atomic():
+            SingleFlight.objects.create(key=key, owner=owner, started_at=now, expires_at=expires_at)
+        return True, None
+    except IntegrityError:
+        pass
+
+    # Bitmiş ya da kirası dolmuş (lideri çökmüş) uçuş devralınır; koşullu UPDATE
+    # aynı anda devralmaya çalışanlardan yalnızca birini lider yapar
+    taken = (
+        SingleFlight.objects
+        .filter(key=key)
+        .filter(Q(status__in=[SingleFlight.STATUS_DONE, SingleFlight.STATUS_FAILED]) | Q(expires_at__lt=now))
+        .update(owner=owner, status=SingleFlight.STATUS_RUNNING, started_at=now, expires_at=expires_at,
+                finished_at=None, result=None, error_message="")
+    )
+    if taken:
+        return True, None
+    # Hâlâ çalışan uçuşa bekleyen olarak kaydolunur; lider sonucu yazıp yazmayacağına
+    # bu sayaçla karar verir. Uçuş bu arada bittiyse (None) baştan denenir.
+    waiting = (
+        SingleFlight.objects
+        .filter(key=key, status=SingleFlight.STATUS_RUNNING, expires_at__gte=now)
+        .update(waiters=F("waiters") + 1)
+    )
+    if not waiting:
+        return False, None
+    return False, SingleFlight.objects.filter(key=key).first()
+
+
+def _leave(key: str) -> None:
+    """Bekleyen kaydını düşer; son bekleyen çıkınca saklanan sonuç silinir."""
+    SingleFlight.objects.filter(key=key, waiters__gt=0).update(waiters=F("waiters") - 1)
+    SingleFlight.objects.filter(
+        key=key, waiters=0, status=SingleFlight.STATUS_DONE, result__isnull=False
+    ).update(result=None)
+
+
+def single_flight(
+    key: str,
+    compute: Callable[[], T],
+    *,
+    encode: Callable[[T], Any],
+    decode: Callable[[Any], T],
+    on_wait: Optional[Callable[[SingleFlight], None]] = None,
+) -> Tuple[T, bool]:
+    """
+    compute()'u anahtar başına aynı anda en fazla bir kez çalıştırır.
+
+    Bekleyen varsa lider sonucu encode() ile JSON'a çevirip tabloya yazar;
+    bekleyenler decode() ile aynı sonucu alır. Döner: (sonuç, paylaşıldı mı). Liderin hatası
+    bekleyenlerde SingleFlightError olarak yükselir.
+    """
+    lease_seconds = getattr(settings, "SINGLE_FLIGHT_LEASE_SECONDS", 1800)
+    poll_seconds = getattr(settings, "SINGLE_FLIGHT_POLL_SECONDS", 2.0)
+    owner = _owner_id()
+
+    while True:
+        leader, flight = _acquire(key, owner, lease_seconds)
+        if leader:
+            break
+        if flight is None:
+            continue
+        logger.info(f"Aynı hesaplama başka bir süreçte sürüyor, sonucu bekleniyor: {key} ({flight.owner})")
+        if on_wait:
+            on_wait(flight)
+        try:
+            while True:
+                time.sleep(poll_seconds)
+                flight = SingleFlight.objects.filter(key=key).first()
+                if flight is None:
+                    break
+                if flight.status == SingleFlight.STATUS_DONE:
+                    logger.info(f"Paylaşılan hesaplama sonucu alındı: {key}")
+                    return decode(flight.result), True
+                if flight.status == SingleFlight.STATUS_FAILED:
+                    raise SingleFlightError(flight.error_message or f"Paylaşılan hesaplama başarısız: {key}")
+                if flight.expires_at < timezone.now():
+                    logger.warning(f"Hesaplama kirası doldu, devralınıyor: {key} ({flight.owner})")
+                    break
+        finally:
+            _leave(key)
+
+    try:
+        value = compute()
+    except Exception as e:
+        SingleFlight.objects.filter(key=key, owner=owner).update(
+            status=SingleFlight.STATUS_FAILED,
+            error_message=str(e),
+            finished_at=timezone.now(),
+        )
+        raise
+    # Kira dolup başka süreç devraldıysa satır onundur; sonuç yine de bu çağırana döner.
+    # Bekleyen yoksa sonuç hiç yazılmaz; varsa son bekleyen aldığında silinir.
+    mine = SingleFlight.objects.filter(key=key, owner=owner)
+    done = {"status": SingleFlight.STATUS_DONE, "finished_at": timezone.now()}
+    if not mine.filter(waiters=0).update(**done):
+        mine.update(result=encode(value), **done)
+        # Bekleyenler bu arada kirası dolup ayrıldıysa sonuç sahipsiz kalmasın
+        mine.filter(waiters=0).update(result=None)
+    return value, False
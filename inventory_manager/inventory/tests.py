@@ -1,3 +1,1295 @@
-from django.test import TestCase
+import base64
+import datetime
+import email.utils
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.management import call_command
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from requests.auth import HTTPBasicAuth
+
+from .columnar import ColumnarSettlementAccumulator, pandas_available
+from .exports import ExportSource, iter_csv
+from .management.commands import propose_barcode_aliases
+from .models import (
+    AwaitingCargoInvoice, BarcodeMonthlyRollup, CargoInvoice, CargoInvoiceScanDay, ListingComponent,
+    MonthlyProfitSummary, OrderProfitSummary, Product, ProductBarcodeAlias, ProfitCalculator, PurchaseItem,
+    PurchasePriceHistory, ReportJob, SingleFlight, TrendyolSettlement, TrendyolWebhookLog,
+)
+from .money import from_kurus, kurus_to_float, percent_of, ratio_percent, to_kurus
+from .price_history import PurchasePriceIndex
+from .profit_summary import barcode_rollups, month_bounds, page_order_list, page_stored_orders
+from .report_jobs import deserialize_result, enqueue_monthly_summary, fail_stale_jobs, run_job
+from .singleflight import SingleFlightError, _leave, single_flight
+from .tracing import current_trace, span, start_trace
+from .trendyol_client import (
+    FINANCE_BASE_URL, ORDERS_BASE_URL, RateLimiter, ResponseCache, TrendyolClient, _parse_retry_after, get_client,
+)
+from .trendyol_integration import (
+    SettlementAccumulator, _parallel_imap, _parallel_map, _use_local_settlements, advance_awaiting_cargo_invoices,
+    cargo_cost_by_order_from_index, create_pivot_results, load_purchase_prices, settlements_synced_range,
+    summarize_settlements, sync_cargo_invoice_index, sync_settlements,
+)
+
+
+def _synthetic_results(line_count, order_count, seed=42):
+    """match_sales_with_cargo çıktısı biçiminde sentetik satırlar üretir."""
+    rng = random.Random(seed)
+    cargo = {str(n): round(rng.uniform(20, 90), 2) for n in range(order_count) if rng.random() < 0.8}
+    results = []
+    for _ in range(line_count):
+        order_number = str(rng.randrange(order_count))
+        results.append({
+            "barcode": f"BC{rng.randrange(500)}",
+            "orderNumber": order_number,
+            "transactionDate": None,
+            "sellerRevenue": round(rng.uniform(-200, 500), 2),
+            "purchasePrice": round(rng.uniform(0, 150), 2),
+            "shippingFee": cargo.get(order_number, 0.0),
+            "netProfit": 0.0,
+            "cargoFound": order_number in cargo,
+        })
+    return results
+
+
+def _reference_pivot(results):
+    """Eski iç içe döngülü (O(sipariş × satır)) kargo ücreti eşleştirmesi."""
+    pivot_data = {}
+    for result in results:
+        order_number = str(result.get("orderNumber", ""))
+        if order_number not in pivot_data:
+            pivot_data[order_number] = {
+                "transactionDate": result.get("transactionDate"),
+                "items": [],
+                "totalSellerRevenue": 0.0,
+                "totalPurchasePrice": 0.0,
+                "totalShippingFee": 0.0,
+                "cargoFound": False,
+            }
+        pivot_data[order_number]["items"].append({
+            "barcode": result.get("barcode"),
+            "sellerRevenue": result.get("sellerRevenue"),
+            "purchasePrice": result.get("purchasePrice"),
+        })
+        pivot_data[order_number]["totalSellerRevenue"] += float(result.get("sellerRevenue", 0))
+        pivot_data[order_number]["totalPurchasePrice"] += float(result.get("purchasePrice", 0))
+        pivot_data[order_number]["cargoFound"] = result.get("cargoFound", False)
+
+    for order_number, data in pivot_data.items():
+        if data["cargoFound"]:
+            for result in results:
+                if str(result.get("orderNumber", "")) == order_number:
+                    data["totalShippingFee"] = float(result.get("shippingFee", 0))
+                    break
+
+    pivot_results = []
+    for order_number in sorted(pivot_data.keys()):
+        data = pivot_data[order_number]
+        total_net_profit = (
+            data["totalSellerRevenue"] - data["totalPurchasePrice"] - data["totalShippingFee"] - 11
+        )
+        pivot_results.append({
+            "orderNumber": order_number,
+            "transactionDate": data["transactionDate"],
+            "items": data["items"],
+            "itemCount": len(data["items"]),
+            "totalSellerRevenue": round(data["totalSellerRevenue"], 2),
+            "totalPurchasePrice": round(data["totalPurchasePrice"], 2),
+            "totalShippingFee": round(data["totalShippingFee"], 2),
+            "totalNetProfit": round(total_net_profit, 2),
+            "cargoFound": data["cargoFound"],
+        })
+    return pivot_results
+
+
+class CreatePivotResultsTests(SimpleTestCase):
+
+    def test_matches_reference_implementation(self):
+        results = _synthetic_results(line_count=3000, order_count=800)
+        self.assertEqual(create_pivot_results(results), _reference_pivot(results))
+
+    def test_shipping_fee_taken_from_first_line_of_order(self):
+        results = [
+            {"orderNumber": "1", "barcode": "A", "sellerRevenue": 100, "purchasePrice": 40,
+             "shippingFee": 30.0, "cargoFound": True},
+            {"orderNumber": "1", "barcode": "B", "sellerRevenue": 50, "purchasePrice": 10,
+             "shippingFee": 99.0, "cargoFound": True},
+            {"orderNumber": "2", "barcode": "C", "sellerRevenue": 80, "purchasePrice": 20,
+             "shippingFee": 25.0, "cargoFound": False},
+        ]
+        pivot = {row["orderNumber"]: row for row in create_pivot_results(results)}
+        self.assertEqual(pivot["1"]["totalShippingFee"], 30.0)
+        self.assertEqual(pivot["1"]["totalNetProfit"], 59.0)
+        self.assertEqual(pivot["2"]["totalShippingFee"], 0.0)
+
+    @unittest.skipUnless(os.environ.get("RUN_BENCHMARKS"), "RUN_BENCHMARKS=1 ile çalışır")
+    def test_100k_lines_benchmark(self):
+        # Eski O(sipariş × satır) sürüm bu girdide dakikalar sürer; tek geçiş bir saniyenin altındadır
+        results = _synthetic_results(line_count=100_000, order_count=40_000)
+        started = time.perf_counter()
+        pivot = create_pivot_results(results)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(sum(row["itemCount"] for row in pivot), 100_000)
+        self.assertLess(elapsed, 5.0, f"create_pivot_results 100k satır: {elapsed:.2f}s")
+
+
+def _settlement(settlement_id, order_number, barcode, revenue, day, transaction_type="Sale"):
+    # 2026-03-<day> 12:00 UTC, ms
+    return {
+        "id": settlement_id,
+        "orderNumber": order_number,
+        "barcode": barcode,
+        "sellerRevenue": revenue,
+        "transactionType": transaction_type,
+        "transactionDate": 1772366400000 + (day - 1) * 86_400_000,
+    }
+
+
+class SettlementAccumulatorTests(SimpleTestCase):
+
+    def test_duplicate_ids_from_overlapping_pages_are_skipped(self):
+        rng = random.Random(7)
+        records = [
+            _settlement(n, str(rng.randrange(40)), f"BC{rng.randrange(10)}", round(rng.uniform(-50, 300), 2),
+                        rng.randint(1, 28), rng.choice(["Sale", "Sale", "Return"]))
+            for n in range(500)
+        ]
+        records.sort(key=lambda r: r["transactionDate"])
+        # Periyot sınırında aynı kayıtlar iki sayfada birden gelir
+        pages = [records[:260], records[240:]]
+        accumulator = SettlementAccumulator()
+        for page in pages:
+            accumulator.extend(page)
+        cargo = {str(n): 3000 for n in range(0, 40, 3)}
+        prices = {f"BC{n}": n * 500 for n in range(8)}
+
+        self.assertEqual(accumulator.duplicates, 20)
+        self.assertEqual(accumulator.finalize(cargo, prices), summarize_settlements(records, cargo, prices))
+
+    def test_dedup_keeps_only_recent_ids(self):
+        # 90 gün, günde 50 kayıt; her 15 günlük periyodun ilk sayfası önceki periyodun son kayıtlarını tekrarlar
+        records = [_settlement(n, str(n), "A", 10.0, 1) for n in range(4500)]
+        for n, record in enumerate(records):
+            record["transactionDate"] += (n // 50) * 86_400_000 + n
+        accumulator = SettlementAccumulator()
+        largest = 0
+        for start in range(0, 4500, 750):
+            accumulator.extend(records[max(0, start - 25):start + 750])
+            largest = max(largest, len(accumulator._seen_ids))
+
+        self.assertEqual(accumulator.records, 4500)
+        self.assertEqual(accumulator.duplicates, 5 * 25)
+        self.assertLessEqual(largest, 2 * 16 * 50 + 750)
+
+    def test_returns_and_order_costs(self):
+        accumulator = SettlementAccumulator().extend([
+            _settlement(1, "100", "A", 200.0, 3),
+            _settlement(2, "100", "B", 80.0, 3),
+            _settlement(3, "100", "A", -200.0, 10, "Return"),
+            _settlement(4, "101", "X", 50.0, 11),
+        ])
+        monthly, missing, orders = accumulator.finalize({"100": 2500}, {"A": 9000, "B": 3000})
+
+        self.assertEqual(missing, ["X"])
+        self.assertEqual(monthly[0]["purchase_cost"], 30.0)
+        self.assertEqual(monthly[0]["cargo_cost"], 25.0)
+        self.assertEqual(monthly[0]["order_count"], 2)
+        self.assertEqual(monthly[0]["net_profit"], 130.0 - 25.0 - 30.0 - 30.0)
+        order = {row["orderNumber"]: row for row in orders}["100"]
+        self.assertEqual(order["totalPurchasePrice"], 30.0)
+        self.assertEqual(order["totalNetProfit"], 80.0 - 30.0 - 25.0 - 15.0)
+
+    def test_cost_resolved_as_of_transaction_date(self):
+        day = 86_400_000
+        prices = PurchasePriceIndex({"A": 12000}, history={"A": ([1772366400000, 1772366400000 + 4 * day], [9000, 12000])})
+        monthly, _, orders = SettlementAccumulator().extend([
+            _settlement(1, "100", "A", 200.0, 3),
+            _settlement(2, None, "A", 200.0, 4),
+            _settlement(3, "101", "A", 200.0, 7),
+        ]).finalize({}, prices)
+
+        self.assertEqual(monthly[0]["purchase_cost"], 90.0 + 90.0 + 120.0)
+        by_number = {row["orderNumber"]: row for row in orders}
+        self.assertEqual(by_number["100"]["items"][0]["purchasePrice"], 90.0)
+        self.assertEqual(by_number["101"]["totalPurchasePrice"], 120.0)
+        self.assertEqual(prices.price_at("A", 0), 9000)
+        self.assertEqual(prices.price_at("A", None), 12000)
+
+
+@unittest.skipUnless(pandas_available(), "pandas kurulu değil")
+class ColumnarAccumulatorParityTests(SimpleTestCase):
+
+    def test_matches_python_engine(self):
+        rng = random.Random(11)
+        records = []
+        for n in range(20_000):
+            is_return = rng.random() < 0.15
+            records.append(_settlement(
+                n if rng.random() < 0.97 else None,
+                str(rng.randrange(6000)) if rng.random() < 0.98 else None,
+                f"BC{rng.randrange(300)}" if rng.random() < 0.99 else None,
+                round(rng.uniform(-300, -5) if is_return else rng.uniform(5, 700), 2),
+                rng.randint(1, 28),
+                "Return" if is_return else "Sale",
+            ))
+            # Farklı aylar ve tarihi olmayan kayıtlar
+            records[-1]["transactionDate"] += rng.choice([0, 0, 0, 31, 62]) * 86_400_000
+            if rng.random() < 0.005:
+                records[-1]["transactionDate"] = None
+        # API periyotları tarih sırasıyla gelir (tekrar kontrolü penceresi buna dayanır)
+        records.sort(key=lambda r: r["transactionDate"] or 0)
+        pages = [records[i:i + 500] for i in range(0, len(records), 500)]
+        pages.insert(7, records[3000:3500])  # periyot sınırı tekrarı
+        cargo = {str(n): rng.randint(2000, 9000) for n in range(6000) if rng.random() < 0.8}
+        prices = PurchasePriceIndex({f"BC{n}": rng.randint(500, 15000) for n in range(290)})
+        for n in range(0, 290, 7):
+            changes = sorted(rng.sample(range(1772366400000, 1772366400000 + 90 * 86_400_000, 3_600_000), 3))
+            prices.history[f"BC{n}"] = (changes, [rng.randint(500, 15000) for _ in changes])
+
+        python_engine, columnar_engine = SettlementAccumulator(), ColumnarSettlementAccumulator()
+        for page in pages:
+            python_engine.extend(page)
+            columnar_engine.extend(page)
+
+        self.assertEqual(columnar_engine.records, python_engine.records)
+        self.assertEqual(columnar_engine.duplicates, python_engine.duplicates)
+        self.assertEqual(columnar_engine.barcodes, python_engine.barcodes)
+        self.assertEqual(columnar_engine.finalize(cargo, prices), python_engine.finalize(cargo, prices))
+
+    def test_empty_input(self):
+        self.assertEqual(ColumnarSettlementAccumulator().finalize({}, {}), ([], [], []))
+
+
+class SettlementSourceTests(SimpleTestCase):
+
+    def test_auto_uses_local_store_only_inside_synced_range(self):
+        def month(year, number):
+            return datetime.datetime(year, number, 1, tzinfo=datetime.timezone.utc)
+
+        synced = (month(2026, 3), month(2026, 10))
+        with mock.patch("inventory.trendyol_integration.settlements_synced_range", return_value=synced):
+            self.assertTrue(_use_local_settlements("auto", month(2026, 4), month(2026, 5)))
+            self.assertFalse(_use_local_settlements("auto", month(2026, 2), month(2026, 3)))
+            self.assertFalse(_use_local_settlements("auto", month(2026, 9), month(2026, 11)))
+            self.assertTrue(_use_local_settlements("local", month(2026, 2), month(2026, 3)))
+        with mock.patch("inventory.trendyol_integration.settlements_synced_range", return_value=None):
+            self.assertFalse(_use_local_settlements("auto", month(2026, 4), month(2026, 5)))
+
+
+class OrderPageTests(SimpleTestCase):
+
+    def test_cursor_walks_every_order_once_in_sort_order(self):
+        rng = random.Random(3)
+        orders = [
+            {"orderNumber": str(n), "transactionDate": None, "totalNetProfit": round(rng.uniform(-50, 50), 0),
+             "totalShippingFee": 0.0, "cargoFound": n % 4 != 0}
+            for n in range(53)
+        ]
+        seen, cursor = [], None
+        while True:
+            page, cursor, total = page_order_list(orders, sort="profit", cargo_missing=True, cursor=cursor, limit=5)
+            seen.extend(page)
+            if not cursor:
+                break
+
+        self.assertEqual(total, 14)
+        self.assertEqual(len({o["orderNumber"] for o in seen}), 14)
+        self.assertFalse(any(o["cargoFound"] for o in seen))
+        profits = [o["totalNetProfit"] for o in seen]
+        self.assertEqual(profits, sorted(profits, reverse=True))
+
+
+class StoredOrderPageTests(TestCase):
+
+    def setUp(self):
+        base = timezone.make_aware(datetime.datetime(2026, 3, 1, 12))
+        self.orders = []
+        for n in range(11):
+            # Her üç siparişten biri tarihsiz; iki tarihli sipariş aynı anı paylaşır.
+            tx_date = None if n % 3 == 0 else base + datetime.timedelta(hours=min(n, 8))
+            OrderProfitSummary.objects.create(month_key="2026-03", order_number=f"O{n:02d}", transaction_date=tx_date)
+            self.orders.append({"orderNumber": f"O{n:02d}", "transactionDate": tx_date, "cargoFound": False})
+
+    def _walk(self, pager, source, descending):
+        seen, cursor = [], None
+        while True:
+            page, cursor, total = pager(source, sort="date", descending=descending, cursor=cursor, limit=2)
+            seen.extend(o["orderNumber"] for o in page)
+            if not cursor:
+                return seen, total
+
+    def test_orders_without_date_are_paged_like_the_in_memory_list(self):
+        for descending in (True, False):
+            with self.subTest(descending=descending):
+                stored, total = self._walk(page_stored_orders, "2026-03", descending)
+                in_memory, _ = self._walk(page_order_list, self.orders, descending)
+
+                self.assertEqual(total, 11)
+                self.assertEqual(sorted(stored), sorted(o["orderNumber"] for o in self.orders))
+                self.assertEqual(stored, in_memory)
+                undated = ["O09", "O06", "O03", "O00"] if descending else ["O00", "O03", "O06", "O09"]
+                self.assertEqual(stored[-4:] if descending else stored[:4], undated)
+
+
+class BarcodeRollupTests(SimpleTestCase):
+
+    def test_cargo_split_over_sale_lines_preserves_order_total(self):
+        monthly, _, _ = SettlementAccumulator().extend([
+            _settlement(1, "1", "A", 100.0, 3),
+            _settlement(2, "1", "B", 50.0, 3),
+            _settlement(3, "1", "B", 50.0, 3),
+            _settlement(4, "1", "A", -100.0, 5, "Return"),
+        ]).finalize({"1": 1000}, {"A": 4000})
+        rows = {r.barcode: r for r in barcode_rollups("2026-03", monthly[0]["barcodes"])}
+
+        self.assertEqual(rows["A"].units_sold, 1)
+        self.assertEqual(rows["A"].units_returned, 1)
+        self.assertEqual(rows["B"].order_count, 1)
+        self.assertEqual(sum(r.cargo_cost for r in rows.values()), Decimal("10.00"))
+        self.assertEqual(rows["A"].cargo_cost, Decimal("3.34"))
+        self.assertEqual(rows["A"].purchase_cost, Decimal("0.00"))
+        self.assertTrue(rows["B"].cost_missing)
+        self.assertFalse(rows["A"].cost_missing)
+
+    def test_barcode_totals_sum_to_month_totals(self):
+        rng = random.Random(5)
+        records = []
+        for n in range(3000):
+            is_return = rng.random() < 0.15
+            records.append(_settlement(
+                n,
+                str(rng.randrange(900)) if rng.random() < 0.9 else None,  # sipariş no'suz kalemler
+                f"BC{rng.randrange(60)}",
+                round(rng.uniform(-300, -5) if is_return else rng.uniform(5, 700), 2),
+                rng.randint(1, 28),
+                "Return" if is_return else "Sale",
+            ))
+            records[-1]["transactionDate"] += rng.choice([0, 31, 62]) * 86_400_000
+        records.sort(key=lambda r: r["transactionDate"])
+        cargo = {str(n): rng.randint(1000, 9000) for n in range(900) if rng.random() < 0.8}
+        prices = PurchasePriceIndex({f"BC{n}": rng.randint(500, 15000) for n in range(55)})
+        prices.history["BC3"] = ([1772366400000 + 20 * 86_400_000], [777])
+
+        engines = [SettlementAccumulator()]
+        if pandas_available():
+            engines.append(ColumnarSettlementAccumulator())
+        for engine in engines:
+            monthly, _, _ = engine.extend(records).finalize(cargo, prices)
+            self.assertEqual(len(monthly), 3)
+            for month in monthly:
+                rows = barcode_rollups(month["month_key"], month["barcodes"])
+                for field in ("seller_revenue", "purchase_cost", "cargo_cost", "transaction_fee", "net_profit"):
+                    self.assertEqual(sum(getattr(r, field) for r in rows), Decimal(str(month[field])), field)
+                self.assertEqual(
+                    sum(r.units_sold + r.units_returned for r in rows),
+                    sum(1 for r in records if r["transactionDate"] and
+                        datetime.datetime.fromtimestamp(r["transactionDate"] / 1000, datetime.timezone.utc)
+                        .strftime("%Y-%m") == month["month_key"]),
+                )
+
+
+class ExportTests(SimpleTestCase):
+
+    def test_csv_streams_job_result_rows(self):
+        job = ReportJob(result={
+            "monthly_summary": [],
+            "missing_barcodes": ["X1"],
+            "order_details": [{
+                "orderNumber": "100",
+                "transactionDate": "2026-03-03T12:00:00",
+                "items": [{"barcode": "A"}, {"barcode": "B"}, {"barcode": "A"}],
+                "itemCount": 3,
+                "totalSellerRevenue": 280.0,
+                "totalPurchasePrice": 120.5,
+                "totalShippingFee": 0.0,
+                "totalNetProfit": 144.5,
+                "cargoFound": False,
+            }],
+        })
+        lines = list(iter_csv(ExportSource("test", job=job), "orders"))
+
+        self.assertTrue(lines[0].startswith("\ufeffSipariş No,"))
+        self.assertEqual(lines[1], '100,2026-03-03 12:00,3,"A, B",280.00,120.50,0.00,144.50,Yok\r\n')
+        self.assertEqual(list(iter_csv(ExportSource("test", job=job), "missing"))[1], "X1\r\n")
+
+
+@override_settings(TRENDYOL_WEBHOOK_USERNAME="hook", TRENDYOL_WEBHOOK_PASSWORD="secret")
+class TrendyolOrderWebhookTests(TestCase):
+
+    def setUp(self):
+        self.sku = PurchaseItem.objects.create(name="Kutu", purchase_barcode="SKU1", purchase_price=5, quantity=5)
+        for barcode in ("A", "B"):
+            product = Product.objects.create(name=f"Ürün {barcode}", barcode=barcode, purchase_price=10,
+                                             selling_price=20, stock=0)
+            ListingComponent.objects.create(inventory_product=product, purchase_item=self.sku, qty_per_listing=2)
+        telegram = mock.patch("inventory.views.send_telegram_notification", return_value=True)
+        self.telegram = telegram.start()
+        self.addCleanup(telegram.stop)
+
+    def post_order(self, order_number, lines):
+        payload = {"content": [{"orderNumber": order_number, "shipmentPackageStatus": "Created", "lines": [
+            {"barcode": barcode, "quantity": quantity, "orderLineItemStatusName": "Approved"}
+            for barcode, quantity in lines
+        ]}]}
+        return self.client.post(
+            "/notify/inventory/", json.dumps(payload), content_type="application/json",
+            HTTP_AUTHORIZATION="Basic " + base64.b64encode(b"hook:secret").decode(),
+        )
+
+    def test_lines_sharing_a_sku_deduct_in_turn_and_stop_at_zero(self):
+        response = self.post_order("1001", [("A", 1), ("B", 2)])
+
+        self.assertEqual(response.status_code, 200)
+        self.sku.refresh_from_db()
+        self.assertEqual(self.sku.quantity, 0)
+        items = [r["affected_items"][0] for r in response.json()["results"]]
+        self.assertEqual([(i["old_qty"], i["new_qty"], i["deducted"]) for i in items], [(5, 3, 2), (3, 0, 4)])
+        message = self.telegram.call_args[0][0]
+        self.assertIn("Kutu: 5 → 3 (-2)", message)
+        self.assertIn("Kutu: 3 → 0 (-4)", message)
+        self.assertEqual(TrendyolWebhookLog.objects.filter(order_number="1001", processed=True).count(), 2)
+
+    def test_unknown_barcode_is_logged_and_leaves_its_stock_alone(self):
+        response = self.post_order("1002", [("A", 1), ("YOK", 1), ("B", 1)])
+
+        results = response.json()["results"]
+        self.assertEqual([r["success"] for r in results], [True, False, True])
+        self.sku.refresh_from_db()
+        self.assertEqual(self.sku.quantity, 1)
+        failed = TrendyolWebhookLog.objects.get(order_number="1002", barcode="YOK")
+        self.assertFalse(failed.processed)
+        self.assertIn("bulunamadı", failed.error_message)
+
+    def test_failure_mid_order_rolls_back_stock_but_keeps_failure_logs(self):
+        bulk_create = TrendyolWebhookLog.objects.bulk_create
+        calls = []
+
+        def fail_first(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise RuntimeError("log tablosu kilitli")
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(TrendyolWebhookLog.objects, "bulk_create", side_effect=fail_first):
+            response = self.post_order("1003", [("A", 1), ("YOK", 1), ("B", 1)])
+
+        self.assertEqual(response.status_code, 200)
+        self.sku.refresh_from_db()
+        self.assertEqual(self.sku.quantity, 5)
+        logs = TrendyolWebhookLog.objects.filter(order_number="1003").exclude(line_item_status="webhook_received")
+        self.assertEqual(logs.count(), 3)
+        self.assertFalse(logs.filter(success=True).exists())
+        self.assertTrue(all("log tablosu kilitli" in log.error_message for log in logs))
+        self.telegram.assert_not_called()
+
+
+@override_settings(SINGLE_FLIGHT_POLL_SECONDS=0)
+class SingleFlightTests(TestCase):
+    KEY = "monthly_summary:test"
+
+    def run_flight(self, compute=lambda: {"total": 1}):
+        return single_flight(self.KEY, compute, encode=dict, decode=dict)
+
+    def other_leader(self, **fields):
+        now = timezone.now()
+        fields.setdefault("expires_at", now + datetime.timedelta(minutes=30))
+        return SingleFlight.objects.create(key=self.KEY, owner="other", started_at=now, **fields)
+
+    def while_waiting(self, step):
+        """Bekleyenin her yoklamasından önce step(flight) çalışır (diğer süreci taklit eder)."""
+        def sleep(seconds):
+            step(SingleFlight.objects.get(key=self.KEY))
+        return mock.patch("inventory.singleflight.time.sleep", side_effect=sleep)
+
+    def test_leader_computes_and_stores_nothing_without_waiters(self):
+        value, shared = self.run_flight()
+
+        self.assertEqual((value, shared), ({"total": 1}, False))
+        flight = SingleFlight.objects.get(key=self.KEY)
+        self.assertEqual(flight.status, SingleFlight.STATUS_DONE)
+        self.assertIsNone(flight.result)
+
+    def test_leader_stores_result_for_waiters_until_the_last_one_leaves(self):
+        def compute():
+            SingleFlight.objects.filter(key=self.KEY).update(waiters=F("waiters") + 1)
+            return {"total": 2}
+
+        self.run_flight(compute)
+        self.assertEqual(SingleFlight.objects.get(key=self.KEY).result, {"total": 2})
+        _leave(self.KEY)
+        flight = SingleFlight.objects.get(key=self.KEY)
+        self.assertEqual(flight.waiters, 0)
+        self.assertIsNone(flight.result)
+
+    def test_waiter_shares_leader_result_and_is_counted_while_waiting(self):
+        self.other_leader()
+        waiting = []
+
+        def finish(flight):
+            waiting.append(flight.waiters)
+            flight.status, flight.result = SingleFlight.STATUS_DONE, {"total": 3}
+            flight.save()
+
+        compute = mock.Mock()
+        with self.while_waiting(finish):
+            value, shared = self.run_flight(compute)
+
+        self.assertEqual((value, shared), ({"total": 3}, True))
+        compute.assert_not_called()
+        self.assertEqual(waiting, [1])
+        flight = SingleFlight.objects.get(key=self.KEY)
+        self.assertEqual(flight.waiters, 0)
+        self.assertIsNone(flight.result)
+
+    def test_leader_error_reaches_waiters(self):
+        self.other_leader()
+
+        def fail(flight):
+            flight.status, flight.error_message = SingleFlight.STATUS_FAILED, "Trendyol 503"
+            flight.save()
+
+        with self.while_waiting(fail), self.assertRaisesMessage(SingleFlightError, "Trendyol 503"):
+            self.run_flight()
+        self.assertEqual(SingleFlight.objects.get(key=self.KEY).waiters, 0)
+
+    def test_leader_error_marks_flight_failed(self):
+        def compute():
+            raise ValueError("kota doldu")
+
+        with self.assertRaises(ValueError):
+            self.run_flight(compute)
+        flight = SingleFlight.objects.get(key=self.KEY)
+        self.assertEqual(flight.status, SingleFlight.STATUS_FAILED)
+        self.assertEqual(flight.error_message, "kota doldu")
+
+    def test_expired_lease_is_taken_over(self):
+        self.other_leader(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        value, shared = self.run_flight()
+
+        self.assertEqual((value, shared), ({"total": 1}, False))
+        flight = SingleFlight.objects.get(key=self.KEY)
+        self.assertNotEqual(flight.owner, "other")
+        self.assertEqual(flight.status, SingleFlight.STATUS_DONE)
+
+    def test_waiter_takes_over_when_lease_expires_while_waiting(self):
+        self.other_leader()
+
+        def crash(flight):
+            flight.expires_at = timezone.now() - datetime.timedelta(seconds=1)
+            flight.save()
+
+        with self.while_waiting(crash):
+            value, shared = self.run_flight()
+
+        self.assertEqual((value, shared), ({"total": 1}, False))
+        flight = SingleFlight.objects.get(key=self.KEY)
+        self.assertNotEqual(flight.owner, "other")
+        self.assertEqual(flight.waiters, 0)
+
+
+class PurchaseItemPriceHistoryTests(TestCase):
+
+    def setUp(self):
+        self.sku = PurchaseItem.objects.create(name="Kutu", purchase_barcode="SKU1", purchase_price=10, quantity=5)
+        self.product = Product.objects.create(name="İkili Kutu", barcode="BC1", purchase_price=25,
+                                              selling_price=60, stock=3)
+        ListingComponent.objects.create(inventory_product=self.product, purchase_item=self.sku, qty_per_listing=2)
+        self.created_ms = int(self.product.created_at.timestamp() * 1000)
+
+    def test_sku_price_change_moves_listing_cost_as_of_change(self):
+        sku = PurchaseItem.objects.get(pk=self.sku.pk)
+        sku.purchase_price = "12.50"
+        sku.save()
+        sku.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.purchase_price, Decimal("30.00"))
+        self.assertEqual(
+            list(PurchasePriceHistory.objects.filter(barcode="BC1").values_list("purchase_price", flat=True)),
+            [Decimal("25.00"), Decimal("30.00")],
+        )
+        price_map = load_purchase_prices(["BC1"])
+        self.assertEqual(price_map.price_at("BC1", self.created_ms), 2500)
+        self.assertEqual(price_map.price_at("BC1", int(time.time() * 1000) + 1000), 3000)
+
+    def test_new_or_unlinked_sku_leaves_history_alone(self):
+        other = PurchaseItem.objects.create(name="Bant", purchase_barcode="SKU2", purchase_price=3)
+        other.purchase_price = 4
+        other.save()
+
+        self.assertFalse(PurchasePriceHistory.objects.filter(barcode="BC1").exclude(purchase_price=25).exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.purchase_price, Decimal("25.00"))
+
+
+@override_settings(TRENDYOL_CARGO_INVOICE_WORKERS=1, TRENDYOL_CARGO_INDEX_SETTLE_DAYS=2)
+class CargoInvoiceIndexTests(TestCase):
+
+    def setUp(self):
+        today = datetime.datetime.now(tz=datetime.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.days_ago = lambda n: today - datetime.timedelta(days=n)
+        self.deduction_calls, self.item_calls = [], []
+        self.failing_days = set()
+        invoice_ms = int(self.days_ago(30).timestamp() * 1000) + 3_600_000
+        self.deductions = [
+            {"id": "INV1", "transactionType": "Kargo Faturası", "transactionDate": invoice_ms},
+            {"id": "X1", "transactionType": "Reklam Bedeli", "transactionDate": invoice_ms},
+        ]
+
+    def _fetch_deductions(self, *, start_date, end_date, **kwargs):
+        start = datetime.datetime.fromtimestamp(start_date / 1000, tz=datetime.timezone.utc).date()
+        self.deduction_calls.append(start)
+        if start in self.failing_days:
+            raise ConnectionError("deduction page failed")
+        return self.deductions
+
+    def _fetch_items(self, *, invoice_serial_number, **kwargs):
+        self.item_calls.append(invoice_serial_number)
+        return [{"orderNumber": "O1", "amount": "42.50"}, {"orderNumber": "", "amount": "1"}]
+
+    def _sync(self, first_day_ago, last_day_ago):
+        with mock.patch("inventory.trendyol_integration.fetch_deduction_invoices_for_period",
+                        side_effect=self._fetch_deductions), \
+                mock.patch("inventory.trendyol_integration.fetch_cargo_invoice_items_all_pages",
+                           side_effect=self._fetch_items):
+            sync_cargo_invoice_index(seller_id="1", api_key="k", api_secret="s",
+                                     cargo_start=self.days_ago(first_day_ago), cargo_end=self.days_ago(last_day_ago))
+
+    def test_rescan_only_fetches_unscanned_days_and_new_serials(self):
+        self._sync(40, 20)
+        self.assertEqual(self.deduction_calls, [self.days_ago(40).date(), self.days_ago(25).date()])
+        self.assertEqual(self.item_calls, ["INV1"])
+        self.assertEqual(CargoInvoiceScanDay.objects.count(), 21)
+
+        self.deduction_calls.clear()
+        self.item_calls.clear()
+        self._sync(40, 15)
+        self.assertEqual(self.deduction_calls, [self.days_ago(19).date()])
+        self.assertEqual(self.item_calls, [])
+        self.assertEqual(cargo_cost_by_order_from_index(self.days_ago(40), self.days_ago(15)), {"O1": 4250})
+
+    def test_failed_chunk_and_recent_days_are_scanned_again(self):
+        self.failing_days = {self.days_ago(40).date()}
+        self._sync(40, 0)
+        self.assertEqual(CargoInvoiceScanDay.objects.filter(day__lt=self.days_ago(25).date()).count(), 0)
+        self.assertEqual(CargoInvoiceScanDay.objects.latest("day").day, self.days_ago(2).date())
+
+        self.failing_days = set()
+        self.deduction_calls.clear()
+        self._sync(40, 0)
+        self.assertEqual(self.deduction_calls, [self.days_ago(40).date(), self.days_ago(1).date()])
+        self.assertEqual(CargoInvoice.objects.get().item_count, 1)
+
+
+@override_settings(TRENDYOL_SETTLEMENT_INITIAL_DAYS=30)
+class SettlementSyncTests(TestCase):
+
+    T1 = datetime.datetime(2026, 3, 10, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        self.period_starts = []
+
+    def _record(self, settlement_id, revenue, day):
+        tx_ms = int(datetime.datetime(2026, 3, day, 12, tzinfo=datetime.timezone.utc).timestamp() * 1000)
+        return {"id": settlement_id, "transactionType": "Sale", "transactionDate": tx_ms,
+                "orderNumber": f"O{settlement_id}", "barcode": "BC1", "sellerRevenue": revenue}
+
+    def _sync(self, pages, **kwargs):
+        def iter_pages(*, periods, **_):
+            self.period_starts.append(periods[0][0])
+            for page in pages:
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+
+        with mock.patch("inventory.trendyol_integration.iter_settlement_pages", side_effect=iter_pages):
+            return sync_settlements(seller_id="1", api_key="k", api_secret="s", transaction_types=["Sale"],
+                                    recheck_days=3, **kwargs)
+
+    def test_synced_range_moves_forward_and_rechecks_recent_days(self):
+        self._sync([[self._record(1, 100, 1), self._record(2, 50, 8)]], until=self.T1)
+        self.assertEqual(settlements_synced_range(["Sale"]), (self.T1 - datetime.timedelta(days=30), self.T1))
+
+        t2 = self.T1 + datetime.timedelta(days=5)
+        counts = self._sync([[self._record(2, 45, 8)], [self._record(3, 70, 14)]], until=t2)
+
+        self.assertEqual(counts, {"Sale": 2})
+        self.assertEqual(self.period_starts, [
+            self.T1 - datetime.timedelta(days=30),
+            self.T1 - datetime.timedelta(days=3),
+        ])
+        self.assertEqual(settlements_synced_range(["Sale"]), (self.T1 - datetime.timedelta(days=30), t2))
+        self.assertEqual(
+            dict(TrendyolSettlement.objects.values_list("settlement_id", "seller_revenue")),
+            {"1": Decimal("100.00"), "2": Decimal("45.00"), "3": Decimal("70.00")},
+        )
+
+    def test_failed_page_keeps_state_and_backfill_extends_it_back(self):
+        self._sync([[self._record(1, 100, 1)]], until=self.T1)
+        with self.assertRaises(ConnectionError):
+            self._sync([[self._record(2, 50, 12)], ConnectionError("page 2")],
+                       until=self.T1 + datetime.timedelta(days=5))
+        self.assertEqual(settlements_synced_range(["Sale"])[1], self.T1)
+
+        earlier = self.T1 - datetime.timedelta(days=60)
+        self._sync([], initial_start=earlier, until=self.T1 + datetime.timedelta(days=1))
+        self.assertEqual(self.period_starts[-1], earlier)
+        self.assertEqual(settlements_synced_range(["Sale"]), (earlier, self.T1 + datetime.timedelta(days=1)))
+
+
+@override_settings(TRENDYOL_CARGO_INVOICE_WORKERS=1, TRENDYOL_CARGO_INDEX_SETTLE_DAYS=2)
+class AwaitingCargoInvoiceTests(TestCase):
+
+    def setUp(self):
+        self.now = datetime.datetime.now(tz=datetime.timezone.utc)
+        self.settlement_pages, self.deductions = [], []
+
+    def _ms(self, days_ago):
+        return int((self.now - datetime.timedelta(days=days_ago)).timestamp() * 1000)
+
+    def _sale(self, order_number, days_ago, revenue):
+        return {"id": f"S-{order_number}", "transactionType": "Sale", "transactionDate": self._ms(days_ago),
+                "orderNumber": order_number, "barcode": "BC1", "sellerRevenue": revenue}
+
+    def _advance(self):
+        def iter_pages(**kwargs):
+            return iter(self.settlement_pages if kwargs["transaction_types"] == ["Sale"] else [])
+
+        with mock.patch("inventory.trendyol_integration.iter_settlement_pages", side_effect=iter_pages), \
+                mock.patch("inventory.trendyol_integration.fetch_deduction_invoices_for_period",
+                           side_effect=lambda **kwargs: self.deductions), \
+                mock.patch("inventory.trendyol_integration.fetch_cargo_invoice_items_all_pages",
+                           return_value=[{"orderNumber": "O1", "amount": "39.90"}]):
+            return advance_awaiting_cargo_invoices(seller_id="1", api_key="k", api_secret="s", lookback_days=90)
+
+    def test_awaiting_order_is_resolved_once_its_cargo_item_arrives(self):
+        self.settlement_pages = [[self._sale("O1", 10, 120), self._sale("O2", 12, 80)]]
+        counts = self._advance()
+        self.assertEqual(counts, {"added": 2, "resolved": 0, "expired": 0, "awaiting": 2})
+
+        self.settlement_pages = [[self._sale("O1", 10, 120)]]
+        self.deductions = [{"id": "INV1", "transactionType": "Kargo Faturası", "transactionDate": self._ms(1)}]
+        counts = self._advance()
+
+        self.assertEqual((counts["resolved"], counts["awaiting"]), (1, 1))
+        self.assertEqual(list(AwaitingCargoInvoice.objects.values_list("order_number", flat=True)), ["O2"])
+        self.assertEqual(settlements_synced_range()[0].date(), (self.now - datetime.timedelta(days=90)).date())
+
+
+class MoneyTests(SimpleTestCase):
+
+    def test_half_up_rounding_at_half_kurus(self):
+        self.assertEqual(to_kurus("0.005"), 1)
+        self.assertEqual(to_kurus("0.025"), 3)
+        self.assertEqual(to_kurus(1.005), 101)
+        self.assertEqual(to_kurus("12,345"), 1235)
+        self.assertEqual(percent_of(1, 50), 1)
+        self.assertEqual(ratio_percent(1, 8), Decimal("12.50"))
+        self.assertEqual(ratio_percent(1, 3), Decimal("33.33"))
+
+    def test_negative_amounts_round_away_from_zero(self):
+        self.assertEqual(to_kurus("-0.005"), -1)
+        self.assertEqual(to_kurus(-12.344), -1234)
+        self.assertEqual(percent_of(-1, 50), -1)
+        self.assertEqual(from_kurus(-1234), Decimal("-12.34"))
+        self.assertEqual(ratio_percent(-50, 200), Decimal("-25.00"))
+
+    def test_kurus_round_trip(self):
+        for kurus in range(-100_000, 100_000, 7):
+            self.assertEqual(to_kurus(from_kurus(kurus)), kurus)
+            self.assertEqual(to_kurus(kurus_to_float(kurus)), kurus)
+        self.assertEqual(to_kurus(None), 0)
+        self.assertEqual(to_kurus(3), 300)
+
+
+class SaveProfitCalculationTests(TestCase):
+
+    @staticmethod
+    def _float_reference(selling, commution, purchase, shipping, packaging, other, vat_rate):
+        """Kuruş aritmetiğinden önceki float hesap (karşılaştırma için)."""
+        paid_commission = selling * (commution / 100)
+        total_cost = purchase + shipping + packaging + other + paid_commission
+        paid_vat = (selling * (vat_rate / 100)) - (total_cost * (vat_rate / 100))
+        net_profit = selling - total_cost - paid_vat
+        return {
+            "paid_commission": paid_commission,
+            "total_cost": total_cost,
+            "paid_vat": paid_vat,
+            "net_profit": net_profit,
+            "profit_margin": net_profit / selling * 100,
+        }
+
+    def test_fields_match_float_results_within_a_kurus(self):
+        rng = random.Random(17)
+        for n in range(50):
+            inputs = {
+                "selling_price": round(rng.uniform(100, 2000), 2),
+                "commution": round(rng.uniform(0, 25), 2),
+                "purchase_cost": round(rng.uniform(0, 800), 2),
+                "shipping_cost": round(rng.uniform(0, 90), 2),
+                "packaging_cost": round(rng.uniform(0, 20), 2),
+                "other_costs": round(rng.uniform(0, 20), 2),
+                "vat_rate": rng.choice([0, 1, 10, 20]),
+            }
+            self.client.post("/save_profit_calculation/", {"barcode": f"BC{n}", **inputs})
+            saved = ProfitCalculator.objects.get(barcode=f"BC{n}")
+            expected = self._float_reference(
+                inputs["selling_price"], inputs["commution"], inputs["purchase_cost"], inputs["shipping_cost"],
+                inputs["packaging_cost"], inputs["other_costs"], inputs["vat_rate"],
+            )
+            for field, value in expected.items():
+                with self.subTest(barcode=saved.barcode, field=field):
+                    self.assertAlmostEqual(float(getattr(saved, field)), value, delta=0.01)
+
+
+def _http_response(status, data=None, headers=None):
+    """requests.Session.get yerine dönecek gerçek bir requests.Response."""
+    response = requests.Response()
+    response.status_code = status
+    response.url = "https://trendyol.test/"
+    response.headers.update(headers or {})
+    response._content = json.dumps(data if data is not None else {"content": []}).encode("utf-8")
+    return response
+
+
+class TrendyolClientTests(SimpleTestCase):
+
+    def test_endpoints_share_one_authenticated_session(self):
+        client = TrendyolClient(seller_id="42", api_key="key", api_secret="secret", store_front_code="TRENDYOLTR")
+        self.assertEqual(client.session.auth, HTTPBasicAuth("key", "secret"))
+        self.assertEqual(client.session.headers["storeFrontCode"], "TRENDYOLTR")
+        self.assertEqual(client.session.headers["User-Agent"], "42-SelfIntegration")
+
+        with mock.patch.object(client.session, "get", return_value=_http_response(200, {"content": [1]})) as get:
+            self.assertEqual(client.settlements({"page": 0}), {"content": [1]})
+            client.other_financials({"page": 0})
+            client.cargo_invoice_items("INV1", {"page": 0})
+            client.orders({"page": 0})
+
+        self.assertEqual([call.args[0] for call in get.call_args_list], [
+            f"{FINANCE_BASE_URL}/42/settlements",
+            f"{FINANCE_BASE_URL}/42/otherfinancials",
+            f"{FINANCE_BASE_URL}/42/cargo-invoice/INV1/items",
+            f"{ORDERS_BASE_URL}/42/orders",
+        ])
+
+    @override_settings(TRENDYOL_CACHE_ENABLED=False)
+    def test_get_client_reuses_client_per_credentials(self):
+        first = get_client(seller_id="43", api_key="key", api_secret="secret")
+        self.assertIs(get_client(seller_id="43", api_key="key", api_secret="secret"), first)
+        self.assertIsNot(get_client(seller_id="43", api_key="other", api_secret="secret"), first)
+
+
+class ParallelImapTests(SimpleTestCase):
+
+    def test_results_stream_in_input_order_with_bounded_lookahead(self):
+        lock = threading.Lock()
+        started, running, peak = [], [0], [0]
+
+        def work(n):
+            with lock:
+                started.append(n)
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.002 * (10 - n))
+            with lock:
+                running[0] -= 1
+            if n == 4:
+                raise ValueError("page 4")
+            return n * n
+
+        results = _parallel_imap(work, list(range(10)), max_workers=3)
+        first = next(results)
+        self.assertEqual(first, 0)
+        self.assertLessEqual(len(started), 4)
+        rest = list(results)
+
+        self.assertEqual(rest[:3] + rest[4:], [1, 4, 9, 25, 36, 49, 64, 81])
+        self.assertIsInstance(rest[3], ValueError)
+        self.assertLessEqual(peak[0], 3)
+
+
+class ParallelMapTests(SimpleTestCase):
+
+    def test_results_keep_input_order_and_errors_stay_in_place(self):
+        def work(serial):
+            time.sleep(0.001 * (8 - serial))
+            if serial == 5:
+                raise ConnectionError("INV5")
+            return [serial]
+
+        for max_workers in (1, 4):
+            with self.subTest(max_workers=max_workers):
+                done = []
+                results = _parallel_map(work, list(range(8)), max_workers, done.append)
+
+                self.assertEqual(results[:5] + results[6:], [[0], [1], [2], [3], [4], [6], [7]])
+                self.assertIsInstance(results[5], ConnectionError)
+                self.assertEqual(done, list(range(1, 9)))
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResponseCache(directory.name, immutable_after_days=30, recent_ttl_seconds=600)
+        now_ms = int(time.time() * 1000)
+        self.old = {"startDate": now_ms - 50 * 86_400_000, "endDate": now_ms - 40 * 86_400_000, "page": 0}
+        self.recent = {"startDate": now_ms - 5 * 86_400_000, "endDate": now_ms - 86_400_000, "page": 0}
+
+    def _age_entry(self, endpoint, params, seconds):
+        path = self.cache._path(self.cache._key("1", endpoint, params))
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_old_ranges_and_undated_endpoints_never_expire(self):
+        self.cache.set("1", "settlements", self.old, {"content": ["old"]})
+        self.cache.set("1", "cargo-invoice/INV1/items", {"page": 0}, {"content": ["items"]})
+        self._age_entry("settlements", self.old, 86_400 * 365)
+        self._age_entry("cargo-invoice/INV1/items", {"page": 0}, 86_400 * 365)
+
+        self.assertEqual(self.cache.get("1", "settlements", dict(self.old, supplierId="ignored")), {"content": ["old"]})
+        self.assertEqual(self.cache.get("1", "cargo-invoice/INV1/items", {"page": 0}), {"content": ["items"]})
+        self.assertIsNone(self.cache.get("1", "settlements", dict(self.old, page=1)))
+        self.assertIsNone(self.cache.get("2", "settlements", self.old))
+
+    def test_recent_ranges_expire_after_ttl(self):
+        self.cache.set("1", "settlements", self.recent, {"content": ["recent"]})
+        self.assertEqual(self.cache.get("1", "settlements", self.recent), {"content": ["recent"]})
+
+        self._age_entry("settlements", self.recent, 601)
+        self.assertIsNone(self.cache.get("1", "settlements", self.recent))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "stores": 1, "hit_rate": 0.5})
+
+
+class FakeClock:
+    """time.monotonic / time.sleep yerine: sleep saati ilerletir ve süreleri kaydeder."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def patch(self):
+        return mock.patch.multiple("inventory.trendyol_client.time", monotonic=self.monotonic, sleep=self.sleep)
+
+
+class RateLimiterTests(SimpleTestCase):
+
+    def test_token_bucket_refills_at_rate_up_to_burst(self):
+        clock = FakeClock()
+        with clock.patch():
+            limiter = RateLimiter(rate=2, burst=3)
+            self.assertEqual([limiter.try_acquire("settlements") for _ in range(3)], [0.0, 0.0, 0.0])
+            self.assertAlmostEqual(limiter.try_acquire("settlements"), 0.5)
+            clock.sleep(0.5)
+            self.assertEqual(limiter.try_acquire("settlements"), 0.0)
+            clock.sleep(61)
+            waits = [limiter.try_acquire("orders") for _ in range(4)]
+            self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+            self.assertAlmostEqual(waits[3], 0.5)
+            usage = limiter.usage()["endpoints"]
+
+        self.assertEqual((usage["settlements"]["requests"], usage["settlements"]["last_60s"]), (4, 0))
+        self.assertEqual(usage["orders"]["requests"], 3)
+
+    def test_throttle_pauses_halves_rate_and_recovers_slowly(self):
+        clock = FakeClock()
+        with clock.patch():
+            limiter = RateLimiter(rate=10, burst=10, min_rate=1)
+            limiter.on_throttled("settlements", 5)
+            self.assertEqual(limiter.rate, 5)
+            self.assertAlmostEqual(limiter.try_acquire("settlements"), 5)
+            limiter.acquire("settlements")
+            self.assertEqual(clock.sleeps, [5])
+
+            for _ in range(5):
+                limiter.on_throttled("settlements", 0)
+            self.assertEqual(limiter.rate, 1)
+            limiter.on_success()
+            self.assertAlmostEqual(limiter.rate, 1.5)
+            for _ in range(20):
+                limiter.on_success()
+            self.assertEqual(limiter.rate, 10)
+            self.assertEqual(limiter.usage()["endpoints"]["settlements"]["throttled"], 6)
+
+
+class TrendyolClientRetryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = self.clock.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = RateLimiter(rate=100, burst=100)
+        self.client = TrendyolClient(seller_id="1", api_key="k", api_secret="s", rate_limiter=self.limiter,
+                                     max_retries=3, backoff_base=1.0, backoff_max=30.0)
+
+    def _get(self, *responses):
+        with mock.patch.object(self.client.session, "get", side_effect=list(responses)) as get:
+            try:
+                return self.client.get_json(f"{FINANCE_BASE_URL}/1/settlements", {"page": 0})
+            finally:
+                self.calls = get.call_count
+
+    def test_retry_after_is_honoured_then_jittered_backoff(self):
+        data = self._get(
+            _http_response(429, headers={"Retry-After": "7"}),
+            _http_response(503),
+            _http_response(200, {"content": [{"id": 1}]}),
+        )
+
+        self.assertEqual(data, {"content": [{"id": 1}]})
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.clock.sleeps[0], 7)
+        self.assertTrue(1.0 <= self.clock.sleeps[1] <= 2.0)
+        usage = self.limiter.usage()["endpoints"]["settlements"]
+        self.assertEqual((usage["throttled"], usage["retries"], usage["errors"]), (1, 2, 0))
+
+    def test_connection_errors_retry_until_max_retries_then_raise(self):
+        with self.assertRaises(requests.ConnectionError):
+            self._get(*[requests.ConnectionError("reset")] * 4)
+
+        self.assertEqual(self.calls, 4)
+        for attempt, delay in enumerate(self.clock.sleeps):
+            self.assertTrue(2 ** attempt / 2 <= delay <= 2 ** attempt)
+        self.assertEqual(self.limiter.usage()["endpoints"]["settlements"]["errors"], 1)
+
+    def test_client_errors_are_not_retried(self):
+        with self.assertRaises(requests.HTTPError):
+            self._get(_http_response(404), _http_response(200))
+        self.assertEqual((self.calls, self.clock.sleeps), (1, []))
+
+    def test_backoff_is_capped_and_retry_after_accepts_http_dates(self):
+        self.assertTrue(all(15.0 <= self.client._backoff(10) <= 30.0 for _ in range(50)))
+        retry_at = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(seconds=30)
+        self.assertAlmostEqual(_parse_retry_after(email.utils.format_datetime(retry_at)), 30, delta=2)
+        self.assertEqual(_parse_retry_after("-3"), 0.0)
+        self.assertIsNone(_parse_retry_after("soon"))
+
+
+class ProposeBarcodeAliasesCommandTests(TestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Kupa", barcode="ABC-123", purchase_price=10, selling_price=30,
+                                              stock=5)
+        Product.objects.create(name="Tabak", barcode="TBK-9", purchase_price=10, selling_price=30, stock=5)
+        for n, barcode in enumerate(["abc123", "tbk9"]):
+            TrendyolSettlement.objects.create(settlement_id=f"S{n}", sync_type="Sale", transaction_type="Satış",
+                                              transaction_date=timezone.now(), barcode=barcode)
+
+    def test_apply_reports_only_rows_actually_created(self):
+        real_propose = propose_barcode_aliases.propose_aliases
+
+        def propose_while_another_run_applies(barcodes):
+            # Öneriler hesaplanırken başka bir çalıştırma "abc123"ü eşlemiş olsun
+            ProductBarcodeAlias.objects.create(product=self.product, barcode="abc123", note="elle")
+            return real_propose(barcodes)
+
+        out = io.StringIO()
+        with mock.patch.object(propose_barcode_aliases, "propose_aliases",
+                               side_effect=propose_while_another_run_applies):
+            call_command("propose_barcode_aliases", "--apply", stdout=out)
+
+        self.assertIn("2 eksik barkod, 2 öneri", out.getvalue())
+        self.assertIn("✅ 1 barkod eşlemesi kaydedildi", out.getvalue())
+        self.assertIn("1 barkod zaten eşlenmişti", out.getvalue())
+        self.assertEqual(ProductBarcodeAlias.objects.get(barcode="abc123").note, "elle")
+        self.assertEqual(ProductBarcodeAlias.objects.get(barcode="tbk9").note, "Önerildi: biçim farkı")
+
+
+class ReportJobQueueTests(TestCase):
+
+    def setUp(self):
+        self.start, self.end = month_bounds(2026, 3)
+
+    def test_enqueue_reuses_queued_running_and_recent_jobs(self):
+        job = enqueue_monthly_summary(self.start, self.end)
+        self.assertEqual(enqueue_monthly_summary(self.start, self.end), job)
+
+        ReportJob.objects.filter(pk=job.pk).update(status=ReportJob.STATUS_RUNNING, started_at=timezone.now())
+        self.assertEqual(enqueue_monthly_summary(self.start, self.end, force=True), job)
+        self.assertNotEqual(enqueue_monthly_summary(self.start, self.end, source="api"), job)
+
+        ReportJob.objects.filter(pk=job.pk).update(status=ReportJob.STATUS_DONE, finished_at=timezone.now())
+        self.assertEqual(enqueue_monthly_summary(self.start, self.end), job)
+        forced = enqueue_monthly_summary(self.start, self.end, force=True)
+        self.assertNotEqual(forced, job)
+        self.assertEqual(forced.status, ReportJob.STATUS_QUEUED)
+
+    @override_settings(REPORT_JOB_REUSE_SECONDS=60)
+    def test_old_done_and_failed_jobs_are_not_reused(self):
+        old = ReportJob.objects.create(start_date=self.start, end_date=self.end, status=ReportJob.STATUS_DONE,
+                                       finished_at=timezone.now() - datetime.timedelta(minutes=5))
+        failed = ReportJob.objects.create(start_date=self.start, end_date=self.end, status=ReportJob.STATUS_FAILED,
+                                          finished_at=timezone.now())
+        self.assertNotIn(enqueue_monthly_summary(self.start, self.end), (old, failed))
+
+    def test_fail_stale_jobs_closes_only_long_running_jobs(self):
+        now = timezone.now()
+        stale = ReportJob.objects.create(start_date=self.start, end_date=self.end, status=ReportJob.STATUS_RUNNING,
+                                         started_at=now - datetime.timedelta(minutes=45))
+        fresh = ReportJob.objects.create(start_date=self.start, end_date=self.end, status=ReportJob.STATUS_RUNNING,
+                                         started_at=now - datetime.timedelta(minutes=5))
+        queued = ReportJob.objects.create(start_date=self.start, end_date=self.end)
+
+        self.assertEqual(fail_stale_jobs(30), 1)
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ReportJob.STATUS_FAILED)
+        self.assertIn("30 dakika", stale.error_message)
+        self.assertIsNotNone(stale.finished_at)
+        self.assertEqual(ReportJob.objects.get(pk=fresh.pk).status, ReportJob.STATUS_RUNNING)
+        self.assertEqual(ReportJob.objects.get(pk=queued.pk).status, ReportJob.STATUS_QUEUED)
+        self.assertIn(enqueue_monthly_summary(self.start, self.end), (fresh, queued))
+
+
+class ReportJobRunTests(TestCase):
+
+    def setUp(self):
+        self.records = [
+            _settlement(1, "1", "A", 200.0, 3),
+            _settlement(2, "1", "B", 80.0, 3),
+            _settlement(3, "2", "A", 200.0, 9),
+            _settlement(4, "2", "A", -200.0, 12, "Return"),
+            _settlement(5, None, "B", 40.0, 20),
+        ]
+        self.result = summarize_settlements(self.records, {"1": 2500}, PurchasePriceIndex({"A": 9000}))
+
+    def _run(self, start, end):
+        job = enqueue_monthly_summary(start, end)
+        with mock.patch("inventory.report_jobs.calculate_monthly_summary", return_value=self.result) as summarize:
+            self.assertTrue(run_job(job))
+        self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        return job, summarize
+
+    def test_finished_job_materializes_fully_covered_month(self):
+        job, summarize = self._run(*month_bounds(2026, 3))
+
+        self.assertEqual((job.status, job.phase), (ReportJob.STATUS_DONE, "done"))
+        self.assertEqual(summarize.call_count, 1)
+        month = MonthlyProfitSummary.objects.get(month_key="2026-03")
+        expected = self.result[0][0]
+        self.assertEqual(month.net_profit, Decimal(str(expected["net_profit"])))
+        self.assertEqual(month.order_count, expected["order_count"])
+        self.assertEqual(month.missing_barcodes, ["B"])
+        self.assertEqual(
+            sorted(OrderProfitSummary.objects.filter(month_key="2026-03").values_list("order_number", flat=True)),
+            ["1", "2"],
+        )
+        self.assertEqual(BarcodeMonthlyRollup.objects.filter(month_key="2026-03").count(), 2)
+        self.assertEqual(deserialize_result(job.result)[0][0]["month_key"], "2026-03")
+
+    def test_finished_job_stores_its_trace(self):
+        job, _ = self._run(*month_bounds(2026, 3))
+
+        self.assertEqual(job.trace["name"], f"report_job#{job.pk}")
+        rows = {row["name"]: row for row in job.trace["summary"]}
+        self.assertEqual((rows["db.materialize"]["count"], rows["db.materialize"]["records"]), (1, 2))
+
+    def test_partially_covered_month_is_not_materialized(self):
+        start, end = month_bounds(2026, 3)
+        job, _ = self._run(start + datetime.timedelta(days=1), end)
+
+        self.assertEqual(job.status, ReportJob.STATUS_DONE)
+        self.assertFalse(MonthlyProfitSummary.objects.exists())
+        self.assertFalse(OrderProfitSummary.objects.exists())
+
+
+@override_settings(REPORT_RANGE_MAX_ENQUEUE=5)
+class ProfitRangeViewTests(TestCase):
+
+    URL = "/trendyol-profit/range/?year=2025"
+
+    def setUp(self):
+        session = self.client.session
+        session["is_logged_in"] = True
+        session.save()
+        MonthlyProfitSummary.objects.create(month_key="2025-06", month_label="Haziran 2025",
+                                            refreshed_at=timezone.now())
+
+    def _queued_months(self):
+        return sorted(job.start_date.strftime("%Y-%m") for job in ReportJob.objects.all())
+
+    def test_get_lists_missing_months_without_queueing_jobs(self):
+        response = self.client.get(self.URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ReportJob.objects.exists())
+        self.assertEqual(len(response.context["missing_months"]), 23)
+        self.assertNotIn("2025-06", response.context["missing_months"])
+        self.assertIn("2024-06", response.context["missing_months"])
+        self.assertEqual(response.context["pending_months"], [])
+
+    def test_post_queues_newest_missing_months_up_to_the_cap(self):
+        response = self.client.post(self.URL)
+        self.assertRedirects(response, self.URL, fetch_redirect_response=False)
+        self.assertEqual(self._queued_months(), ["2025-08", "2025-09", "2025-10", "2025-11", "2025-12"])
+
+        # Sıradaki işler tekrar açılmaz; en yeni eksik aylarla devam edilir (2025-06 materyalize)
+        self.client.post(self.URL)
+        self.assertEqual(self._queued_months()[:5], ["2025-02", "2025-03", "2025-04", "2025-05", "2025-07"])
+
+        response = self.client.get(self.URL)
+        self.assertEqual(len(response.context["pending_months"]), 10)
+        self.assertEqual(len(response.context["missing_months"]), 13)
+        self.assertEqual(ReportJob.objects.count(), 10)
+
+
+class TracingTests(SimpleTestCase):
+
+    def test_span_without_trace_records_nothing(self):
+        with span("settlements") as current:
+            current.set(records=5)
+            current.add("retries")
+        self.assertIsNone(current_trace())
+
+    def test_nested_and_worker_spans_are_summed_per_name(self):
+        def fetch(n):
+            with span("http.settlements", records=n, bytes=100):
+                return n
+
+        with start_trace("report") as trace:
+            with span("settlements") as outer:
+                _parallel_map(fetch, [1, 2, 3], max_workers=3)
+                outer.add("retries", 2)
+        rows = {row["name"]: row for row in trace.to_dict()["summary"]}
+
+        self.assertEqual(trace.to_dict()["span_count"], 4)
+        self.assertEqual(rows["http.settlements"]["parent"], "settlements")
+        self.assertEqual((rows["http.settlements"]["count"], rows["http.settlements"]["records"]), (3, 6))
+        self.assertEqual(rows["http.settlements"]["bytes"], 300)
+        self.assertEqual(rows["settlements"]["retries"], 2)
+        self.assertIn("http.settlements", trace.format_table())
+
+    def test_client_http_span_counts_retries_and_records(self):
+        clock = FakeClock()
+        client = TrendyolClient(seller_id="1", api_key="k", api_secret="s", max_retries=2)
+        responses = [_http_response(502), _http_response(200, {"content": [{"id": 1}, {"id": 2}]})]
+        with clock.patch(), mock.patch.object(client.session, "get", side_effect=responses), \
+                start_trace("client") as trace:
+            client.settlements({"page": 0})
+        row = {row["name"]: row for row in trace.summary()}["http.settlements"]
+
+        self.assertEqual((row["retries"], row["records"], row["parent"]), (1, 2, "trendyol.settlements"))
+        self.assertGreater(row["bytes"], 0)
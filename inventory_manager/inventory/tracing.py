@@ -0,0 +1,152 @@
+"""
+Trendyol kâr raporu hattı için hafif span izleme.
+
+    with start_trace("calculate_monthly_summary") as trace:
+        with span("settlements") as s:
+            ...
+            s.set(records=len(rows))
+    trace.summary()
+
+Aktif iz contextvars ile taşınır; _parallel_map worker'larına da kopyalanır.
+İz yokken span() hiçbir şey kaydetmez, maliyeti bir contextvar okumasıdır.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+# Sayısal özellikler özet tabloda toplanır
+SUMMED_ATTRS = ("bytes", "records", "retries", "cache_hits", "cache_misses")
+
+
+class Span:
+    __slots__ = ("name", "parent", "started", "duration", "attrs")
+
+    def __init__(self, name: str, parent: Optional[str]) -> None:
+        self.name = name
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.attrs: Dict[str, Any] = {}
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, name: str, value: float = 1) -> None:
+        self.attrs[name] = self.attrs.get(name, 0) + value
+
+
+class Trace:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Span adına göre toplanmış tablo (ilk başlama sırasıyla)."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.started)
+        rows: Dict[str, Dict[str, Any]] = {}
+        for s in spans:
+            row = rows.get(s.name)
+            if row is None:
+                row = rows[s.name] = {
+                    "name": s.name,
+                    "parent": s.parent,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    **{attr: 0 for attr in SUMMED_ATTRS},
+                }
+            ms = s.duration * 1000
+            row["count"] += 1
+            row["total_ms"] += ms
+            row["max_ms"] = max(row["max_ms"], ms)
+            for attr in SUMMED_ATTRS:
+                row[attr] += s.attrs.get(attr, 0)
+        for row in rows.values():
+            row["avg_ms"] = round(row["total_ms"] / row["count"], 1)
+            row["total_ms"] = round(row["total_ms"], 1)
+            row["max_ms"] = round(row["max_ms"], 1)
+        return list(rows.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "duration_ms": round(self.duration * 1000, 1),
+            "span_count": len(self.spans),
+            "summary": self.summary(),
+        }
+
+    def format_table(self) -> str:
+        """Log / komut çıktısı için düz metin tablo."""
+        lines = [
+            f"{self.name}: {self.duration * 1000:.0f} ms",
+            f"{'span':<28}{'adet':>7}{'toplam ms':>12}{'max ms':>10}{'kayıt':>9}{'bayt':>12}{'retry':>7}{'cache':>9}",
+        ]
+        for row in self.summary():
+            cache = f"{row['cache_hits']}/{row['cache_hits'] + row['cache_misses']}"
+            lines.append(
+                f"{row['name']:<28}{row['count']:>7}{row['total_ms']:>12.1f}{row['max_ms']:>10.1f}"
+                f"{row['records']:>9}{row['bytes']:>12}{row['retries']:>7}{cache:>9}"
+            )
+        return "\n".join(lines)
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trendyol_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trendyol_span", default=None)
+
+
+@contextlib.contextmanager
+def start_trace(name: str) -> Iterator[Trace]:
+    """Yeni bir iz başlatır; blok içindeki (ve kopyalanan context'teki) span'ler buna yazılır."""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace.duration = time.perf_counter() - trace.started
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+class _NullSpan:
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def add(self, name: str, value: float = 1) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Any]:
+    """Aktif ize bir span ekler; aktif iz yoksa no-op."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NULL_SPAN
+        return
+    parent = _current_span.get()
+    current = Span(name, parent.name if parent else None)
+    current.attrs.update(attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.started
+        _current_span.reset(token)
+        trace._record(current)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
@@ -0,0 +1,718 @@
+"""
+Trendyol finance/order API için asyncio tabanlı istemci.
+
+trendyol_integration'daki fetch_* fonksiyonlarının async karşılıklarını sunar.
+Tüm istekler tek bir httpx.AsyncClient bağlantı havuzundan geçer; eşzamanlılık
+asyncio.gather + Semaphore ile sınırlanır. Rate limiter, retry politikası, disk
+önbelleği ve endpoint yolları senkron istemciyle aynı BaseTrendyolClient'tan gelir;
+burada yalnızca httpx taşıması vardır.
+
+TRENDYOL_ASYNC_REPORTS=True iken rapor işleri (report_jobs) run_monthly_summary
+üzerinden bu sürümle hesaplanır.
+
+DB okuma/yazmaları (kargo indeksi, settlement deposu, alış fiyatları) senkron
+yardımcı fonksiyonlar üzerinden sync_to_async ile yapılır; böylece iki sürüm
+aynı veriyi üretir.
+"""
+import asyncio
+import datetime
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+
+from .trendyol_client import (
+    FINANCE_BASE_URL,
+    ORDERS_BASE_URL,
+    BaseTrendyolClient,
+    RateLimiter,
+    ResponseCache,
+    _endpoint_name,
+    get_rate_limiter,
+    get_response_cache,
+)
+from .columnar import make_settlement_accumulator
+from .tracing import span
+from .trendyol_integration import (
+    SETTLEMENT_TYPES,
+    _pending_cargo_serials,
+    _plan_deduction_scan,
+    _settlements_page_params,
+    _split_into_15day_periods,
+    _store_cargo_invoice_items,
+    _store_deduction_chunk,
+    _use_local_settlements,
+    cargo_cost_by_order_from_index,
+    iter_local_settlements,
+    load_purchase_prices,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTrendyolClient(BaseTrendyolClient):
+    """
+    httpx.AsyncClient üzerinde bağlantı havuzlu Trendyol istemcisi.
+    Retry kararları, rate limiter ve önbellek BaseTrendyolClient'tan gelir;
+    endpoint metotları (settlements, orders...) await edilecek coroutine döner.
+    """
+
+    def __init__(
+        self,
+        *,
+        seller_id: str,
+        api_key: str,
+        api_secret: str,
+        store_front_code: str = "TRENDYOLTR",
+        user_agent: Optional[str] = None,
+        base_url: str = FINANCE_BASE_URL,
+        orders_base_url: str = ORDERS_BASE_URL,
+        max_connections: Optional[int] = None,
+        timeout: int = 30,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ) -> None:
+        super().__init__(
+            seller_id=seller_id,
+            base_url=base_url,
+            orders_base_url=orders_base_url,
+            cache=cache,
+            rate_limiter=rate_limiter,
+            max_retries=max_retries,
+            backoff_base=backoff_base,
+            backoff_max=backoff_max,
+        )
+        if max_connections is None:
+            max_connections = getattr(settings, "TRENDYOL_HTTP_POOL_MAXSIZE", 16)
+
+        self.http = httpx.AsyncClient(
+            auth=(api_key, api_secret),
+            headers={
+                "User-Agent": user_agent or f"{seller_id}-SelfIntegration",
+                "storeFrontCode": store_front_code,
+                "Content-Type": "application/json",
+            },
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """TrendyolClient.get_json'ın async karşılığı (aynı retry politikası)."""
+        endpoint = _endpoint_name(url)
+        attempt = 0
+        with span(f"http.{endpoint}") as trace_span:
+            while True:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire_async(endpoint)
+                try:
+                    response = await self.http.get(url, params=params)
+                except httpx.TransportError as e:
+                    delay = self._error_delay(endpoint, attempt, e)
+                    if delay is None:
+                        raise
+                else:
+                    delay = self._response_delay(endpoint, attempt, response, trace_span)
+                    if delay is None:
+                        return self._response_json(response, trace_span)
+                self._count_retry(endpoint, trace_span)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def cached_get_json(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Finance endpoint'i için önbellekli GET; disk erişimi thread'de yapılır."""
+        with span(f"trendyol.{_endpoint_name('/' + endpoint)}") as trace_span:
+            data = await asyncio.to_thread(self._cache_get, endpoint, params, trace_span)
+            if data is None:
+                data = await self.get_json(self._finance_url(endpoint), params)
+                await asyncio.to_thread(self._cache_set, endpoint, params, data)
+            return data
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+# httpx.AsyncClient oluşturulduğu event loop'a bağlıdır; havuz loop başına tutulur
+_async_clients: Dict[Tuple, AsyncTrendyolClient] = {}
+
+
+def get_async_client(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+    orders_base_url: str = ORDERS_BASE_URL,
+) -> AsyncTrendyolClient:
+    """Çalışan event loop'ta aynı kimlik bilgileri için tek bir AsyncTrendyolClient döner."""
+    loop = asyncio.get_running_loop()
+    for key in [k for k in _async_clients if k[0] is not loop and k[0].is_closed()]:
+        del _async_clients[key]
+
+    key = (loop, seller_id, api_key, api_secret, store_front_code, user_agent, base_url, orders_base_url)
+    client = _async_clients.get(key)
+    if client is None:
+        client = AsyncTrendyolClient(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+            orders_base_url=orders_base_url,
+            cache=get_response_cache(),
+            rate_limiter=get_rate_limiter(),
+        )
+        _async_clients[key] = client
+    return client
+
+
+async def close_async_clients() -> None:
+    """Çalışan event loop'a ait istemcileri kapatır (loop kapanmadan önce çağrılmalı)."""
+    loop = asyncio.get_running_loop()
+    for key in [k for k in _async_clients if k[0] is loop]:
+        await _async_clients.pop(key).aclose()
+
+
+AsyncProgressCallback = Callable[[str, int, int], Awaitable[None]]
+
+
+def _async_progress(progress) -> Optional[AsyncProgressCallback]:
+    """Senkron progress callback'ini (ReportJob'a yazar) DB thread'inde çağıran sarmal."""
+    if progress is None:
+        return None
+    return sync_to_async(progress)
+
+
+async def _gather_limited(
+    fn: Callable[[Any], Awaitable[Any]],
+    items: List[Any],
+    limit: Optional[int] = None,
+    on_done: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> List[Any]:
+    """
+    _parallel_map'in async karşılığı: en fazla `limit` eşzamanlı coroutine.
+    Sonuçlar girdi sırasıyla döner; hata veren elemanın yerine exception nesnesi konur.
+    on_done(tamamlanan_sayısı) her eleman bittikçe await edilir.
+    """
+    if limit is None:
+        limit = getattr(settings, "TRENDYOL_ASYNC_CONCURRENCY", 8)
+    semaphore = asyncio.Semaphore(max(1, limit))
+    done = 0
+
+    async def _run(item):
+        nonlocal done
+        async with semaphore:
+            try:
+                return await fn(item)
+            finally:
+                done += 1
+                if on_done is not None:
+                    await on_done(done)
+
+    return await asyncio.gather(*(_run(item) for item in items), return_exceptions=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# FETCH — trendyol_integration.fetch_* karşılıkları
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def fetch_settlements(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    start_date: int,
+    end_date: int,
+    transaction_type: str = "Sale",
+    page: int = 0,
+    size: int = 500,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+) -> Dict[str, Any]:
+    params = {
+        "startDate": start_date,
+        "endDate": end_date,
+        "transactionType": transaction_type,
+        "page": page,
+        "size": size,
+    }
+    client = get_async_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+    return await client.settlements(params)
+
+
+async def fetch_other_financials(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    start_date: int,
+    end_date: int,
+    transaction_type: str,
+    page: int = 0,
+    size: int = 500,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+) -> Dict[str, Any]:
+    params = {
+        "startDate": start_date,
+        "endDate": end_date,
+        "transactionType": transaction_type,
+        "page": page,
+        "size": size,
+    }
+    client = get_async_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+    return await client.other_financials(params)
+
+
+async def fetch_cargo_invoice_items(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    invoice_serial_number: str,
+    page: int = 0,
+    size: int = 500,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+) -> Dict[str, Any]:
+    client = get_async_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+    return await client.cargo_invoice_items(invoice_serial_number, {"page": page, "size": size})
+
+
+async def fetch_order_by_number(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    order_number: str,
+    start_date_ms: Optional[int] = None,
+    end_date_ms: Optional[int] = None,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    orders_base_url: str = ORDERS_BASE_URL,
+) -> Dict[str, Any]:
+    """Sipariş paketini orderNumber ile çeker (Orders API ~1 ay geriye bakar)."""
+    params: Dict[str, Any] = {"orderNumber": order_number}
+    if start_date_ms is not None:
+        params["startDate"] = start_date_ms
+    if end_date_ms is not None:
+        params["endDate"] = end_date_ms
+    client = get_async_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        orders_base_url=orders_base_url,
+    )
+    return await client.orders(params)
+
+
+async def iter_settlement_pages(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    periods: List[tuple],
+    transaction_types: List[str],
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+    concurrency: Optional[int] = None,
+    progress: Optional[AsyncProgressCallback] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Periyotların settlement sayfalarını geldikçe üretir (periyot, sonra sayfa sırasıyla).
+    0. sayfalar ve kalan sayfalar `concurrency`'lik gruplar halinde eşzamanlı çekilir;
+    bellekte en fazla bir grup sayfa bekler.
+    progress verilirse her periyot bittikçe ("settlements", biten, toplam) bildirilir.
+    """
+    client = get_async_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+    if concurrency is None:
+        concurrency = getattr(settings, "TRENDYOL_ASYNC_CONCURRENCY", 8)
+    batch = max(1, concurrency)
+
+    async def _fetch_page(period: tuple, page: int) -> Dict[str, Any]:
+        return await client.settlements(_settlements_page_params(period, transaction_types, page))
+
+    if progress is not None:
+        await progress("settlements", 0, len(periods))
+
+    done = 0
+    for i in range(0, len(periods), batch):
+        period_batch = periods[i:i + batch]
+        first_pages = await _gather_limited(lambda period: _fetch_page(period, 0), period_batch, concurrency)
+        for period, data in zip(period_batch, first_pages):
+            period_start, period_end = period
+            if isinstance(data, Exception):
+                logger.error(f"Periyot {period_start.date()} - {period_end.date()} hata: {data}")
+                raise data
+            content = data.get("content", []) or []
+            total_pages = data.get("totalPages", 1)
+            logger.info(f"  settlements {period_start.date()} page=0/{total_pages - 1}: {len(content)} kayıt")
+            if content:
+                yield content
+
+            pages = list(range(1, total_pages)) if content else []
+            exhausted = False
+            for j in range(0, len(pages), batch):
+                page_batch = pages[j:j + batch]
+                results = await _gather_limited(lambda page: _fetch_page(period, page), page_batch, concurrency)
+                for page, data in zip(page_batch, results):
+                    if isinstance(data, Exception):
+                        logger.error(f"Periyot {period_start.date()} page={page} hata: {data}")
+                        raise data
+                    content = data.get("content", []) or []
+                    logger.info(f"  settlements {period_start.date()} page={page}/{total_pages - 1}: {len(content)} kayıt")
+                    if not content:
+                        exhausted = True
+                        break
+                    yield content
+                if exhausted:
+                    break
+
+            done += 1
+            if progress is not None:
+                await progress("settlements", done, len(periods))
+
+
+async def fetch_settlements_for_periods(**kwargs) -> List[Dict[str, Any]]:
+    """iter_settlement_pages'in tüm sayfalarını tek listede döner (periyot sırasıyla)."""
+    all_items: List[Dict[str, Any]] = []
+    async for page in iter_settlement_pages(**kwargs):
+        all_items.extend(page)
+    return all_items
+
+
+async def fetch_deduction_invoices_for_period(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    start_date: int,
+    end_date: int,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+) -> List[Dict[str, Any]]:
+    all_deductions: List[Dict[str, Any]] = []
+    page = 0
+    size = 500
+    while True:
+        response_data = await fetch_other_financials(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            start_date=start_date,
+            end_date=end_date,
+            transaction_type="DeductionInvoices",
+            page=page,
+            size=size,
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+        )
+        content = response_data.get("content", []) or []
+        all_deductions.extend(content)
+        logger.info(f"    DeductionInvoices Sayfa {page}: {len(content)} kayıt")
+        if not content or len(content) < size:
+            break
+        page += 1
+    return all_deductions
+
+
+async def fetch_cargo_invoice_items_all_pages(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    invoice_serial_number: str,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    page = 0
+    size = 500
+    while True:
+        resp = await fetch_cargo_invoice_items(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            invoice_serial_number=invoice_serial_number,
+            page=page,
+            size=size,
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+        )
+        content = resp.get("content", []) or []
+        items.extend(content)
+        total_pages = resp.get("totalPages", 1)
+        if page >= total_pages - 1 or not content:
+            break
+        page += 1
+    return items
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MONTHLY SUMMARY — async pipeline
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def sync_cargo_invoice_index(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    cargo_start: datetime.datetime,
+    cargo_end: datetime.datetime,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+    concurrency: Optional[int] = None,
+    progress: Optional[AsyncProgressCallback] = None,
+) -> None:
+    """
+    trendyol_integration.sync_cargo_invoice_index'in async karşılığı (aynı yerel indeks).
+    progress verilirse "deductions" ve "cargo_items" adımlarının ilerlemesi bildirilir.
+    """
+    credentials = dict(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+
+    chunks = await sync_to_async(_plan_deduction_scan)(cargo_start, cargo_end)
+    logger.info(f"Kargo indeksi: {len(chunks)} taranmamış DeductionInvoices periyodu")
+
+    async def _fetch_chunk(chunk: tuple) -> List[Dict[str, Any]]:
+        chunk_start, chunk_end = chunk
+        return await fetch_deduction_invoices_for_period(
+            start_date=int(chunk_start.timestamp() * 1000),
+            end_date=int(chunk_end.timestamp() * 1000),
+            **credentials,
+        )
+
+    on_done = None
+    if progress is not None:
+        await progress("deductions", 0, len(chunks))
+        on_done = lambda done: progress("deductions", done, len(chunks))
+
+    for chunk, deductions in zip(chunks, await _gather_limited(_fetch_chunk, chunks, concurrency, on_done)):
+        if isinstance(deductions, Exception):
+            logger.error(f"  DeductionInvoices {chunk[0].date()} - {chunk[1].date()} hata: {deductions}")
+            continue
+        await sync_to_async(_store_deduction_chunk)(chunk, deductions)
+
+    serials = await sync_to_async(_pending_cargo_serials)(cargo_start, cargo_end)
+    logger.info(f"Kargo indeksi: {len(serials)} yeni kargo faturası seri no")
+
+    async def _fetch_serial(serial: str) -> List[Dict[str, Any]]:
+        return await fetch_cargo_invoice_items_all_pages(invoice_serial_number=serial, **credentials)
+
+    on_done = None
+    if progress is not None:
+        await progress("cargo_items", 0, len(serials))
+        on_done = lambda done: progress("cargo_items", done, len(serials))
+
+    for serial, items in zip(serials, await _gather_limited(_fetch_serial, serials, concurrency, on_done)):
+        if isinstance(items, Exception):
+            logger.error(f"  kargo faturası {serial} hata: {items}")
+            continue
+        await sync_to_async(_store_cargo_invoice_items)(serial, items)
+
+
+async def build_cargo_cost_by_order(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+    concurrency: Optional[int] = None,
+    progress: Optional[AsyncProgressCallback] = None,
+) -> Dict[str, int]:
+    """{orderNumber: toplam kargo}; pencere start_date-7 / end_date+120 (senkron sürümle aynı)."""
+    cargo_start = start_date - datetime.timedelta(days=7)
+    cargo_end = end_date + datetime.timedelta(days=120)
+    await sync_cargo_invoice_index(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        cargo_start=cargo_start,
+        cargo_end=cargo_end,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+        concurrency=concurrency,
+        progress=progress,
+    )
+    return await sync_to_async(cargo_cost_by_order_from_index)(cargo_start, cargo_end)
+
+
+async def fold_settlements(
+    accumulator,
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    source: str = "auto",
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+    concurrency: Optional[int] = None,
+    progress: Optional[AsyncProgressCallback] = None,
+):
+    """
+    Sale + Return settlement'larını geldikçe accumulator'a katlar; kaynak seçimi
+    senkron iter_settlements ile aynıdır. Yerel depo DB thread'inde akış olarak okunur.
+    """
+    if await sync_to_async(_use_local_settlements)(source, start_date, end_date):
+        logger.info(f"  Settlement kaynağı: yerel depo ({start_date.date()} - {end_date.date()})")
+        return await sync_to_async(lambda: accumulator.extend(iter_local_settlements(start_date, end_date)))()
+
+    logger.info(f"  Settlement kaynağı: Trendyol API ({start_date.date()} - {end_date.date()})")
+    async for page in iter_settlement_pages(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        periods=_split_into_15day_periods(start_date, end_date),
+        transaction_types=SETTLEMENT_TYPES,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+        concurrency=concurrency,
+        progress=progress,
+    ):
+        accumulator.extend(page)
+    return accumulator
+
+
+async def calculate_monthly_summary(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    source: str = "auto",
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+    concurrency: Optional[int] = None,
+    progress=None,
+) -> tuple:
+    """
+    trendyol_integration.calculate_monthly_summary'nin async sürümü.
+
+    Settlement'lar ve kargo indeksi aynı anda çekilir; sonuç senkron sürümle
+    aynı (monthly_list, missing_barcodes, order_list) üçlüsüdür. progress senkron
+    sürümdekiyle aynı (phase, done, total) callback'idir; DB thread'inde çağrılır.
+    """
+    logger.info("calculate_monthly_summary (async) başlıyor...")
+    common = dict(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        start_date=start_date,
+        end_date=end_date,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+        concurrency=concurrency,
+        progress=_async_progress(progress),
+    )
+
+    # 1-2. Settlements ve kargo maliyetleri birbirinden bağımsız, birlikte çekilir;
+    # settlement sayfaları geldikçe accumulator'a katlanır
+    accumulator = make_settlement_accumulator()
+    _, cargo_by_order = await asyncio.gather(
+        fold_settlements(accumulator, source=source, **common),
+        build_cargo_cost_by_order(**common),
+    )
+    logger.info(
+        f"  Toplam {accumulator.records} settlement kaydı (Sale + Return), "
+        f"{accumulator.duplicates} tekrar eden kayıt atlandı"
+    )
+
+    report = common["progress"]
+    if report is not None:
+        await report("purchase_prices", 0, 0)
+
+    # 3. Alış fiyatları tek toplu sorgu
+    price_map = await sync_to_async(load_purchase_prices)(accumulator.barcodes)
+
+    if report is not None:
+        await report("aggregate", 0, 0)
+
+    # 4-6. Kargo + alış maliyetleri katlanmış kovalara uygulanır (CPU işi, loop'u bloklamasın)
+    monthly_list, missing_list, order_list = await asyncio.to_thread(
+        accumulator.finalize, cargo_by_order, price_map
+    )
+
+    logger.info(
+        f"calculate_monthly_summary (async) tamamlandı: {len(monthly_list)} ay, "
+        f"{len(order_list)} sipariş, {len(missing_list)} eksik barkod"
+    )
+    return monthly_list, missing_list, order_list
+
+
+async def _calculate_and_close(**kwargs) -> tuple:
+    try:
+        return await calculate_monthly_summary(**kwargs)
+    finally:
+        await close_async_clients()
+
+
+def run_monthly_summary(**kwargs) -> tuple:
+    """
+    Async calculate_monthly_summary'yi senkron koddan (rapor worker'ı) çalıştırır.
+    Çağrı kendi event loop'unda yürür; loop'a bağlı httpx havuzu sonunda kapatılır.
+    """
+    return async_to_sync(_calculate_and_close)(**kwargs)
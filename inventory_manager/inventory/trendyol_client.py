@@ -0,0 +1,534 @@
+"""
+Trendyol API için paylaşılan HTTP istemcisi.
+
+Tüm finance/order çağrıları tek bir requests.Session üzerinden geçer:
+keep-alive bağlantı havuzu, ortak Basic Auth ve ortak header'lar.
+Böylece bir rapor çalıştırmasındaki yüzlerce çağrı her seferinde yeni
+TCP+TLS el sıkışması yapmaz.
+
+Kapanmış tarih aralıklarının settlement/otherfinancials yanıtları ve kargo
+faturası kalemleri diskte sıkıştırılmış JSON olarak önbelleklenir (ResponseCache).
+
+Tüm istekler süreç genelinde paylaşılan uyarlamalı bir token bucket'tan
+(RateLimiter) geçer; 429 ve geçici 5xx/bağlantı hatalarında Retry-After'a
+uyarak jitter'lı üstel bekleme ile tekrar denenir.
+"""
+import asyncio
+import collections
+import datetime
+import email.utils
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from django.conf import settings
+
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+FINANCE_BASE_URL = "https://apigw.trendyol.com/integration/finance/che/sellers"
+ORDERS_BASE_URL = "https://apigw.trendyol.com/integration/order/sellers"
+
+
+# Önbellek anahtarına giren parametreler (normalize edilmiş)
+CACHE_KEY_PARAMS = ("startDate", "endDate", "transactionType", "transactionTypes", "page", "size")
+
+
+class ResponseCache:
+    """
+    Trendyol yanıtları için disk önbelleği.
+
+    Anahtar: endpoint + seller + normalize edilmiş parametreler.
+    TTL kuralı: endDate'i immutable_after_days günden eski aralıklar hiç
+    expire olmaz; daha yeni aralıklar recent_ttl_seconds sonra expire olur.
+    Tarih parametresi olmayan endpoint'ler (kargo faturası kalemleri) değişmez kabul edilir.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        immutable_after_days: int = 30,
+        recent_ttl_seconds: int = 600,
+    ) -> None:
+        self.directory = str(directory)
+        self.immutable_after_days = immutable_after_days
+        self.recent_ttl_seconds = recent_ttl_seconds
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def _key(self, seller_id: str, endpoint: str, params: Dict[str, Any]) -> str:
+        normalized = {k: str(params[k]) for k in CACHE_KEY_PARAMS if params.get(k) is not None}
+        raw = json.dumps([seller_id, endpoint, normalized], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def _ttl_seconds(self, params: Dict[str, Any]) -> Optional[float]:
+        """None → hiç expire olmaz."""
+        end_ms = params.get("endDate")
+        if end_ms is None:
+            return None
+        age_days = (time.time() * 1000 - int(end_ms)) / 86400000
+        if age_days > self.immutable_after_days:
+            return None
+        return self.recent_ttl_seconds
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, seller_id: str, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        path = self._path(self._key(seller_id, endpoint, params))
+        try:
+            ttl = self._ttl_seconds(params)
+            if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+                self._count("misses")
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return data
+
+    def set(self, seller_id: str, endpoint: str, params: Dict[str, Any], data: Dict[str, Any]) -> None:
+        path = self._path(self._key(seller_id, endpoint, params))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Yarım yazılmış dosya okunmasın diye önce geçici dosyaya yaz, sonra taşı
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Trendyol önbelleğe yazılamadı: {e}")
+            return
+        self._count("stores")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Ayarlardan oluşturulan paylaşılan önbellek (TRENDYOL_CACHE_ENABLED=False ise None)."""
+    global _response_cache
+    if not getattr(settings, "TRENDYOL_CACHE_ENABLED", True):
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                directory=getattr(
+                    settings, "TRENDYOL_CACHE_DIR",
+                    os.path.join(tempfile.gettempdir(), "trendyol_cache"),
+                ),
+                immutable_after_days=getattr(settings, "TRENDYOL_CACHE_IMMUTABLE_AFTER_DAYS", 30),
+                recent_ttl_seconds=getattr(settings, "TRENDYOL_CACHE_RECENT_TTL_SECONDS", 600),
+            )
+        return _response_cache
+
+
+class RateLimiter:
+    """
+    Uyarlamalı token bucket.
+
+    429 alındığında hız yarıya iner ve Retry-After süresince tüm istekler
+    bekletilir; başarılı isteklerde hız max_rate'e kadar yavaşça geri artar.
+    Endpoint başına son 60 saniyedeki istek, throttle ve retry sayıları tutulur.
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.5) -> None:
+        self.max_rate = float(rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._usage: Dict[str, Dict[str, int]] = collections.defaultdict(
+            lambda: {"requests": 0, "throttled": 0, "retries": 0, "errors": 0}
+        )
+        self._recent: Dict[str, Deque[float]] = collections.defaultdict(collections.deque)
+
+    def try_acquire(self, endpoint: str = "") -> float:
+        """Token varsa alır ve 0 döner; yoksa beklenmesi gereken saniyeyi döner."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+            self._usage[endpoint]["requests"] += 1
+            recent = self._recent[endpoint]
+            recent.append(now)
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+            return 0.0
+
+    def acquire(self, endpoint: str = "") -> None:
+        """Bir token alınana kadar bekler."""
+        while True:
+            wait = self.try_acquire(endpoint)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, endpoint: str = "") -> None:
+        """acquire'ın event loop'u bloklamayan karşılığı (aynı kova paylaşılır)."""
+        while True:
+            wait = self.try_acquire(endpoint)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_throttled(self, endpoint: str, retry_after: float) -> None:
+        with self._lock:
+            self._usage[endpoint]["throttled"] += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def record(self, endpoint: str, name: str) -> None:
+        with self._lock:
+            self._usage[endpoint][name] += 1
+
+    def usage(self) -> Dict[str, Any]:
+        """Endpoint başına kota kullanımı (toplamlar + son 60 sn istek sayısı)."""
+        with self._lock:
+            now = time.monotonic()
+            stats = {}
+            for endpoint, counters in self._usage.items():
+                recent = self._recent[endpoint]
+                stats[endpoint] = dict(
+                    counters,
+                    last_60s=sum(1 for ts in recent if now - ts <= 60),
+                )
+            return {"rate": round(self.rate, 2), "max_rate": self.max_rate, "endpoints": stats}
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Tüm Trendyol çağrılarının paylaştığı süreç geneli rate limiter."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                rate=getattr(settings, "TRENDYOL_RATE_LIMIT_PER_SECOND", 10),
+                burst=getattr(settings, "TRENDYOL_RATE_LIMIT_BURST", 10),
+            )
+        return _rate_limiter
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After başlığı: saniye ya da HTTP tarihi."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.datetime.now(tz=datetime.timezone.utc)).total_seconds())
+
+
+def _endpoint_name(url: str) -> str:
+    """Kota istatistikleri için URL'den endpoint adı (settlements, cargo-invoice, orders...)."""
+    for name in ("settlements", "otherfinancials", "cargo-invoice", "orders"):
+        if f"/{name}" in url:
+            return name
+    return "other"
+
+
+def _record_count(data: Any) -> int:
+    if isinstance(data, dict):
+        return len(data.get("content") or [])
+    return 0
+
+
+class BaseTrendyolClient:
+    """
+    Senkron (TrendyolClient) ve async (trendyol_async.AsyncTrendyolClient) istemcinin
+    ortak kısmı: retry politikası, rate limiter muhasebesi, önbellek ve endpoint yolları.
+    Alt sınıflar yalnızca HTTP taşımasını (get_json / cached_get_json) sağlar; endpoint
+    metotları alt sınıfın cached_get_json/get_json sonucunu (async'te coroutine) döner.
+    """
+
+    def __init__(
+        self,
+        *,
+        seller_id: str,
+        base_url: str = FINANCE_BASE_URL,
+        orders_base_url: str = ORDERS_BASE_URL,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ) -> None:
+        self.seller_id = seller_id
+        self.base_url = base_url
+        self.orders_base_url = orders_base_url
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        if max_retries is None:
+            max_retries = getattr(settings, "TRENDYOL_MAX_RETRIES", 4)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt: int) -> float:
+        """Jitter'lı üstel bekleme: [d/2, d] aralığında rastgele, d = base * 2^attempt."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def _error_delay(self, endpoint: str, attempt: int, error: Exception) -> Optional[float]:
+        """Bağlantı hatasından sonra beklenecek süre; deneme hakkı bittiyse None (çağıran fırlatır)."""
+        if attempt >= self.max_retries:
+            if self.rate_limiter is not None:
+                self.rate_limiter.record(endpoint, "errors")
+            return None
+        delay = self._backoff(attempt)
+        logger.warning(f"Trendyol {endpoint} bağlantı hatası, {delay:.1f}s sonra tekrar: {error}")
+        return delay
+
+    def _response_delay(self, endpoint: str, attempt: int, response: Any, trace_span) -> Optional[float]:
+        """
+        Yanıt tekrar denenecekse beklenecek süre (Retry-After ya da backoff).
+        None → yanıt son haliyle kullanılır (_response_json; 4xx ve tükenen 5xx/429 orada fırlatılır).
+        """
+        limiter = self.rate_limiter
+        status = response.status_code
+        trace_span.set(status=status)
+        if status != 429 and status < 500:
+            if limiter is not None:
+                if status < 400:
+                    limiter.on_success()
+                else:
+                    limiter.record(endpoint, "errors")
+            return None
+
+        if attempt >= self.max_retries:
+            if limiter is not None:
+                limiter.record(endpoint, "errors")
+            return None
+
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        delay = retry_after if retry_after is not None else self._backoff(attempt)
+        if status == 429 and limiter is not None:
+            limiter.on_throttled(endpoint, delay)
+        logger.warning(f"Trendyol {endpoint} HTTP {status}, {delay:.1f}s sonra tekrar (deneme {attempt + 1})")
+        return delay
+
+    def _response_json(self, response: Any, trace_span) -> Dict[str, Any]:
+        response.raise_for_status()
+        data = response.json()
+        trace_span.set(bytes=len(response.content), records=_record_count(data))
+        return data
+
+    def _count_retry(self, endpoint: str, trace_span) -> None:
+        if self.rate_limiter is not None:
+            self.rate_limiter.record(endpoint, "retries")
+        trace_span.add("retries")
+
+    def _cache_get(self, endpoint: str, params: Dict[str, Any], trace_span) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        data = self.cache.get(self.seller_id, endpoint, params)
+        if data is not None:
+            trace_span.set(cache_hits=1, records=_record_count(data))
+        else:
+            trace_span.set(cache_misses=1)
+        return data
+
+    def _cache_set(self, endpoint: str, params: Dict[str, Any], data: Dict[str, Any]) -> None:
+        if self.cache is not None:
+            self.cache.set(self.seller_id, endpoint, params, data)
+
+    def _finance_url(self, endpoint: str) -> str:
+        return f"{self.base_url}/{self.seller_id}/{endpoint}"
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None):
+        raise NotImplementedError
+
+    def cached_get_json(self, endpoint: str, params: Dict[str, Any]):
+        raise NotImplementedError
+
+    # ── Finance endpoints ────────────────────────────────────────────────────
+
+    def settlements(self, params: Dict[str, Any]):
+        return self.cached_get_json("settlements", params)
+
+    def other_financials(self, params: Dict[str, Any]):
+        return self.cached_get_json("otherfinancials", params)
+
+    def cargo_invoice_items(self, invoice_serial_number: str, params: Dict[str, Any]):
+        return self.cached_get_json(f"cargo-invoice/{invoice_serial_number}/items", params)
+
+    # ── Order endpoints ──────────────────────────────────────────────────────
+
+    def orders(self, params: Dict[str, Any]):
+        return self.get_json(f"{self.orders_base_url}/{self.seller_id}/orders", params)
+
+
+class TrendyolClient(BaseTrendyolClient):
+    """Bağlantı havuzlu, yeniden kullanılabilir Trendyol API istemcisi (requests.Session)."""
+
+    def __init__(
+        self,
+        *,
+        seller_id: str,
+        api_key: str,
+        api_secret: str,
+        store_front_code: str = "TRENDYOLTR",
+        user_agent: Optional[str] = None,
+        base_url: str = FINANCE_BASE_URL,
+        orders_base_url: str = ORDERS_BASE_URL,
+        pool_connections: Optional[int] = None,
+        pool_maxsize: Optional[int] = None,
+        timeout: int = 30,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ) -> None:
+        super().__init__(
+            seller_id=seller_id,
+            base_url=base_url,
+            orders_base_url=orders_base_url,
+            cache=cache,
+            rate_limiter=rate_limiter,
+            max_retries=max_retries,
+            backoff_base=backoff_base,
+            backoff_max=backoff_max,
+        )
+        self.timeout = timeout
+
+        if pool_connections is None:
+            pool_connections = getattr(settings, "TRENDYOL_HTTP_POOL_CONNECTIONS", 4)
+        if pool_maxsize is None:
+            pool_maxsize = getattr(settings, "TRENDYOL_HTTP_POOL_MAXSIZE", 16)
+
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(api_key, api_secret)
+        self.session.headers.update({
+            "User-Agent": user_agent or f"{seller_id}-SelfIntegration",
+            "storeFrontCode": store_front_code,
+            "Content-Type": "application/json",
+        })
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Idempotent GET. 429, 5xx ve bağlantı hatalarında max_retries kez tekrar dener;
+        tüm denemeler başarısız olursa son hata fırlatılır.
+        """
+        endpoint = _endpoint_name(url)
+        attempt = 0
+        with span(f"http.{endpoint}") as trace_span:
+            while True:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(endpoint)
+                try:
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    delay = self._error_delay(endpoint, attempt, e)
+                    if delay is None:
+                        raise
+                else:
+                    delay = self._response_delay(endpoint, attempt, response, trace_span)
+                    if delay is None:
+                        return self._response_json(response, trace_span)
+                self._count_retry(endpoint, trace_span)
+                attempt += 1
+                time.sleep(delay)
+
+    def cached_get_json(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Finance endpoint'i için önbellekli GET (endpoint: base_url/seller_id sonrası yol)."""
+        with span(f"trendyol.{_endpoint_name('/' + endpoint)}") as trace_span:
+            data = self._cache_get(endpoint, params, trace_span)
+            if data is None:
+                data = self.get_json(self._finance_url(endpoint), params)
+                self._cache_set(endpoint, params, data)
+            return data
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_clients: Dict[Tuple, TrendyolClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = FINANCE_BASE_URL,
+    orders_base_url: str = ORDERS_BASE_URL,
+) -> TrendyolClient:
+    """
+    Aynı kimlik bilgileri için süreç içinde tek bir TrendyolClient döner.
+    Böylece fetch_* fonksiyonları imzalarını korurken bağlantı havuzunu paylaşır.
+    """
+    key = (seller_id, api_key, api_secret, store_front_code, user_agent, base_url, orders_base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = TrendyolClient(
+                seller_id=seller_id,
+                api_key=api_key,
+                api_secret=api_secret,
+                store_front_code=store_front_code,
+                user_agent=user_agent,
+                base_url=base_url,
+                orders_base_url=orders_base_url,
+                cache=get_response_cache(),
+                rate_limiter=get_rate_limiter(),
+            )
+            _clients[key] = client
+        return client
@@ -1,9 +1,24 @@
-from typing import List, Dict, Any, Optional
-import requests
-from requests.auth import HTTPBasicAuth
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import array
+import collections
+import contextvars
+import functools
+from decimal import Decimal
+from typing import Callable, List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import logging
 import datetime
-from .models import Product
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, OuterRef, Subquery, Sum
+from .models import (
+    Product, AwaitingCargoInvoice, CargoInvoice, CargoInvoiceItem, CargoInvoiceScanDay,
+    TrendyolSettlement, TrendyolSyncState,
+)
+from .barcode_aliases import resolve_product_id
+from .money import kurus_to_float, to_kurus
+from .price_history import PurchasePriceIndex, load_price_history
+from .trendyol_client import get_client, get_response_cache
+from .tracing import span
 
 TURKISH_MONTHS = {
     1: "Ocak", 2: "Şubat", 3: "Mart", 4: "Nisan",
@@ -28,7 +43,6 @@ def fetch_settlements(
     user_agent: Optional[str] = None,
     base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
 ) -> Dict[str, Any]:
-    url = f"{base_url}/{seller_id}/settlements"
     params = {
         "startDate": start_date,
         "endDate": end_date,
@@ -36,16 +50,15 @@ def fetch_settlements(
         "page": page,
         "size": size,
     }
-    headers = {
-        "User-Agent": user_agent or f"{seller_id}-SelfIntegration",
-        "storeFrontCode": store_front_code,
-        "Content-Type": "application/json",
-    }
-    auth = HTTPBasicAuth(api_key, api_secret)
-    response = requests.get(
-        url, params=params, headers=headers, auth=auth, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    client = get_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+    return client.settlements(params)
 
 
 def fetch_other_financials(
@@ -62,7 +75,6 @@ def fetch_other_financials(
     user_agent: Optional[str] = None,
     base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
 ) -> Dict[str, Any]:
-    url = f"{base_url}/{seller_id}/otherfinancials"
     params = {
         "startDate": start_date,
         "endDate": end_date,
@@ -70,16 +82,15 @@ def fetch_other_financials(
         "page": page,
         "size": size,
     }
-    headers = {
-        "User-Agent": user_agent or f"{seller_id}-SelfIntegration",
-        "storeFrontCode": store_front_code,
-        "Content-Type": "application/json",
-    }
-    auth = HTTPBasicAuth(api_key, api_secret)
-    response = requests.get(
-        url, params=params, headers=headers, auth=auth, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    client = get_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+    return client.other_financials(params)
 
 
 def fetch_cargo_invoice_items(
@@ -94,21 +105,19 @@ def fetch_cargo_invoice_items(
     user_agent: Optional[str] = None,
     base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
 ) -> Dict[str, Any]:
-    url = f"{base_url}/{seller_id}/cargo-invoice/{invoice_serial_number}/items"
     params = {
         "page": page,
         "size": size,
     }
-    headers = {
-        "User-Agent": user_agent or f"{seller_id}-SelfIntegration",
-        "storeFrontCode": store_front_code,
-        "Content-Type": "application/json",
-    }
-    auth = HTTPBasicAuth(api_key, api_secret)
-    response = requests.get(
-        url, params=params, headers=headers, auth=auth, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    client = get_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+    return client.cargo_invoice_items(invoice_serial_number, params)
 
 
 def fetch_order_by_number(
@@ -128,21 +137,20 @@ def fetch_order_by_number(
     Orders API only supports the last ~1 month; pass start_date_ms/end_date_ms
     (millisecond timestamps) so older orders can be found.
     """
-    url = f"{orders_base_url}/{seller_id}/orders"
     params: Dict[str, Any] = {"orderNumber": order_number}
     if start_date_ms is not None:
         params["startDate"] = start_date_ms
     if end_date_ms is not None:
         params["endDate"] = end_date_ms
-    headers = {
-        "User-Agent": user_agent or f"{seller_id}-SelfIntegration",
-        "storeFrontCode": store_front_code,
-        "Content-Type": "application/json",
-    }
-    auth = HTTPBasicAuth(api_key, api_secret)
-    response = requests.get(url, params=params, headers=headers, auth=auth, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    client = get_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        orders_base_url=orders_base_url,
+    )
+    return client.orders(params)
 
 
 def create_15day_periods(
@@ -230,6 +238,7 @@ def fetch_deduction_invoices_for_period(
     store_front_code: str = "TRENDYOLTR",
     user_agent: Optional[str] = None,
     base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
+    raise_on_error: bool = True,
 ) -> List[Dict[str, Any]]:
     
     all_deductions: List[Dict[str, Any]] = []
@@ -267,6 +276,8 @@ def fetch_deduction_invoices_for_period(
                 
         except Exception as e:
             logger.error(f"DeductionInvoices çekilirken hata (Sayfa {page}): {str(e)}")
+            if raise_on_error:
+                raise
             break
     
     return all_deductions
@@ -390,6 +401,51 @@ def fetch_all_cargo_from_periods(
     return all_cargo_items
 
 
+def load_purchase_prices(barcodes, chunk_size: int = 500) -> PurchasePriceIndex:
+    """
+    Barkod → alış fiyatı (kuruş) haritası. Benzersiz barkodlar tek bir
+    filter(barcode__in=...) sorgusuyla (çok büyük kümelerde chunk_size'lık parçalarla) çözülür.
+    Haritada olmayan barkodlar sistemde bulunmayanlardır. Fiyatı değişmiş
+    barkodların tarihçesi de aynı parçalarla yüklenir (price_at ile işlem
+    tarihindeki fiyat çözülür). Product.barcode'da olmayan ama
+    ProductBarcodeAlias ile eşlenmiş barkodlar eşlendikleri ürünün fiyatını alır.
+    """
+    unique_barcodes = sorted({b for b in barcodes if b})
+    price_map = PurchasePriceIndex()
+    with span("db.purchase_prices") as trace_span:
+        for i in range(0, len(unique_barcodes), chunk_size):
+            chunk = unique_barcodes[i:i + chunk_size]
+            found = []
+            for barcode, purchase_price in Product.objects.filter(barcode__in=chunk).values_list("barcode", "purchase_price"):
+                price_map[barcode] = to_kurus(purchase_price)
+                found.append(barcode)
+            if found:
+                price_map.history.update(load_price_history(found))
+
+        aliases = {}
+        for barcode in unique_barcodes:
+            if barcode not in price_map:
+                product_id = resolve_product_id(barcode)
+                if product_id is not None:
+                    aliases[barcode] = product_id
+        if aliases:
+            products = {
+                product_id: (barcode, to_kurus(purchase_price))
+                for product_id, barcode, purchase_price in Product.objects.filter(
+                    pk__in=set(aliases.values())
+                ).values_list("id", "barcode", "purchase_price")
+            }
+            history = load_price_history(barcode for barcode, _ in products.values())
+            for alias, product_id in aliases.items():
+                if product_id in products:
+                    barcode, purchase_price = products[product_id]
+                    price_map[alias] = purchase_price
+                    if barcode in history:
+                        price_map.history[alias] = history[barcode]
+        trace_span.set(records=len(unique_barcodes), aliases=len(aliases), history=len(price_map.history))
+    return price_map
+
+
 def match_sales_with_cargo(
     sales: List[Dict[str, Any]],
     cargo_items: List[Dict[str, Any]]
@@ -397,14 +453,14 @@ def match_sales_with_cargo(
     
     logger.info("ADIM 5: SATIŞLAR VE KARGOLAR EŞLEŞTİRİLİYOR")
     
-    cargo_map: Dict[str, float] = {}
+    # Tutarlar kuruş (int) olarak toplanır
+    cargo_map: Dict[str, int] = {}
     for item in cargo_items:
         order_number = str(item.get("orderNumber", ""))
         if order_number:
-            amount = item.get("amount", 0)
-            current_amount = cargo_map.get(order_number, 0.0)
-            cargo_map[order_number] = round(current_amount + float(amount), 2)
+            cargo_map[order_number] = cargo_map.get(order_number, 0) + to_kurus(item.get("amount"))
     
+    price_map = load_purchase_prices(sale.get("barcode") for sale in sales)
     results: List[Dict[str, Any]] = []
     
     for sale in sales:
@@ -421,40 +477,28 @@ def match_sales_with_cargo(
             transaction_date = convert_timestamp_to_datetime(transaction_date_ms)
             logger.info(f"Sipariş {order_number} - İşlem Tarihi: {transaction_date}")
         
-        purchase_price: float = 0.0
-        shipping_fee: float = 0.0
-        cargo_found = False
-        
-        try:
-            product = Product.objects.get(barcode=barcode)
-            purchase_price = float(product.purchase_price)
-        except Product.DoesNotExist:
-            pass
-        
-        if order_number in cargo_map:
-            cargo_found = True
-            shipping_fee = cargo_map[order_number]
-        
-        base_profit = float(seller_revenue) - purchase_price
-        net_profit = base_profit - shipping_fee
+        revenue = to_kurus(seller_revenue)
+        purchase_price = price_map.price_at(barcode, transaction_date_ms)
+        shipping_fee = cargo_map.get(order_number, 0)
+        cargo_found = order_number in cargo_map
         
         results.append({
             "barcode": barcode,
             "orderNumber": order_number,
             "transactionDate": transaction_date,
-            "sellerRevenue": round(float(seller_revenue), 2),
-            "purchasePrice": round(purchase_price, 2),
-            "shippingFee": shipping_fee,
-            "netProfit": round(net_profit, 2),
+            "sellerRevenue": kurus_to_float(revenue),
+            "purchasePrice": kurus_to_float(purchase_price),
+            "shippingFee": kurus_to_float(shipping_fee),
+            "netProfit": kurus_to_float(revenue - purchase_price - shipping_fee),
             "cargoFound": cargo_found,
         })
     
     logger.info(f"ADIM 5 Tamamlandı: {len(results)} satış işlendi")
     cargo_found_count = sum(1 for r in results if r.get('cargoFound'))
-    total_net_profit = sum(r.get('netProfit', 0) for r in results)
+    total_net_profit = sum(to_kurus(r.get('netProfit')) for r in results)
     logger.info(f"  Kargo Bulundu: {cargo_found_count}")
     logger.info(f"  Kargo Bulunamadı: {len(results) - cargo_found_count}")
-    logger.info(f"  Toplam Net Kâr: {round(total_net_profit, 2)} TL")
+    logger.info(f"  Toplam Net Kâr: {kurus_to_float(total_net_profit)} TL")
     
     return results
 
@@ -462,7 +506,11 @@ def match_sales_with_cargo(
 def create_pivot_results(
     results: List[Dict[str, Any]]
 ) -> List[Dict[str, Any]]:
-    
+    """
+    Satır bazlı sonuçları sipariş bazında gruplar (tek geçiş, O(n)).
+    Kargo ücreti, siparişin ilk satırındaki shippingFee olarak gruplama sırasında kaydedilir.
+    Toplamlar kuruş (int) olarak tutulur.
+    """
     pivot_data: Dict[str, Dict[str, Any]] = {}
     
     for result in results:
@@ -473,9 +521,9 @@ def create_pivot_results(
                 "orderNumber": order_number,
                 "transactionDate": result.get("transactionDate"),
                 "items": [],
-                "totalSellerRevenue": 0.0,
-                "totalPurchasePrice": 0.0,
-                "totalShippingFee": 0.0,
+                "totalSellerRevenue": 0,
+                "totalPurchasePrice": 0,
+                "firstShippingFee": to_kurus(result.get("shippingFee", 0)),
                 "cargoFound": False,
             }
         
@@ -485,25 +533,19 @@ def create_pivot_results(
             "purchasePrice": result.get("purchasePrice"),
         })
         
-        pivot_data[order_number]["totalSellerRevenue"] += float(result.get("sellerRevenue", 0))
-        pivot_data[order_number]["totalPurchasePrice"] += float(result.get("purchasePrice", 0))
+        pivot_data[order_number]["totalSellerRevenue"] += to_kurus(result.get("sellerRevenue", 0))
+        pivot_data[order_number]["totalPurchasePrice"] += to_kurus(result.get("purchasePrice", 0))
         pivot_data[order_number]["cargoFound"] = result.get("cargoFound", False)
     
-    for order_number, data in pivot_data.items():
-        if data["cargoFound"]:
-            for result in results:
-                if str(result.get("orderNumber", "")) == order_number:
-                    data["totalShippingFee"] = float(result.get("shippingFee", 0))
-                    break
-    
     pivot_results = []
     for order_number in sorted(pivot_data.keys()):
         data = pivot_data[order_number]
+        total_shipping_fee = data["firstShippingFee"] if data["cargoFound"] else 0
         total_net_profit = (
             data["totalSellerRevenue"] - 
             data["totalPurchasePrice"] - 
-            data["totalShippingFee"] -
-            11
+            total_shipping_fee -
+            to_kurus(11)
         )
         
         pivot_results.append({
@@ -511,10 +553,10 @@ def create_pivot_results(
             "transactionDate": data["transactionDate"],
             "items": data["items"],
             "itemCount": len(data["items"]),
-            "totalSellerRevenue": round(data["totalSellerRevenue"], 2),
-            "totalPurchasePrice": round(data["totalPurchasePrice"], 2),
-            "totalShippingFee": round(data["totalShippingFee"], 2),
-            "totalNetProfit": round(total_net_profit, 2),
+            "totalSellerRevenue": kurus_to_float(data["totalSellerRevenue"]),
+            "totalPurchasePrice": kurus_to_float(data["totalPurchasePrice"]),
+            "totalShippingFee": kurus_to_float(total_shipping_fee),
+            "totalNetProfit": kurus_to_float(total_net_profit),
             "cargoFound": data["cargoFound"],
         })
     
@@ -535,6 +577,10 @@ def convert_timestamp_to_datetime(timestamp_ms: int) -> datetime.datetime:
 # MONTHLY SUMMARY — new pipeline
 # ─────────────────────────────────────────────────────────────────────────────
 
+# progress(phase, done, total): uzun süren adımların ilerlemesini bildirir
+ProgressCallback = Callable[[str, int, int], None]
+
+
 def _split_into_15day_periods(
     start_date: datetime.datetime,
     end_date: datetime.datetime,
@@ -549,56 +595,434 @@ def _split_into_15day_periods(
     return periods
 
 
-def fetch_settlements_all_pages(
+def _parallel_map(
+    fn: Callable[[Any], Any],
+    items: List[Any],
+    max_workers: Optional[int] = None,
+    on_done: Optional[Callable[[int], None]] = None,
+) -> List[Any]:
+    """
+    fn'i items üzerinde sınırlı bir thread havuzunda çalıştırır.
+    Sonuçlar girdi sırasıyla döner; hata veren elemanın yerine exception nesnesi konur.
+    on_done(tamamlanan_sayısı) her eleman bittikçe çağıran thread'de çağrılır.
+    Çağıranın contextvars'ı (aktif iz/span) her worker'a kopyalanır.
+    """
+    if max_workers is None:
+        max_workers = getattr(settings, "TRENDYOL_MAX_WORKERS", 4)
+
+    if len(items) <= 1 or max_workers <= 1:
+        results = []
+        for item in items:
+            results.append(_call_safely(fn, item))
+            if on_done is not None:
+                on_done(len(results))
+        return results
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _call_safely, fn, item) for item in items]
+        if on_done is not None:
+            for done, _ in enumerate(as_completed(futures), 1):
+                on_done(done)
+        return [future.result() for future in futures]
+
+
+def _call_safely(fn: Callable[[Any], Any], item: Any) -> Any:
+    try:
+        return fn(item)
+    except Exception as e:
+        return e
+
+
+def _parallel_imap(
+    fn: Callable[[Any], Any],
+    items: List[Any],
+    max_workers: Optional[int] = None,
+) -> Iterator[Any]:
+    """
+    _parallel_map'in akış sürümü: sonuçlar girdi sırasıyla, hazır oldukça üretilir.
+    Aynı anda en fazla max_workers eleman çalışır; tüketici yavaşsa yenisi başlatılmaz,
+    böylece bellekte en fazla max_workers + 1 sonuç bekler.
+    """
+    if max_workers is None:
+        max_workers = getattr(settings, "TRENDYOL_MAX_WORKERS", 4)
+
+    if len(items) <= 1 or max_workers <= 1:
+        for item in items:
+            yield _call_safely(fn, item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        remaining = iter(items)
+        pending: collections.deque = collections.deque()
+        for item in remaining:
+            pending.append(executor.submit(contextvars.copy_context().run, _call_safely, fn, item))
+            if len(pending) >= max_workers:
+                break
+        while pending:
+            result = pending.popleft().result()
+            item = next(remaining, _EXHAUSTED)
+            if item is not _EXHAUSTED:
+                pending.append(executor.submit(contextvars.copy_context().run, _call_safely, fn, item))
+            yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+_EXHAUSTED = object()
+
+
+def _settlements_page_params(period: tuple, transaction_types: List[str], page: int) -> Dict[str, Any]:
+    period_start, period_end = period
+    return {
+        "startDate": int(period_start.timestamp() * 1000),
+        "endDate": int(period_end.timestamp() * 1000),
+        "transactionTypes": ",".join(transaction_types),
+        "page": page,
+        "size": 500,
+    }
+
+
+def iter_settlement_pages(
     *,
     seller_id: str,
     api_key: str,
     api_secret: str,
-    start_ts: int,
-    end_ts: int,
+    periods: List[tuple],
     transaction_types: List[str],
     store_front_code: str = "TRENDYOLTR",
     user_agent: Optional[str] = None,
     base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
-) -> List[Dict[str, Any]]:
-    """Fetch all pages of settlements for multiple transaction types (uses transactionTypes plural param)."""
-    url = f"{base_url}/{seller_id}/settlements"
-    headers = {
-        "User-Agent": user_agent or f"{seller_id}-SelfIntegration",
-        "storeFrontCode": store_front_code,
-        "Content-Type": "application/json",
-    }
-    auth = HTTPBasicAuth(api_key, api_secret)
-    size = 500
+    max_workers: Optional[int] = None,
+    raise_on_error: bool = True,
+    progress: Optional[ProgressCallback] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Periyotların settlement sayfalarını geldikçe üretir (periyot, sonra sayfa sırasıyla).
+
+    Periyotların 0. sayfaları (totalPages buradan öğrenilir) ve her periyodun kalan
+    sayfaları _parallel_imap ile paralel çekilir; bellekte yalnızca birkaç sayfa bekler.
+    Bir sayfa client'ın retry'larından sonra da hata verirse exception yükselir
+    (raise_on_error=False: hatalı periyot atlanır / kalan sayfaları kesilip loglanır).
+    progress verilirse her periyot bittikçe ("settlements", biten, toplam) bildirilir.
+    """
+    client = get_client(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+    )
+
+    def _fetch_page(period: tuple, page: int) -> Dict[str, Any]:
+        return client.settlements(_settlements_page_params(period, transaction_types, page))
+
+    if progress is not None:
+        progress("settlements", 0, len(periods))
+
+    first_pages = _parallel_imap(functools.partial(_fetch_page, page=0), periods, max_workers)
+    for done, (period, data) in enumerate(zip(periods, first_pages), 1):
+        period_start, period_end = period
+        if isinstance(data, Exception):
+            logger.error(f"Periyot {period_start.date()} - {period_end.date()} hata: {data}")
+            if raise_on_error:
+                raise data
+            data = {}
+
+        content = data.get("content", []) or []
+        total_pages = data.get("totalPages", 1)
+        logger.info(f"  settlements {period_start.date()} page=0/{total_pages - 1}: {len(content)} kayıt")
+        if content:
+            yield content
+
+        if total_pages > 1 and content:
+            pages = list(range(1, total_pages))
+            rest = _parallel_imap(functools.partial(_fetch_page, period), pages, max_workers)
+            for page, data in zip(pages, rest):
+                if isinstance(data, Exception):
+                    logger.error(f"Periyot {period_start.date()} page={page} hata: {data}")
+                    if raise_on_error:
+                        raise data
+                    break
+                content = data.get("content", []) or []
+                logger.info(f"  settlements {period_start.date()} page={page}/{total_pages - 1}: {len(content)} kayıt")
+                if not content:
+                    break
+                yield content
+
+        if progress is not None:
+            progress("settlements", done, len(periods))
+
+
+def fetch_settlements_for_periods(**kwargs) -> List[Dict[str, Any]]:
+    """iter_settlement_pages'in tüm sayfalarını tek listede döner (periyot sırasıyla)."""
     all_items: List[Dict[str, Any]] = []
-    page = 0
+    for page in iter_settlement_pages(**kwargs):
+        all_items.extend(page)
+    return all_items
+
 
+def fetch_cargo_invoice_items_all_pages(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    invoice_serial_number: str,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
+    raise_on_error: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Bir kargo faturasının tüm item sayfalarını çeker.
+    Client tekrar denemelerinden sonra hâlâ hata varsa fırlatılır
+    (raise_on_error=False ise o ana kadar çekilenler döner).
+    """
+    items: List[Dict[str, Any]] = []
+    page = 0
+    size = 500
     while True:
-        params = {
-            "startDate": start_ts,
-            "endDate": end_ts,
-            "transactionTypes": ",".join(transaction_types),
-            "page": page,
-            "size": size,
-        }
         try:
-            response = requests.get(url, params=params, headers=headers, auth=auth, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            resp = fetch_cargo_invoice_items(
+                seller_id=seller_id,
+                api_key=api_key,
+                api_secret=api_secret,
+                invoice_serial_number=invoice_serial_number,
+                page=page,
+                size=size,
+                store_front_code=store_front_code,
+                user_agent=user_agent,
+                base_url=base_url,
+            )
         except Exception as e:
-            logger.error(f"fetch_settlements_all_pages page={page} hata: {e}")
+            logger.error(f"  kargo faturası {invoice_serial_number} page={page} hata: {e}")
+            if raise_on_error:
+                raise
             break
 
-        content = data.get("content", []) or []
-        all_items.extend(content)
-        total_pages = data.get("totalPages", 1)
-        logger.info(f"  settlements page={page}/{total_pages - 1}: {len(content)} kayıt")
+        content = resp.get("content", []) or []
+        items.extend(content)
 
+        total_pages = resp.get("totalPages", 1)
         if page >= total_pages - 1 or not content:
             break
         page += 1
+    return items
 
-    return all_items
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CARGO INVOICE INDEX — yerel kargo faturası indeksi
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _day_bounds(day: datetime.date) -> tuple:
+    start = datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc)
+    return start, start + datetime.timedelta(days=1) - datetime.timedelta(milliseconds=1)
+
+
+def _plan_deduction_scan(
+    cargo_start: datetime.datetime,
+    cargo_end: datetime.datetime,
+) -> List[tuple]:
+    """
+    Pencere içinde henüz taranmamış günleri max 15 günlük (start, end) parçalara böler.
+    Gelecekteki günler taranmaz.
+    """
+    today = datetime.datetime.now(tz=datetime.timezone.utc).date()
+    first_day = cargo_start.astimezone(datetime.timezone.utc).date()
+    last_day = min(cargo_end.astimezone(datetime.timezone.utc).date(), today)
+    if first_day > last_day:
+        return []
+
+    scanned = set(
+        CargoInvoiceScanDay.objects.filter(day__range=(first_day, last_day)).values_list("day", flat=True)
+    )
+
+    chunks: List[tuple] = []
+    run_start = None
+    day = first_day
+    while day <= last_day:
+        if day in scanned:
+            if run_start is not None:
+                chunks.append((run_start, day - datetime.timedelta(days=1)))
+                run_start = None
+        elif run_start is None:
+            run_start = day
+        elif (day - run_start).days >= 15:
+            chunks.append((run_start, day - datetime.timedelta(days=1)))
+            run_start = day
+        day += datetime.timedelta(days=1)
+    if run_start is not None:
+        chunks.append((run_start, last_day))
+
+    return [(_day_bounds(a)[0], _day_bounds(b)[1]) for a, b in chunks]
+
+
+def _store_deduction_chunk(
+    chunk: tuple,
+    deductions: List[Dict[str, Any]],
+) -> int:
+    """Bir parçadaki kargo faturalarını kaydeder ve kapanmış günleri taranmış olarak işaretler."""
+    chunk_start, chunk_end = chunk
+    invoices = []
+    for record in deductions:
+        if "kargo fatura" not in (record.get("transactionType") or "").lower():
+            continue
+        serial = str(record.get("id", ""))
+        if not serial:
+            continue
+        tx_dt = convert_timestamp_to_datetime(record.get("transactionDate")) or chunk_start
+        invoices.append(CargoInvoice(serial_number=serial, transaction_date=tx_dt))
+    CargoInvoice.objects.bulk_create(invoices, ignore_conflicts=True)
+
+    # Son TRENDYOL_CARGO_INDEX_SETTLE_DAYS gün hâlâ yeni kayıt alabilir, işaretlenmez
+    settle_days = getattr(settings, "TRENDYOL_CARGO_INDEX_SETTLE_DAYS", 2)
+    closed_until = datetime.datetime.now(tz=datetime.timezone.utc).date() - datetime.timedelta(days=settle_days)
+    days = []
+    day = chunk_start.date()
+    while day <= min(chunk_end.date(), closed_until):
+        days.append(CargoInvoiceScanDay(day=day))
+        day += datetime.timedelta(days=1)
+    CargoInvoiceScanDay.objects.bulk_create(days, ignore_conflicts=True)
+    return len(invoices)
+
+
+def _pending_cargo_serials(
+    cargo_start: datetime.datetime,
+    cargo_end: datetime.datetime,
+) -> List[str]:
+    return list(
+        CargoInvoice.objects.filter(
+            items_fetched=False,
+            transaction_date__range=(cargo_start, cargo_end),
+        ).order_by("transaction_date", "serial_number").values_list("serial_number", flat=True)
+    )
+
+
+def _store_cargo_invoice_items(serial: str, items: List[Dict[str, Any]]) -> None:
+    invoice = CargoInvoice.objects.get(serial_number=serial)
+    rows = []
+    for item in items:
+        order_num = str(item.get("orderNumber", ""))
+        if not order_num:
+            continue
+        rows.append(CargoInvoiceItem(
+            invoice=invoice,
+            order_number=order_num,
+            amount=Decimal(str(item.get("amount", 0) or 0)),
+        ))
+    with transaction.atomic():
+        CargoInvoiceItem.objects.filter(invoice=invoice).delete()
+        CargoInvoiceItem.objects.bulk_create(rows)
+        invoice.items_fetched = True
+        invoice.item_count = len(rows)
+        invoice.save(update_fields=["items_fetched", "item_count"])
+
+
+def sync_cargo_invoice_index(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    cargo_start: datetime.datetime,
+    cargo_end: datetime.datetime,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
+    max_workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> None:
+    """
+    Yerel kargo faturası indeksini pencere için günceller:
+    1. Daha önce taranmamış günler için DeductionInvoices çekilir
+    2. Kalemleri henüz çekilmemiş fatura seri no'ları için cargo-invoice items çekilir
+
+    Hata alan parça/fatura işaretlenmez; bir sonraki çalıştırmada tekrar denenir.
+    progress verilirse "deductions" ve "cargo_items" adımlarının ilerlemesi bildirilir.
+    """
+    if max_workers is None:
+        max_workers = getattr(settings, "TRENDYOL_CARGO_INVOICE_WORKERS", 4)
+
+    with span("db.cargo_index_plan") as trace_span:
+        chunks = _plan_deduction_scan(cargo_start, cargo_end)
+        trace_span.set(records=len(chunks))
+    logger.info(f"Kargo indeksi: {len(chunks)} taranmamış DeductionInvoices periyodu")
+
+    def _fetch_chunk(chunk: tuple) -> List[Dict[str, Any]]:
+        chunk_start, chunk_end = chunk
+        return fetch_deduction_invoices_for_period(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            start_date=int(chunk_start.timestamp() * 1000),
+            end_date=int(chunk_end.timestamp() * 1000),
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+            raise_on_error=True,
+        )
+
+    on_done = None
+    if progress is not None:
+        progress("deductions", 0, len(chunks))
+        on_done = lambda done: progress("deductions", done, len(chunks))
+
+    with span("cargo_index.deductions") as trace_span:
+        results = _parallel_map(_fetch_chunk, chunks, max_workers, on_done)
+        trace_span.set(records=sum(len(r) for r in results if not isinstance(r, Exception)))
+    for chunk, deductions in zip(chunks, results):
+        if isinstance(deductions, Exception):
+            logger.error(f"  DeductionInvoices {chunk[0].date()} - {chunk[1].date()} hata: {deductions}")
+            continue
+        with span("db.store_deductions", records=len(deductions)):
+            _store_deduction_chunk(chunk, deductions)
+
+    serials = _pending_cargo_serials(cargo_start, cargo_end)
+    logger.info(f"Kargo indeksi: {len(serials)} yeni kargo faturası seri no")
+
+    def _fetch_serial(serial: str) -> List[Dict[str, Any]]:
+        return fetch_cargo_invoice_items_all_pages(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            invoice_serial_number=serial,
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+            raise_on_error=True,
+        )
+
+    on_done = None
+    if progress is not None:
+        progress("cargo_items", 0, len(serials))
+        on_done = lambda done: progress("cargo_items", done, len(serials))
+
+    # Worker'lar yalnızca ağdan okur; DB yazımları bu thread'de yapılır
+    with span("cargo_index.items") as trace_span:
+        results = _parallel_map(_fetch_serial, serials, max_workers, on_done)
+        trace_span.set(records=sum(len(r) for r in results if not isinstance(r, Exception)))
+    for serial, items in zip(serials, results):
+        if isinstance(items, Exception):
+            logger.error(f"  kargo faturası {serial} hata: {items}")
+            continue
+        with span("db.store_cargo_items", records=len(items)):
+            _store_cargo_invoice_items(serial, items)
+
+
+def cargo_cost_by_order_from_index(
+    cargo_start: datetime.datetime,
+    cargo_end: datetime.datetime,
+) -> Dict[str, int]:
+    """Pencere içinde kesilmiş kargo faturalarından {orderNumber: toplam kargo (kuruş)} döner."""
+    with span("db.cargo_costs") as trace_span:
+        rows = (
+            CargoInvoiceItem.objects
+            .filter(invoice__transaction_date__range=(cargo_start, cargo_end))
+            .values("order_number")
+            .annotate(total=Sum("amount"))
+        )
+        cargo_by_order = {row["order_number"]: to_kurus(row["total"]) for row in rows}
+        trace_span.set(records=len(cargo_by_order))
+    return cargo_by_order
 
 
 def build_cargo_cost_by_order(
@@ -611,15 +1035,20 @@ def build_cargo_cost_by_order(
     store_front_code: str = "TRENDYOLTR",
     user_agent: Optional[str] = None,
     base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
-) -> Dict[str, float]:
+    max_workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, int]:
     """
-    Returns {orderNumber: total_cargo_cost} by:
+    Returns {orderNumber: total_cargo_cost (kuruş)} by:
     1. Fetching DeductionInvoices across 15-day periods
     2. Filtering records where transactionType is 'Kargo Faturası' / 'Kargo Fatura'
     3. Fetching cargo-invoice items for each invoice serial
 
     Kargo faturaları sipariş tarihinden 2-3 ay sonra kesilebilir;
     bu yüzden arama penceresi start_date-7 / end_date+120 olarak genişletilir.
+
+    Faturalar yerel indekste (CargoInvoice / CargoInvoiceItem) tutulur;
+    yalnızca daha önce taranmamış günler ve görülmemiş seri no'lar API'den çekilir.
     """
     cargo_start = start_date - datetime.timedelta(days=7)
     cargo_end = end_date + datetime.timedelta(days=120)
@@ -627,68 +1056,19 @@ def build_cargo_cost_by_order(
         f"build_cargo_cost_by_order arama penceresi: "
         f"{cargo_start.date()} - {cargo_end.date()}"
     )
-    periods = _split_into_15day_periods(cargo_start, cargo_end)
-    seen_serials: set = set()
-    serials: List[str] = []
-
-    for period_start, period_end in periods:
-        start_ts = int(period_start.timestamp() * 1000)
-        end_ts = int(period_end.timestamp() * 1000)
-        deductions = fetch_deduction_invoices_for_period(
-            seller_id=seller_id,
-            api_key=api_key,
-            api_secret=api_secret,
-            start_date=start_ts,
-            end_date=end_ts,
-            store_front_code=store_front_code,
-            user_agent=user_agent,
-            base_url=base_url,
-        )
-        for record in deductions:
-            if "kargo fatura" in (record.get("transactionType") or "").lower():
-                invoice_id = str(record.get("id", ""))
-                if invoice_id and invoice_id not in seen_serials:
-                    serials.append(invoice_id)
-                    seen_serials.add(invoice_id)
-
-    logger.info(f"build_cargo_cost_by_order: {len(serials)} adet kargo faturası seri no bulundu")
-
-    cargo_by_order: Dict[str, float] = {}
-
-    for serial in serials:
-        page = 0
-        size = 500
-        while True:
-            try:
-                resp = fetch_cargo_invoice_items(
-                    seller_id=seller_id,
-                    api_key=api_key,
-                    api_secret=api_secret,
-                    invoice_serial_number=serial,
-                    page=page,
-                    size=size,
-                    store_front_code=store_front_code,
-                    user_agent=user_agent,
-                    base_url=base_url,
-                )
-            except Exception as e:
-                logger.error(f"  kargo faturası {serial} page={page} hata: {e}")
-                break
-
-            content = resp.get("content", []) or []
-            for item in content:
-                order_num = str(item.get("orderNumber", ""))
-                amount = float(item.get("amount", 0) or 0)
-                if order_num:
-                    cargo_by_order[order_num] = round(
-                        cargo_by_order.get(order_num, 0.0) + amount, 2
-                    )
-
-            total_pages = resp.get("totalPages", 1)
-            if page >= total_pages - 1 or not content:
-                break
-            page += 1
-
+    sync_cargo_invoice_index(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        cargo_start=cargo_start,
+        cargo_end=cargo_end,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+        max_workers=max_workers,
+        progress=progress,
+    )
+    cargo_by_order = cargo_cost_by_order_from_index(cargo_start, cargo_end)
     logger.info(f"build_cargo_cost_by_order: {len(cargo_by_order)} sipariş için kargo maliyeti hesaplandı")
     return cargo_by_order
 
@@ -714,6 +1094,9 @@ def get_cargo_cost_for_order(
       2. Cargo Invoice Details — cargo-invoice/{invoiceSerialNumber}/items
          → orderNumber eşleşmesi ile amount (₺) bulunur
 
+    Önce yerel indekste order_number ile tek sorgu yapılır. Bulunamazsa pencere
+    için indeks güncellenir (yalnızca taranmamış günler) ve tekrar bakılır.
+
     Args:
         reference_date:   Siparişin settlement/teslim tarihi (arama merkezi).
         scan_window_days: reference_date'ten kaç gün sonraya kadar taransın.
@@ -725,17 +1108,396 @@ def get_cargo_cost_for_order(
     NOT: whoPays=None (Trendyol kargo öder) siparişler için Kargo Faturası
     hiçbir zaman DeductionInvoices'ta görünmez → return None beklenen sonuçtur.
     """
-    cargo_map = build_cargo_cost_by_order(
+    def _lookup() -> Optional[float]:
+        total = CargoInvoiceItem.objects.filter(order_number=order_number).aggregate(total=Sum("amount"))["total"]
+        return kurus_to_float(to_kurus(total)) if total is not None else None
+
+    cost = _lookup()
+    if cost is not None:
+        return cost
+
+    sync_cargo_invoice_index(
         seller_id=seller_id,
         api_key=api_key,
         api_secret=api_secret,
-        start_date=reference_date,
-        end_date=reference_date + datetime.timedelta(days=scan_window_days),
+        cargo_start=reference_date - datetime.timedelta(days=7),
+        cargo_end=reference_date + datetime.timedelta(days=scan_window_days + 120),
         store_front_code=store_front_code,
         user_agent=user_agent,
         base_url=base_url,
     )
-    return cargo_map.get(order_number)
+    return _lookup()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SETTLEMENTS WAREHOUSE — yerel settlement deposu
+# ─────────────────────────────────────────────────────────────────────────────
+
+SETTLEMENT_TYPES = ["Sale", "Return"]
+
+
+def _settlement_sync_key(transaction_type: str) -> str:
+    return f"settlements:{transaction_type}"
+
+
+def _settlement_id(record: Dict[str, Any]) -> Optional[str]:
+    settlement_id = record.get("id")
+    return str(settlement_id) if settlement_id not in (None, "") else None
+
+
+def _unique_settlements(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Periyot sınırlarında iki kez gelen (aynı id'li) settlement'ları atlar."""
+    seen: set = set()
+    for record in records:
+        settlement_id = _settlement_id(record)
+        if settlement_id is not None:
+            if settlement_id in seen:
+                continue
+            seen.add(settlement_id)
+        yield record
+
+
+def _settlement_to_model(record: Dict[str, Any], sync_type: str) -> Optional[TrendyolSettlement]:
+    tx_dt = convert_timestamp_to_datetime(record.get("transactionDate"))
+    if not tx_dt:
+        return None
+    order_number = str(record.get("orderNumber") or "")
+    barcode = record.get("barcode") or ""
+    transaction_type = record.get("transactionType") or sync_type
+    # id alanı yoksa satırı benzersiz tanımlayan alanlardan anahtar üret
+    settlement_id = _settlement_id(record) or (
+        f"{order_number}:{barcode}:{transaction_type}:{record.get('transactionDate')}"
+    )
+    return TrendyolSettlement(
+        settlement_id=settlement_id,
+        sync_type=sync_type,
+        transaction_type=transaction_type,
+        transaction_date=tx_dt,
+        order_number=order_number,
+        barcode=barcode,
+        seller_revenue=Decimal(str(record.get("sellerRevenue") or 0)),
+        commission_amount=Decimal(str(record.get("commissionAmount") or 0)),
+    )
+
+
+def sync_settlements(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    transaction_types: Optional[List[str]] = None,
+    initial_start: Optional[datetime.datetime] = None,
+    recheck_days: Optional[int] = None,
+    until: Optional[datetime.datetime] = None,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
+) -> Dict[str, int]:
+    """
+    Settlement'ları yerel TrendyolSettlement tablosuna artımlı olarak senkronlar.
+
+    Her transaction type için TrendyolSyncState'te yerelde tam olan aralık
+    (synced_from - synced_until) tutulur. Sadece (synced_until - recheck_days)
+    sonrası çekilir; geç gelen/düzeltilen kayıtlar recheck penceresiyle yakalanır.
+    initial_start açıkça verilmiş ve synced_from'dan önceyse aralık geriye doğru
+    genişletilir (initial_start'tan itibaren yeniden çekilir). Herhangi bir sayfa
+    hata verirse o tipin durumu değişmez.
+
+    Döner: {transaction_type: upsert edilen kayıt sayısı}
+    """
+    if transaction_types is None:
+        transaction_types = SETTLEMENT_TYPES
+    if recheck_days is None:
+        recheck_days = getattr(settings, "TRENDYOL_SETTLEMENT_RECHECK_DAYS", 3)
+    if until is None:
+        until = datetime.datetime.now(tz=datetime.timezone.utc)
+    backfill = initial_start is not None
+    if initial_start is None:
+        initial_start = until - datetime.timedelta(
+            days=getattr(settings, "TRENDYOL_SETTLEMENT_INITIAL_DAYS", 365)
+        )
+
+    counts: Dict[str, int] = {}
+    for transaction_type in transaction_types:
+        key = _settlement_sync_key(transaction_type)
+        state = TrendyolSyncState.objects.filter(key=key).first()
+        if state and not (backfill and (state.synced_from is None or initial_start < state.synced_from)):
+            start = state.synced_until - datetime.timedelta(days=recheck_days)
+            synced_from = state.synced_from
+        else:
+            start = initial_start
+            synced_from = initial_start
+        logger.info(f"sync_settlements {transaction_type}: {start} → {until}")
+
+        pages = iter_settlement_pages(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            periods=_split_into_15day_periods(start, until),
+            transaction_types=[transaction_type],
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+            raise_on_error=True,
+        )
+
+        # Sayfalar geldikçe upsert edilir (idempotent); işaret yalnızca hepsi yazılınca ilerler
+        stored = 0
+        for records in pages:
+            rows = [row for row in (_settlement_to_model(r, transaction_type) for r in records) if row]
+            TrendyolSettlement.objects.bulk_create(
+                rows,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=["settlement_id"],
+                update_fields=[
+                    "sync_type", "transaction_type", "transaction_date", "order_number",
+                    "barcode", "seller_revenue", "commission_amount", "synced_at",
+                ],
+            )
+            stored += len(rows)
+        TrendyolSyncState.objects.update_or_create(
+            key=key, defaults={"synced_from": synced_from, "synced_until": until}
+        )
+        counts[transaction_type] = stored
+        logger.info(f"sync_settlements {transaction_type}: {stored} kayıt kaydedildi")
+    return counts
+
+
+def settlements_synced_range(
+    transaction_types: Optional[List[str]] = None,
+) -> Optional[Tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Verilen tiplerin hepsinin yerelde tam olduğu (başlangıç, bitiş) aralığı.
+    Bir tip hiç senkronlanmamışsa ya da alt sınırı bilinmiyorsa None.
+    """
+    if transaction_types is None:
+        transaction_types = SETTLEMENT_TYPES
+    keys = [_settlement_sync_key(t) for t in transaction_types]
+    states = list(TrendyolSyncState.objects.filter(key__in=keys).values_list("synced_from", "synced_until"))
+    if len(states) < len(keys) or any(synced_from is None for synced_from, _ in states):
+        return None
+    return max(synced_from for synced_from, _ in states), min(synced_until for _, synced_until in states)
+
+
+def iter_local_settlements(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    transaction_types: Optional[List[str]] = None,
+):
+    """Yerel depodaki settlement'ları API kaydı biçiminde (dict) tarih sırasıyla döner."""
+    if transaction_types is None:
+        transaction_types = SETTLEMENT_TYPES
+    rows = (
+        TrendyolSettlement.objects
+        .filter(sync_type__in=transaction_types, transaction_date__range=(start_date, end_date))
+        .order_by("transaction_date", "id")
+        .values_list("settlement_id", "transaction_type", "transaction_date",
+                     "order_number", "barcode", "seller_revenue")
+    )
+    for settlement_id, transaction_type, tx_dt, order_number, barcode, seller_revenue in rows.iterator(chunk_size=2000):
+        yield {
+            "id": settlement_id,
+            "transactionType": transaction_type,
+            "transactionDate": int(tx_dt.timestamp() * 1000),
+            "orderNumber": order_number,
+            "barcode": barcode,
+            # Decimal olarak bırakılır; toplayıcılar money.to_kurus ile kuruşa çevirir
+            "sellerRevenue": seller_revenue,
+        }
+
+
+def _use_local_settlements(source: str, start_date: datetime.datetime, end_date: datetime.datetime) -> bool:
+    if source == "local":
+        return True
+    if source == "api":
+        return False
+    synced_range = settlements_synced_range()
+    return synced_range is not None and synced_range[0] <= start_date and synced_range[1] >= end_date
+
+
+def iter_settlements(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    source: str = "auto",
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
+    progress: Optional[ProgressCallback] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Sale + Return settlement'larını sayfa sayfa üretir (tüm liste bellekte tutulmaz).
+
+    source="auto": aralık yerel depoda tamamen senkronlanmışsa yerelden, değilse API'den.
+    source="local" / "api": kaynağı zorla.
+    """
+    if _use_local_settlements(source, start_date, end_date):
+        logger.info(f"  Settlement kaynağı: yerel depo ({start_date.date()} - {end_date.date()})")
+        yield from iter_local_settlements(start_date, end_date)
+        return
+
+    logger.info(f"  Settlement kaynağı: Trendyol API ({start_date.date()} - {end_date.date()})")
+    for page in iter_settlement_pages(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        periods=_split_into_15day_periods(start_date, end_date),
+        transaction_types=SETTLEMENT_TYPES,
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
+        progress=progress,
+    ):
+        yield from page
+
+
+def load_settlements(**kwargs) -> List[Dict[str, Any]]:
+    """iter_settlements sonucunu liste olarak döner."""
+    return list(iter_settlements(**kwargs))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# KARGO FATURASI BEKLEYEN SİPARİŞLER — artımlı takip tablosu
+# ─────────────────────────────────────────────────────────────────────────────
+
+AWAITING_CARGO_SYNC_KEY = "awaiting_cargo:settlements"
+
+
+def advance_awaiting_cargo_invoices(
+    *,
+    seller_id: str,
+    api_key: str,
+    api_secret: str,
+    lookback_days: int = 90,
+    sync: bool = True,
+    store_front_code: str = "TRENDYOLTR",
+    user_agent: Optional[str] = None,
+    base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
+) -> Dict[str, int]:
+    """
+    AwaitingCargoInvoice tablosunu son çalıştırmadan bu yana olan değişikliklerle günceller:
+
+    1. sync=True ise settlement deposu ve kargo faturası indeksi artımlı senkronlanır
+       (yalnızca son senkrondan sonrası ve taranmamış günler; günde birkaç API çağrısı).
+       Depo hiç senkronlanmamışsa ya da lookback_days'ten kısa bir aralığı kapsıyorsa
+       lookback başlangıcından itibaren doldurulur; paylaşılan senkron durumu bu alt
+       sınırı (synced_from) kaydeder, böylece rapor daha eski ayları depodan okumaz.
+    2. Son çalıştırmadan beri depoya yazılmış settlement'ların siparişleri eklenir
+       (kargo faturası zaten görülmüş olanlar hariç)
+    3. Kargo faturası kalemi görülen siparişler tablodan silinir
+    4. lookback_days'ten eski kayıtlar atılır (Trendyol'un kargo ödediği siparişler)
+
+    Döner: {"added": ..., "resolved": ..., "expired": ..., "awaiting": ...}
+    """
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    lookback_start = now - datetime.timedelta(days=lookback_days)
+
+    if sync:
+        sync_settlements(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            initial_start=lookback_start,
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+        )
+
+    # 2. Depoya son çalıştırmadan beri yazılan (yeni veya güncellenen) settlement'ların siparişleri
+    state = TrendyolSyncState.objects.filter(key=AWAITING_CARGO_SYNC_KEY).first()
+    changed = TrendyolSettlement.objects.filter(transaction_date__gte=lookback_start).exclude(order_number="")
+    if state:
+        changed = changed.filter(synced_at__gte=state.synced_until)
+    first_row = TrendyolSettlement.objects.filter(order_number=OuterRef("order_number")).order_by("transaction_date")
+    rows = (
+        TrendyolSettlement.objects
+        .filter(order_number__in=changed.values("order_number"))
+        .exclude(order_number__in=CargoInvoiceItem.objects.values("order_number"))
+        .values("order_number")
+        .annotate(
+            first_date=Min("transaction_date"),
+            revenue=Sum("seller_revenue"),
+            first_barcode=Subquery(first_row.values("barcode")[:1]),
+            first_type=Subquery(first_row.values("transaction_type")[:1]),
+        )
+    )
+    awaiting = [
+        AwaitingCargoInvoice(
+            order_number=row["order_number"],
+            barcode=row["first_barcode"] or "",
+            transaction_type=row["first_type"] or "",
+            transaction_date=row["first_date"],
+            seller_revenue=row["revenue"] or 0,
+        )
+        for row in rows
+    ]
+    AwaitingCargoInvoice.objects.bulk_create(
+        awaiting,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["order_number"],
+        update_fields=["barcode", "transaction_type", "transaction_date", "seller_revenue"],
+    )
+
+    # 3. Bekleyenlerin penceresindeki yeni kargo faturaları (taranmış günler tekrar taranmaz)
+    oldest = AwaitingCargoInvoice.objects.aggregate(oldest=Min("transaction_date"))["oldest"]
+    if sync and oldest is not None:
+        sync_cargo_invoice_index(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            cargo_start=oldest - datetime.timedelta(days=7),
+            cargo_end=now,
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+        )
+    resolved, _ = AwaitingCargoInvoice.objects.filter(
+        order_number__in=CargoInvoiceItem.objects.values("order_number")
+    ).delete()
+    expired, _ = AwaitingCargoInvoice.objects.filter(transaction_date__lt=lookback_start).delete()
+
+    TrendyolSyncState.objects.update_or_create(key=AWAITING_CARGO_SYNC_KEY, defaults={"synced_until": now})
+    counts = {
+        "added": len(awaiting),
+        "resolved": resolved,
+        "expired": expired,
+        "awaiting": AwaitingCargoInvoice.objects.count(),
+    }
+    logger.info(
+        f"Kargo faturası bekleyenler: +{counts['added']} eklendi/güncellendi, "
+        f"-{resolved} faturası geldi, -{expired} süresi doldu, {counts['awaiting']} bekliyor"
+    )
+    return counts
+
+
+def awaiting_cargo_report(legal_days: int = 7, min_days: int = 60) -> List[Dict[str, Any]]:
+    """
+    AwaitingCargoInvoice tablosundan, settlement'ının üzerinden en az min_days
+    geçmiş siparişler (fetch_delivered_orders_without_cargo ile aynı biçimde).
+    API'ye gidilmez.
+    """
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    rows = AwaitingCargoInvoice.objects.filter(
+        transaction_date__lte=now - datetime.timedelta(days=max(min_days, legal_days))
+    ).order_by("transaction_date")
+    missing = []
+    for row in rows:
+        days_since = (now - row.transaction_date).days
+        missing.append({
+            "order_number": row.order_number,
+            "barcode": row.barcode,
+            "seller_revenue": kurus_to_float(to_kurus(row.seller_revenue)),
+            "transaction_date": row.transaction_date,
+            "transaction_type": row.transaction_type,
+            "days_since_delivery": days_since,
+            "days_overdue": days_since - legal_days,
+        })
+    return missing
 
 
 def fetch_delivered_orders_without_cargo(
@@ -746,6 +1508,7 @@ def fetch_delivered_orders_without_cargo(
     legal_days: int = 7,
     lookback_days: int = 90,
     min_days: int = 60,
+    source: str = "auto",
     store_front_code: str = "TRENDYOLTR",
     user_agent: Optional[str] = None,
     base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
@@ -762,6 +1525,9 @@ def fetch_delivered_orders_without_cargo(
               min_days ile bu siparişleri false-positive olarak raporlamaktan
               kaçınılır. Varsayılan: 60 gün.
 
+    AwaitingCargoInvoice tablosu önce artımlı ilerletilir (source="local" ise
+    API'ye gidilmez), rapor tablodan okunur.
+
     Döner: List[dict] — her eleman:
         {
             order_number: str,
@@ -773,111 +1539,298 @@ def fetch_delivered_orders_without_cargo(
             days_overdue: int,
         }
     """
-    now = datetime.datetime.now(tz=datetime.timezone.utc)
-    # Fatura kesilebilmesi için yasal süre dolmuş olmalı
-    cutoff_date = now - datetime.timedelta(days=legal_days)
-    # En fazla lookback_days geriye bak
-    lookback_start = now - datetime.timedelta(days=lookback_days)
-
-    logger.info(
-        f"fetch_delivered_orders_without_cargo: "
-        f"{lookback_start.date()} → {cutoff_date.date()} "
-        f"(yasal süre={legal_days} gün, lookback={lookback_days} gün, min_days={min_days} gün)"
+    advance_awaiting_cargo_invoices(
+        seller_id=seller_id,
+        api_key=api_key,
+        api_secret=api_secret,
+        lookback_days=lookback_days,
+        sync=source != "local",
+        store_front_code=store_front_code,
+        user_agent=user_agent,
+        base_url=base_url,
     )
+    missing = awaiting_cargo_report(legal_days=legal_days, min_days=min_days)
+    logger.info(f"  Kargo faturası eksik sipariş sayısı: {len(missing)}")
+    return missing
 
-    # 1. Bu aralıktaki tüm Sale + Return settlement'larını çek
-    periods = _split_into_15day_periods(lookback_start, cutoff_date)
-    all_settlements: List[Dict[str, Any]] = []
 
-    for period_start, period_end in periods:
-        start_ts = int(period_start.timestamp() * 1000)
-        end_ts = int(period_end.timestamp() * 1000)
-        chunk = fetch_settlements_all_pages(
-            seller_id=seller_id,
-            api_key=api_key,
-            api_secret=api_secret,
-            start_ts=start_ts,
-            end_ts=end_ts,
-            transaction_types=["Sale", "Return"],
-            store_front_code=store_front_code,
-            user_agent=user_agent,
-            base_url=base_url,
-        )
-        all_settlements.extend(chunk)
+RETURN_TYPES = ("Return", "İade")
+# Sipariş başına sabit işlem ücreti (kuruş)
+TRANSACTION_FEE = to_kurus(15)
+MONEY_FIELDS = ("seller_revenue", "cargo_cost", "purchase_cost", "transaction_fee", "net_profit")
 
-    logger.info(f"  {len(all_settlements)} settlement kaydı toplandı")
 
-    # 2. Benzersiz sipariş numaralarını + ilk göründükleri tarihi takip et
-    # (aynı sipariş birden fazla satırda çıkabilir — birden fazla ürün)
-    order_map: Dict[str, Dict[str, Any]] = {}
-    for s in all_settlements:
-        order_num = str(s.get("orderNumber", ""))
-        if not order_num:
-            continue
-        tx_ms = s.get("transactionDate")
-        tx_dt = convert_timestamp_to_datetime(tx_ms) if tx_ms else None
+# Tekrar kontrolü penceresi: bir periyot (15 gün) + pay. Kayıtlar periyot sırasıyla
+# geldiğinden tekrarlar (sayfa kayması, periyot sınırı) bu pencerenin içinde kalır
+DEDUP_WINDOW_MS = 16 * 86_400_000
+
+
+class SettlementAccumulator:
+    """
+    Settlement kayıtlarını geldikçe aylık kovalara, (ay, barkod) kovalarına ve
+    sipariş pivotuna katlar.
+
+    Ham kayıt listesi tutulmaz. Bellekte kalanlar:
+    - aylık ve (ay, barkod) kovaları: ay × barkod sayısıyla sınırlı;
+    - sipariş pivotu: kalem başına bir tuple (sipariş detayı kalemleri gösterdiği
+      için çıktının kendisi kadar);
+    - sipariş numarası olmayan kalemler: yalnızca işaretli işlem zamanı (8 bayt),
+      fiyatı değişmiş barkodların maliyetini işlem tarihinden hesaplamak için;
+    - tekrar kontrolü: yalnızca son ~2 × DEDUP_WINDOW_MS'lik işlem tarihli id'ler.
+      Kayıtlar tarih/periyot sırasıyla gelir (API periyotları, yerel depo); pencereden
+      eski id'ler atılır.
+
+    Fiyatı değişmiş barkodların maliyeti finalize()'da kalemin işlem tarihindeki
+    fiyatla, diğerleri adet × güncel fiyatla hesaplanır. Kargo ve alış fiyatı gerektiren
+    tutarlar finalize()'da hesaplanır; böylece kargo indeksi ve fiyat haritası
+    settlement akışından bağımsız hazırlanabilir.
+
+    Tutarlar kuruş (int) olarak toplanır; finalize() çıktısı 2 ondalıklı float ₺'dir.
+    """
+
+    def __init__(self) -> None:
+        self.monthly: Dict[str, Dict[str, Any]] = {}
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.barcodes: set = set()
+        self.records = 0
+        self.duplicates = 0
+        # id → işlem zamanı ms; DEDUP_WINDOW_MS'den eski olanlar atılır
+        self._seen_ids: Dict[str, int] = {}
+        self._high_water = 0
+        self._evicted_at = 0
+        # (month_key, barcode) → [satış adedi, iade adedi, satıcı geliri]
+        self._barcode_months: Dict[tuple, List[int]] = {}
+        # Sipariş numarası olmayan kalemler: (month_key, barcode) → işaretli işlem zamanları (iade negatif)
+        self._loose_lines: Dict[tuple, array.array] = {}
+
+    def _remember(self, settlement_id: str, timestamp_ms: int) -> None:
+        self._seen_ids[settlement_id] = timestamp_ms
+        if timestamp_ms > self._high_water:
+            self._high_water = timestamp_ms
+        if self._high_water - self._evicted_at >= DEDUP_WINDOW_MS:
+            cutoff = self._high_water - DEDUP_WINDOW_MS
+            self._seen_ids = {key: ts for key, ts in self._seen_ids.items() if ts >= cutoff}
+            self._evicted_at = self._high_water
+
+    def add(self, s: Dict[str, Any]) -> None:
+        transaction_date_ms = s.get("transactionDate")
+        settlement_id = _settlement_id(s)
+        if settlement_id is not None:
+            if settlement_id in self._seen_ids:
+                self.duplicates += 1
+                return
+            self._remember(settlement_id, transaction_date_ms or 0)
+
+        if not transaction_date_ms:
+            return
+        tx_dt = convert_timestamp_to_datetime(transaction_date_ms)
         if not tx_dt:
-            continue
+            return
+        self.records += 1
+
+        barcode = s.get("barcode") or ""
+        order_number = str(s.get("orderNumber") or "")
+        seller_revenue = to_kurus(s.get("sellerRevenue"))
+        transaction_type = s.get("transactionType") or ""
+        month_key = tx_dt.strftime("%Y-%m")
+
+        bucket = self.monthly.get(month_key)
+        if bucket is None:
+            bucket = self.monthly[month_key] = {
+                "month_key": month_key,
+                "month_label": f"{TURKISH_MONTHS[tx_dt.month]} {tx_dt.year}",
+                "seller_revenue": 0,
+                "cargo_cost": 0,
+                "purchase_cost": 0,
+                "transaction_fee": 0,
+                "order_count": 0,
+                "net_profit": 0,
+            }
 
-        if order_num not in order_map:
-            order_map[order_num] = {
-                "order_number": order_num,
-                "barcode": s.get("barcode", ""),
-                "seller_revenue": 0.0,
-                "transaction_date": tx_dt,
-                "transaction_type": s.get("transactionType", ""),
+        # sellerRevenue: positive for Sale, negative for Return (API signs it correctly)
+        bucket["seller_revenue"] += seller_revenue
+
+        is_return = transaction_type in RETURN_TYPES
+        if barcode:
+            self.barcodes.add(barcode)
+            counts = self._barcode_months.get((month_key, barcode))
+            if counts is None:
+                counts = self._barcode_months[(month_key, barcode)] = [0, 0, 0]
+            counts[1 if is_return else 0] += 1
+            counts[2] += seller_revenue
+
+        if not order_number:
+            if barcode:
+                stamps = self._loose_lines.get((month_key, barcode))
+                if stamps is None:
+                    stamps = self._loose_lines[(month_key, barcode)] = array.array("q")
+                stamps.append(-transaction_date_ms if is_return else transaction_date_ms)
+            return
+
+        order = self.orders.get(order_number)
+        if order is None:
+            # Kargo + işlem ücreti siparişin ilk göründüğü aya yazılır
+            bucket["transaction_fee"] += TRANSACTION_FEE
+            bucket["order_count"] += 1
+            order = self.orders[order_number] = {
+                "orderNumber": order_number,
+                "transactionDate": tx_dt,
+                "_month": month_key,
+                "_lines": [],
             }
-        order_map[order_num]["seller_revenue"] += float(s.get("sellerRevenue") or 0)
+        order["_lines"].append((barcode, seller_revenue, transaction_type, month_key, transaction_date_ms))
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> "SettlementAccumulator":
+        for record in records:
+            self.add(record)
+        return self
+
+    def finalize(self, cargo_by_order: Dict[str, int], price_map: Dict[str, int]) -> tuple:
+        """
+        Kargo ve alış fiyatlarını (kuruş) uygular, tutarları ₺'ye çevirir.
+        price_map bir PurchasePriceIndex ise tarihçesi olan barkodlar işlem
+        tarihindeki fiyattan maliyetlenir.
+
+        Her ayın "barcodes" listesi ayın barkod bazlı kârlılığıdır (BarcodeMonthlyRollup):
+        gelir, adet ve alış maliyeti kalemin ayına; kargo ve işlem ücreti siparişin ayına,
+        siparişin satış kalemlerine (satış yoksa tüm kalemlerine) eşit bölünerek yazılır.
+        Barkodlu kalemlerin toplamı ayın toplamlarına eşittir.
+
+        Döner: (monthly_list, missing_barcodes, order_list)
+        """
+        monthly = self.monthly
+        missing_barcodes = sorted(b for b in self.barcodes if b not in price_map)
+        history = getattr(price_map, "history", {})
+        rows: Dict[tuple, Dict[str, int]] = {}
+
+        def row(month_key: str, barcode: str) -> Dict[str, int]:
+            found = rows.get((month_key, barcode))
+            if found is None:
+                found = rows[(month_key, barcode)] = dict.fromkeys(BARCODE_ROLLUP_FIELDS, 0)
+            return found
+
+        def add_cost(month_key: str, barcode: str, cost: int) -> None:
+            monthly[month_key]["purchase_cost"] += cost
+            row(month_key, barcode)["purchase_cost"] += cost
+
+        for (month_key, barcode), (sold, returned, revenue) in self._barcode_months.items():
+            target = row(month_key, barcode)
+            target["units_sold"] += sold
+            target["units_returned"] += returned
+            target["seller_revenue"] += revenue
+            if barcode in price_map and barcode not in history:
+                add_cost(month_key, barcode, (sold - returned) * price_map[barcode])
+        for (month_key, barcode), stamps in self._loose_lines.items():
+            if barcode in history:
+                for stamp in stamps:
+                    price = price_map.price_at(barcode, abs(stamp))
+                    add_cost(month_key, barcode, -price if stamp < 0 else price)
+
+        # Order-level pivot
+        for order_number, data in self.orders.items():
+            order_month = data.pop("_month")
+            lines = data.pop("_lines")
+            cargo = cargo_by_order.get(order_number, 0)
+            monthly[order_month]["cargo_cost"] += cargo
+            total_revenue = total_purchase = 0
+            items = []
+            for barcode, seller_revenue, transaction_type, month_key, timestamp_ms in lines:
+                is_return = transaction_type in RETURN_TYPES
+                if barcode in history:
+                    purchase_price = price_map.price_at(barcode, timestamp_ms)
+                    add_cost(month_key, barcode, -purchase_price if is_return else purchase_price)
+                else:
+                    purchase_price = price_map.get(barcode, 0) if barcode else 0
+                total_revenue += seller_revenue
+                total_purchase += -purchase_price if is_return else purchase_price
+                items.append({
+                    "barcode": barcode,
+                    "sellerRevenue": kurus_to_float(seller_revenue),
+                    "purchasePrice": kurus_to_float(purchase_price),
+                    "transactionType": transaction_type,
+                })
+
+            barcoded = [line for line in lines if line[0]]
+            sales = [line for line in barcoded if line[2] not in RETURN_TYPES] or barcoded
+            for barcode in {line[0] for line in barcoded}:
+                row(order_month, barcode)["order_count"] += 1
+            shares = zip(_split_kurus(cargo, len(sales)), _split_kurus(TRANSACTION_FEE, len(sales)))
+            for line, (cargo_share, fee_share) in zip(sales, shares):
+                target = row(order_month, line[0])
+                target["cargo_cost"] += cargo_share
+                target["transaction_fee"] += fee_share
+
+            data["items"] = items
+            data["totalSellerRevenue"] = kurus_to_float(total_revenue)
+            data["totalPurchasePrice"] = kurus_to_float(total_purchase)
+            data["totalShippingFee"] = kurus_to_float(cargo)
+            data["cargoFound"] = cargo > 0
+            data["itemCount"] = len(items)
+            data["totalNetProfit"] = kurus_to_float(total_revenue - total_purchase - cargo - TRANSACTION_FEE)
+
+        order_list = sorted(
+            self.orders.values(),
+            key=lambda x: x.get("transactionDate") or datetime.datetime.min.replace(tzinfo=datetime.timezone.utc),
+            reverse=True,
+        )
+
+        for data in monthly.values():
+            data["barcodes"] = []
+        for (month_key, barcode), totals in sorted(rows.items()):
+            monthly[month_key]["barcodes"].append(_barcode_row(barcode, totals, barcode in price_map))
+
+        # Net profit, then kuruş → ₺
+        for data in monthly.values():
+            data["net_profit"] = (
+                data["seller_revenue"] - data["cargo_cost"] - data["purchase_cost"] - data["transaction_fee"]
+            )
+            for field in MONEY_FIELDS:
+                data[field] = kurus_to_float(data[field])
+
+        monthly_list = sorted(monthly.values(), key=lambda x: x["month_key"])
+        return monthly_list, missing_barcodes, order_list
+
 
-    logger.info(f"  {len(order_map)} benzersiz sipariş bulundu")
+BARCODE_ROLLUP_FIELDS = (
+    "units_sold", "units_returned", "order_count", "seller_revenue", "purchase_cost", "cargo_cost", "transaction_fee",
+)
 
-    if not order_map:
+
+def _split_kurus(total: int, parts: int) -> List[int]:
+    """total kuruşu parts paya böler; artan kuruşlar ilk paylara eklenir (toplam korunur)."""
+    if parts <= 0:
         return []
+    share, remainder = divmod(total, parts)
+    return [share + (1 if i < remainder else 0) for i in range(parts)]
+
+
+def _barcode_row(barcode: str, totals: Dict[str, int], priced: bool) -> Dict[str, Any]:
+    """(ay, barkod) kovası → monthly_list[...]["barcodes"] satırı (tutarlar ₺)."""
+    net = totals["seller_revenue"] - totals["purchase_cost"] - totals["cargo_cost"] - totals["transaction_fee"]
+    return {
+        "barcode": barcode,
+        "units_sold": totals["units_sold"],
+        "units_returned": totals["units_returned"],
+        "order_count": totals["order_count"],
+        "seller_revenue": kurus_to_float(totals["seller_revenue"]),
+        "purchase_cost": kurus_to_float(totals["purchase_cost"]),
+        "cargo_cost": kurus_to_float(totals["cargo_cost"]),
+        "transaction_fee": kurus_to_float(totals["transaction_fee"]),
+        "net_profit": kurus_to_float(net),
+        "cost_missing": not priced,
+    }
 
-    # 3. Bu siparişler için kargo fatura sorgusunu yap
-    # Pencere: lookback_start - 7 gün / cutoff_date (build_cargo_cost_by_order +120 gün ekler)
-    cargo_by_order = build_cargo_cost_by_order(
-        seller_id=seller_id,
-        api_key=api_key,
-        api_secret=api_secret,
-        start_date=lookback_start - datetime.timedelta(days=7),
-        end_date=cutoff_date,
-        store_front_code=store_front_code,
-        user_agent=user_agent,
-        base_url=base_url,
-    )
 
-    logger.info(f"  {len(cargo_by_order)} sipariş için kargo faturası bulundu")
-
-    # 4. Kargo faturası gelmeyen siparişleri filtrele
-    missing: List[Dict[str, Any]] = []
-    for order_num, info in order_map.items():
-        if order_num not in cargo_by_order:
-            tx_dt = info["transaction_date"]
-            days_since = (now - tx_dt).days
-            days_overdue = days_since - legal_days
-            # min_days'den daha yeni settlement'ları atla —
-            # Trendyol kargo ödüyorsa fatura HİÇ kesilmez, false-positive olur
-            if days_since < min_days:
-                logger.debug(
-                    f"  {order_num} atlandı: {days_since} gün önce settle edildi "
-                    f"(min_days={min_days})"
-                )
-                continue
-            missing.append({
-                "order_number": order_num,
-                "barcode": info["barcode"],
-                "seller_revenue": round(info["seller_revenue"], 2),
-                "transaction_date": tx_dt,
-                "transaction_type": info["transaction_type"],
-                "days_since_delivery": days_since,
-                "days_overdue": days_overdue,
-            })
-
-    # En uzun süredir bekleyenler en üstte
-    missing.sort(key=lambda x: x["days_overdue"], reverse=True)
-    logger.info(f"  Kargo faturası eksik sipariş sayısı: {len(missing)}")
-    return missing
+def summarize_settlements(
+    all_settlements: Iterable[Dict[str, Any]],
+    cargo_by_order: Dict[str, int],
+    price_map: Dict[str, int],
+) -> tuple:
+    """
+    Settlement kayıtlarını aylık kovalara ve sipariş bazlı pivota dönüştürür.
+    Döner: (monthly_list, missing_barcodes, order_list)
+    """
+    return SettlementAccumulator().extend(all_settlements).finalize(cargo_by_order, price_map)
 
 
 def calculate_monthly_summary(
@@ -887,9 +1840,11 @@ def calculate_monthly_summary(
     api_secret: str,
     start_date: datetime.datetime,
     end_date: datetime.datetime,
+    source: str = "auto",
     store_front_code: str = "TRENDYOLTR",
     user_agent: Optional[str] = None,
     base_url: str = "https://apigw.trendyol.com/integration/finance/che/sellers",
+    progress: Optional[ProgressCallback] = None,
 ) -> tuple:
     """
     Aylık kasa özetini hesaplar.
@@ -905,157 +1860,73 @@ def calculate_monthly_summary(
       (Sale pozitif, Return negatif — API zaten işaretler)
     - cargo_cost: cargo-invoice/items toplamı (gönderim + iade kargo)
     - purchase_cost: yerel DB'den barcode → purchase_price toplamı
+
+    source: "auto" (varsayılan) aralık sync_settlements ile yerel depoya
+    senkronlanmışsa settlement'ları yerelden okur; "api" / "local" kaynağı zorlar.
+
+    progress: verilirse her adımda progress(phase, done, total) çağrılır
+    (settlements, deductions, cargo_items, purchase_prices, aggregate).
     """
     logger.info("calculate_monthly_summary başlıyor...")
 
-    # 1. Fetch Sale + Return settlements split into 15-day chunks
-    periods = _split_into_15day_periods(start_date, end_date)
-    all_settlements: List[Dict[str, Any]] = []
+    # 1. Sale + Return settlements — local warehouse if synced, otherwise API (15-day chunks in parallel).
+    # Sayfalar geldikçe aylık kovalara / sipariş pivotuna katlanır; ham liste tutulmaz
+    from .columnar import make_settlement_accumulator  # columnar bu modülü import eder
 
-    for period_start, period_end in periods:
-        start_ts = int(period_start.timestamp() * 1000)
-        end_ts = int(period_end.timestamp() * 1000)
-        chunk = fetch_settlements_all_pages(
+    accumulator = make_settlement_accumulator()
+    with span("settlements") as trace_span:
+        accumulator.extend(iter_settlements(
             seller_id=seller_id,
             api_key=api_key,
             api_secret=api_secret,
-            start_ts=start_ts,
-            end_ts=end_ts,
-            transaction_types=["Sale", "Return"],
+            start_date=start_date,
+            end_date=end_date,
+            source=source,
             store_front_code=store_front_code,
             user_agent=user_agent,
             base_url=base_url,
-        )
-        all_settlements.extend(chunk)
-
-    logger.info(f"  Toplam {len(all_settlements)} settlement kaydı (Sale + Return)")
+            progress=progress,
+        ))
+        trace_span.set(records=accumulator.records)
 
-    # 2. Build cargo cost per order across full date range
-    cargo_by_order = build_cargo_cost_by_order(
-        seller_id=seller_id,
-        api_key=api_key,
-        api_secret=api_secret,
-        start_date=start_date,
-        end_date=end_date,
-        store_front_code=store_front_code,
-        user_agent=user_agent,
-        base_url=base_url,
+    logger.info(
+        f"  Toplam {accumulator.records} settlement kaydı (Sale + Return), "
+        f"{accumulator.duplicates} tekrar eden kayıt atlandı"
     )
 
-    # 3. Process settlements → monthly buckets + order-level pivot
-    monthly: Dict[str, Dict[str, Any]] = {}
-    orders: Dict[str, Dict[str, Any]] = {}
-    missing_barcodes: set = set()
-    # Track which orders' cargo cost has been attributed (to avoid double-counting multi-item orders)
-    processed_cargo_orders: Dict[str, str] = {}
-
-    for s in all_settlements:
-        barcode = s.get("barcode") or ""
-        order_number = str(s.get("orderNumber", ""))
-        seller_revenue = float(s.get("sellerRevenue") or 0)
-        transaction_date_ms = s.get("transactionDate")
-        transaction_type = s.get("transactionType", "")
-
-        if not transaction_date_ms:
-            continue
-
-        tx_dt = convert_timestamp_to_datetime(transaction_date_ms)
-        if not tx_dt:
-            continue
-
-        month_key = tx_dt.strftime("%Y-%m")
-
-        if month_key not in monthly:
-            monthly[month_key] = {
-                "month_key": month_key,
-                "month_label": f"{TURKISH_MONTHS[tx_dt.month]} {tx_dt.year}",
-                "seller_revenue": 0.0,
-                "cargo_cost": 0.0,
-                "purchase_cost": 0.0,
-                "transaction_fee": 0.0,
-                "order_count": 0,
-                "net_profit": 0.0,
-            }
-
-        # sellerRevenue: positive for Sale, negative for Return (API signs it correctly)
-        monthly[month_key]["seller_revenue"] += seller_revenue
-
-        # Purchase cost from local DB
-        purchase_price = 0.0
-        if barcode:
-            try:
-                product = Product.objects.get(barcode=barcode)
-                purchase_price = float(product.purchase_price or 0)
-                if transaction_type in ["Return", "İade"]:
-                    monthly[month_key]["purchase_cost"] -= purchase_price
-                else:
-                    monthly[month_key]["purchase_cost"] += purchase_price
-            except Product.DoesNotExist:
-                missing_barcodes.add(barcode)
-
-        # Cargo cost + transaction fee — attribute once per order on first encounter
-        if order_number and order_number not in processed_cargo_orders:
-            cargo_amount = cargo_by_order.get(order_number, 0.0)
-            monthly[month_key]["cargo_cost"] += cargo_amount
-            monthly[month_key]["transaction_fee"] += 15.0
-            monthly[month_key]["order_count"] += 1
-            processed_cargo_orders[order_number] = month_key
-
-        # Order-level pivot — built alongside monthly buckets
-        if order_number:
-            if order_number not in orders:
-                orders[order_number] = {
-                    "orderNumber": order_number,
-                    "transactionDate": tx_dt,
-                    "items": [],
-                    "totalSellerRevenue": 0.0,
-                    "totalPurchasePrice": 0.0,
-                }
-            orders[order_number]["items"].append({
-                "barcode": barcode,
-                "sellerRevenue": round(seller_revenue, 2),
-                "purchasePrice": round(purchase_price, 2),
-                "transactionType": transaction_type,
-            })
-            orders[order_number]["totalSellerRevenue"] += seller_revenue
-            if transaction_type in ["Return", "İade"]:
-                orders[order_number]["totalPurchasePrice"] -= purchase_price
-            else:
-                orders[order_number]["totalPurchasePrice"] += purchase_price
-
-    # 4. Finalize order-level pivot
-    for order_number, data in orders.items():
-        cargo = cargo_by_order.get(order_number, 0.0)
-        data["totalShippingFee"] = round(cargo, 2)
-        data["cargoFound"] = cargo > 0
-        data["itemCount"] = len(data["items"])
-        data["totalNetProfit"] = round(
-            data["totalSellerRevenue"] - data["totalPurchasePrice"] - cargo - 15.0, 2
+    # 2. Build cargo cost per order across full date range
+    with span("cargo_index") as trace_span:
+        cargo_by_order = build_cargo_cost_by_order(
+            seller_id=seller_id,
+            api_key=api_key,
+            api_secret=api_secret,
+            start_date=start_date,
+            end_date=end_date,
+            store_front_code=store_front_code,
+            user_agent=user_agent,
+            base_url=base_url,
+            progress=progress,
         )
-        data["totalSellerRevenue"] = round(data["totalSellerRevenue"], 2)
-        data["totalPurchasePrice"] = round(data["totalPurchasePrice"], 2)
+        trace_span.set(records=len(cargo_by_order))
 
-    order_list = sorted(
-        orders.values(),
-        key=lambda x: x.get("transactionDate") or datetime.datetime.min.replace(tzinfo=datetime.timezone.utc),
-        reverse=True,
-    )
+    if progress is not None:
+        progress("purchase_prices", 0, 0)
 
-    # 5. Calculate net profit and round monthly values
-    for data in monthly.values():
-        data["net_profit"] = round(
-            data["seller_revenue"] - data["cargo_cost"] - data["purchase_cost"] - data["transaction_fee"], 2
-        )
-        data["seller_revenue"] = round(data["seller_revenue"], 2)
-        data["cargo_cost"] = round(data["cargo_cost"], 2)
-        data["purchase_cost"] = round(data["purchase_cost"], 2)
-        data["transaction_fee"] = round(data["transaction_fee"], 2)
+    # 3. Resolve purchase prices for all distinct barcodes in one batched query
+    price_map = load_purchase_prices(accumulator.barcodes)
+
+    if progress is not None:
+        progress("aggregate", 0, 0)
 
-    monthly_list = sorted(monthly.values(), key=lambda x: x["month_key"])
-    missing_list = sorted(missing_barcodes)
+    # 4-6. Cargo + purchase costs applied to the folded buckets
+    with span("aggregate", records=accumulator.records):
+        monthly_list, missing_list, order_list = accumulator.finalize(cargo_by_order, price_map)
 
     logger.info(
         f"calculate_monthly_summary tamamlandı: {len(monthly_list)} ay, "
         f"{len(order_list)} sipariş, {len(missing_list)} eksik barkod"
     )
+    cache = get_response_cache()
+    if cache is not None:
+        logger.info(f"  Trendyol önbellek: {cache.stats()}")
     return monthly_list, missing_list, order_list
\ No newline at end of file
@@ -19,6 +19,12 @@ urlpatterns = [
     path('profit_calculator_list/', views.profit_calculator_list, name='profit_calculator_list'),
     # Trendyol settlements profit calculation
     path('trendyol-profit/', views.trendyol_profit, name='trendyol_profit'),
+    path('trendyol-profit/jobs/<int:job_id>/', views.trendyol_profit_job_status, name='trendyol_profit_job_status'),
+    path('trendyol-profit/jobs/<int:job_id>/trace/', views.trendyol_profit_job_trace, name='trendyol_profit_job_trace'),
+    path('trendyol-profit/range/', views.trendyol_profit_range, name='trendyol_profit_range'),
+    path('trendyol-profit/sku/', views.trendyol_profit_sku, name='trendyol_profit_sku'),
+    path('trendyol-profit/orders/', views.trendyol_profit_orders, name='trendyol_profit_orders'),
+    path('trendyol-profit/export/<slug:section>.<slug:fmt>', views.trendyol_profit_export, name='trendyol_profit_export'),
     # Auxiliary endpoints
     path('get_product_image/', views.get_product_image, name='get_product_image'),
     path('api/get-product-by-barcode', views.get_product_by_barcode, name='get_product_by_barcode'),
@@ -1,23 +1,33 @@
 ﻿from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse, Http404
 from django.core.paginator import Paginator
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.urls import reverse
-from .models import Product, ProfitCalculator, PurchaseItem, ListingComponent, TrendyolWebhookLog
+from .models import Product, ProfitCalculator, PurchaseItem, ListingComponent, TrendyolWebhookLog, ReportJob, MonthlyProfitSummary
 from .forms import ProductForm, ListingComponentForm
+from .barcode_aliases import find_product, find_products
+from .money import from_kurus, percent_of, ratio_percent, to_decimal, to_kurus
 from .notifications import LowStockNotificationService, send_telegram_notification
 from .telegram_bot import TelegramBot, setup_webhook, get_webhook_info
-from .trendyol_integration import (
-    calculate_monthly_summary,
+from .profit_summary import (
+    BARCODE_REPORT_SORTS, MAX_ORDER_PAGE_SIZE, ORDER_SORTS, build_barcode_report, build_range_report, latest_month_trace, load_month_summary, month_bounds,
+    month_keys_between, page_order_list, page_stored_orders, parse_month_key, shift_month_key,
 )
+from .exports import SECTIONS as EXPORT_SECTIONS, ExportSource, iter_csv, write_xlsx
+from .report_jobs import deserialize_result, enqueue_monthly_summary, job_progress
+import collections
 import datetime
-import calendar
 import logging
-import traceback
+from decimal import Decimal
 import os
 import json
+from urllib.parse import urlencode
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -161,19 +171,32 @@ def profit_calculator(request):
 def save_profit_calculation(request):
     if request.method == 'POST':
         barcode = request.POST.get('barcode')
-        selling_price = float(request.POST.get('selling_price', 0))
-        commution = float(request.POST.get('commution', 0))
-        purchase_cost = float(request.POST.get('purchase_cost', 0))
-        shipping_cost = float(request.POST.get('shipping_cost', 0))
-        packaging_cost = float(request.POST.get('packaging_cost', 0))
-        other_costs = float(request.POST.get('other_costs', 0))
-        vat_rate = float(request.POST.get('vat_rate', 0))
-        
-        paid_commission = selling_price * (commution / 100)
-        total_cost = purchase_cost + shipping_cost + packaging_cost + other_costs + paid_commission
-        paid_vat = (selling_price * (vat_rate / 100)) - (total_cost * (vat_rate / 100))
-        net_profit = selling_price - total_cost - paid_vat
-        profit_margin = (net_profit / selling_price * 100) if selling_price > 0 else 0
+        # Tutarlar kuruş (int) olarak hesaplanır; oranlar Decimal
+        selling = to_kurus(request.POST.get('selling_price', 0))
+        purchase = to_kurus(request.POST.get('purchase_cost', 0))
+        shipping = to_kurus(request.POST.get('shipping_cost', 0))
+        packaging = to_kurus(request.POST.get('packaging_cost', 0))
+        other = to_kurus(request.POST.get('other_costs', 0))
+        commution = to_decimal(request.POST.get('commution', 0))
+        vat_rate = to_decimal(request.POST.get('vat_rate', 0))
+
+        commission = percent_of(selling, commution)
+        total = purchase + shipping + packaging + other + commission
+        vat = percent_of(selling - total, vat_rate)
+        net = selling - total - vat
+        profit_margin = ratio_percent(net, selling) if selling > 0 else Decimal('0.00')
+
+        selling_price = from_kurus(selling)
+        purchase_cost = from_kurus(purchase)
+        shipping_cost = from_kurus(shipping)
+        packaging_cost = from_kurus(packaging)
+        other_costs = from_kurus(other)
+        paid_commission = from_kurus(commission)
+        total_cost = from_kurus(total)
+        paid_vat = from_kurus(vat)
+        net_profit = from_kurus(net)
+        commution = commution.quantize(Decimal('0.01'))
+        vat_rate = vat_rate.quantize(Decimal('0.01'))
         
         try:
             profit = ProfitCalculator.objects.get(barcode=barcode)
@@ -245,20 +268,20 @@ def get_product_image(request):
 
 def get_product_by_barcode(request):
     barcode = request.GET.get('barcode', '')
-    try:
-        product = Product.objects.get(barcode=barcode)
-        return JsonResponse({
-            'found': True,
-            'id': product.id,
-            'name': product.name,
-            'barcode': product.barcode,
-            'purchase_price': str(product.purchase_price),
-            'selling_price': str(product.selling_price),
-            'stock': product.stock,
-            'image_url': product.image_url,
-        })
-    except Product.DoesNotExist:
+    product = find_product(barcode)
+    if product is None:
         return JsonResponse({'found': False})
+    return JsonResponse({
+        'found': True,
+        'id': product.id,
+        'name': product.name,
+        'barcode': product.barcode,
+        'alias': barcode if barcode != product.barcode else None,
+        'purchase_price': str(product.purchase_price),
+        'selling_price': str(product.selling_price),
+        'stock': product.stock,
+        'image_url': product.image_url,
+    })
 
 
 @require_http_methods(["POST"])
@@ -298,47 +321,339 @@ def trendyol_profit(request):
 
     # 'month' param format: "YYYY-MM" (from <input type="month">)
     selected_month = request.GET.get('month', '')
+    job_id = request.GET.get('job', '')
     month_submitted = bool(selected_month)
 
-    # Default form value = current month
-    if not selected_month:
-        selected_month = datetime.datetime.now().strftime('%Y-%m')
-
     monthly_summary = []
     missing_barcodes = []
-    order_details = []
+    refreshed_at = None
+    trace = None
 
-    if month_submitted:
+    # Ay seçildiyse materyalize özet tablosundan oku. Ay hiç hesaplanmamışsa
+    # veya "Şimdi yenile" istendiyse rapor işi açılır ve iş sayfasına yönlendirilir;
+    # hesaplama run_report_jobs worker'ında yapılır
+    if month_submitted and not job_id:
         try:
-            year, month_num = map(int, selected_month.split('-'))
-            last_day = calendar.monthrange(year, month_num)[1]
-            start_dt = datetime.datetime(year, month_num, 1, 0, 0, 0, tzinfo=datetime.timezone.utc)
-            end_dt = datetime.datetime(year, month_num, last_day, 23, 59, 59, tzinfo=datetime.timezone.utc)
-            seller_id = settings.TRENDYOL_SUPPLIER_ID
-            api_key = settings.TRENDYOL_API_KEY
-            api_secret = settings.TRENDYOL_API_SECRET
-            monthly_summary, missing_barcodes, order_details = calculate_monthly_summary(
-                seller_id=seller_id,
-                api_key=api_key,
-                api_secret=api_secret,
-                start_date=start_dt,
-                end_date=end_dt,
-                store_front_code="TRENDYOLTR",
-                user_agent=f"{seller_id}-OzlemFiratTasdelen",
-            )
-        except Exception as e:
-            logger.error(f"Aylık özet hesaplamasında hata: {str(e)}")
-            traceback.print_exc()
+            year, month_num = parse_month_key(selected_month)
+        except ValueError:
+            logger.warning(f"Geçersiz ay parametresi: {selected_month}")
+            year = None
+            month_submitted = False
+        if year is not None:
+            stored = None if request.GET.get('refresh') == '1' else load_month_summary(selected_month)
+            if stored is None:
+                start_dt, end_dt = month_bounds(year, month_num)
+                job = enqueue_monthly_summary(start_dt, end_dt, force=request.GET.get('refresh') == '1')
+                return redirect(f"{reverse('trendyol_profit')}?job={job.pk}")
+            monthly_summary = stored['monthly_summary']
+            missing_barcodes = stored['missing_barcodes']
+            refreshed_at = stored['refreshed_at']
+            trace = latest_month_trace(selected_month)
+
+    job = None
+    if job_id.isdigit():
+        job = ReportJob.objects.filter(pk=int(job_id)).first()
+    if job:
+        selected_month = job.start_date.strftime('%Y-%m')
+        month_submitted = True
+        if job.status == ReportJob.STATUS_DONE:
+            # İş ayı materyalize ettiyse sayfa özet tablosundan okunur
+            if MonthlyProfitSummary.objects.filter(month_key=selected_month, refreshed_at__gte=job.started_at).exists():
+                return redirect(f"{reverse('trendyol_profit')}?month={selected_month}")
+            monthly_summary, missing_barcodes, _ = deserialize_result(job.result)
+            refreshed_at = job.finished_at
+            trace = job.trace
+
+    # Default form value = current month
+    if not selected_month:
+        selected_month = datetime.datetime.now().strftime('%Y-%m')
 
     context = {
         'selected_month': selected_month,
         'month_submitted': month_submitted,
+        'job': job,
+        'refreshed_at': refreshed_at,
+        'trace': trace,
+        # Sipariş detayı ve dışa aktarım aynı kaynaktan (ay veya iş) okunur
+        'report_query': f"job={job.pk}" if job else f"month={selected_month}",
         'monthly_summary': monthly_summary,
         'missing_barcodes': missing_barcodes,
-        'order_details': order_details,
     }
     return render(request, 'inventory/trendyol_profit.html', context)
 
+
+def trendyol_profit_range(request):
+    """
+    Çok aylık / yıllık kâr raporu + geçen yılın aynı aylarıyla karşılaştırma.
+    Yalnızca materyalize aylık özetlerden okunur; eksik aylar POST ile (en fazla
+    REPORT_RANGE_MAX_ENQUEUE ay) rapor işi olarak sıraya alınır.
+    """
+    resp = _require_login(request)
+    if resp:
+        return resp
+
+    current_month = datetime.date.today().strftime('%Y-%m')
+    selected_year = request.GET.get('year', '')
+    start_month = request.GET.get('start', '')
+    end_month = request.GET.get('end', '')
+
+    try:
+        if selected_year:
+            start_month, end_month = f"{int(selected_year):04d}-01", f"{int(selected_year):04d}-12"
+        if not end_month:
+            end_month = current_month
+        if not start_month:
+            start_month = shift_month_key(end_month, -11)
+        end_month = min(end_month, current_month)
+        month_keys = month_keys_between(start_month, end_month)
+    except ValueError:
+        logger.warning(f"Geçersiz aralık: start={start_month} end={end_month} year={selected_year}")
+        start_month, end_month = shift_month_key(current_month, -11), current_month
+        month_keys = month_keys_between(start_month, end_month)
+
+    # En fazla 36 ay (son aylar korunur)
+    month_keys = month_keys[-36:]
+    report = build_range_report(month_keys)
+
+    # Eksik aylar (geçen yılın karşılaştırma ayları dahil) yalnızca "Hesapla" (POST) ile sıraya alınır
+    missing_bounds = {
+        month_key: month_bounds(*parse_month_key(month_key))
+        for month_key in report['missing_months'] if month_key <= current_month
+    }
+    active_jobs = set(
+        ReportJob.objects.filter(
+            status__in=[ReportJob.STATUS_QUEUED, ReportJob.STATUS_RUNNING],
+            source='auto',
+            start_date__in=[start_dt for start_dt, _ in missing_bounds.values()],
+        ).values_list('start_date', 'end_date')
+    )
+    pending_months = sorted(key for key, bounds in missing_bounds.items() if bounds in active_jobs)
+    missing_months = sorted(key for key in missing_bounds if key not in pending_months)
+    max_enqueue = getattr(settings, 'REPORT_RANGE_MAX_ENQUEUE', 12)
+
+    if request.method == 'POST':
+        # En yeni aylar önce; tek istekte en fazla max_enqueue iş açılır
+        for month_key in reversed(missing_months[-max_enqueue:]):
+            enqueue_monthly_summary(*missing_bounds[month_key])
+        return redirect(request.get_full_path())
+
+    context = {
+        'start_month': month_keys[0] if month_keys else start_month,
+        'end_month': month_keys[-1] if month_keys else end_month,
+        'selected_year': selected_year,
+        'rows': report['rows'],
+        'totals': report['totals'],
+        'previous_totals': report['previous_totals'],
+        'pending_months': pending_months,
+        'missing_months': missing_months,
+        'max_enqueue': max_enqueue,
+    }
+    return render(request, 'inventory/trendyol_profit_range.html', context)
+
+
+def trendyol_profit_sku(request):
+    """
+    Barkod bazlı kârlılık raporu (satış/iade adedi, gelir, maliyet, kargo payı, net marj).
+    Materyalize BarcodeMonthlyRollup satırlarından okunur; sıralama ve filtre DB'de yapılır.
+    """
+    resp = _require_login(request)
+    if resp:
+        return resp
+
+    current_month = datetime.date.today().strftime('%Y-%m')
+    end_month = request.GET.get('end') or current_month
+    start_month = request.GET.get('start', '')
+    try:
+        end_month = min(end_month, current_month)
+        if not start_month:
+            start_month = shift_month_key(end_month, -2)
+        # En fazla 36 ay (son aylar korunur)
+        month_keys = month_keys_between(start_month, end_month)[-36:]
+        if not month_keys:
+            raise ValueError("Boş aralık")
+    except ValueError:
+        logger.warning(f"Geçersiz aralık: start={start_month} end={end_month}")
+        start_month, end_month = shift_month_key(current_month, -2), current_month
+        month_keys = month_keys_between(start_month, end_month)
+
+    sort = request.GET.get('sort', 'net_profit')
+    if sort not in BARCODE_REPORT_SORTS:
+        sort = 'net_profit'
+    direction = 'asc' if request.GET.get('dir') == 'asc' else 'desc'
+    query = request.GET.get('q', '').strip()
+    cost_missing_only = request.GET.get('missing') == '1'
+
+    report, totals = build_barcode_report(
+        month_keys, sort=sort, descending=direction == 'desc', query=query, cost_missing_only=cost_missing_only,
+    )
+    page_obj = Paginator(report, 50).get_page(request.GET.get('page', 1))
+    names = dict(
+        Product.objects.filter(barcode__in=[row['barcode'] for row in page_obj]).values_list('barcode', 'name')
+    )
+    for row in page_obj:
+        row['name'] = names.get(row['barcode'], '')
+
+    available = set(MonthlyProfitSummary.objects.filter(month_key__in=month_keys).values_list('month_key', flat=True))
+    filters = {'start': month_keys[0], 'end': month_keys[-1], 'q': query}
+    if cost_missing_only:
+        filters['missing'] = '1'
+
+    context = {
+        'start_month': month_keys[0],
+        'end_month': month_keys[-1],
+        'sort': sort,
+        'direction': direction,
+        'query': query,
+        'cost_missing_only': cost_missing_only,
+        'rows': page_obj,
+        'totals': totals,
+        'missing_months': [key for key in month_keys if key not in available],
+        'filter_query': urlencode(filters),
+        'sort_query': urlencode({**filters, 'sort': sort, 'dir': direction}),
+    }
+    return render(request, 'inventory/trendyol_profit_sku.html', context)
+
+
+def trendyol_profit_job_status(request, job_id):
+    """Rapor işinin ilerlemesi (sayfa bu endpoint'i yoklar)."""
+    resp = _require_login(request)
+    if resp:
+        return resp
+
+    job = get_object_or_404(ReportJob, pk=job_id)
+    return JsonResponse(job_progress(job))
+
+
+def trendyol_profit_job_trace(request, job_id):
+    """Rapor işinin aşama bazlı performans izi (süre, bayt, kayıt, retry, cache)."""
+    resp = _require_login(request)
+    if resp:
+        return resp
+
+    job = get_object_or_404(ReportJob, pk=job_id)
+    if not job.trace:
+        return JsonResponse({'error': 'Bu iş için iz kaydı yok'}, status=404)
+    return JsonResponse(job.trace)
+
+
+def _order_json(order):
+    tx_dt = order.get('transactionDate')
+    if tx_dt and timezone.is_aware(tx_dt):
+        tx_dt = timezone.localtime(tx_dt)
+    return {
+        'orderNumber': order['orderNumber'],
+        'transactionDate': tx_dt.strftime('%d.%m.%Y %H:%M') if tx_dt else None,
+        'itemCount': order.get('itemCount', 0),
+        'totalSellerRevenue': float(order.get('totalSellerRevenue') or 0),
+        'totalPurchasePrice': float(order.get('totalPurchasePrice') or 0),
+        'totalShippingFee': float(order.get('totalShippingFee') or 0),
+        'totalNetProfit': float(order.get('totalNetProfit') or 0),
+        'cargoFound': bool(order.get('cargoFound')),
+        'items': [
+            {
+                'barcode': item.get('barcode'),
+                'transactionType': item.get('transactionType'),
+                'sellerRevenue': float(item.get('sellerRevenue') or 0),
+                'purchasePrice': float(item.get('purchasePrice') or 0),
+            }
+            for item in order.get('items') or []
+        ],
+    }
+
+
+def trendyol_profit_orders(request):
+    """
+    Sipariş detayı (JSON, cursor sayfalı). Sayfa ilk açılışta yalnızca aylık
+    kartları çizer; sipariş tablosu bu endpoint'ten parça parça yüklenir.
+
+    ?month=YYYY-MM | ?job=<id>, sort=date|profit|shipping, dir=asc|desc,
+    cargo=missing (yalnızca kargo faturası bulunamayanlar), cursor, limit
+    """
+    resp = _require_login(request)
+    if resp:
+        return resp
+
+    sort = request.GET.get('sort', 'date')
+    if sort not in ORDER_SORTS:
+        return JsonResponse({'error': f'Geçersiz sıralama: {sort}'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 50)), 1), MAX_ORDER_PAGE_SIZE)
+    except ValueError:
+        limit = 50
+    options = {
+        'sort': sort,
+        'descending': request.GET.get('dir', 'desc') != 'asc',
+        'cargo_missing': request.GET.get('cargo') == 'missing',
+        'cursor': request.GET.get('cursor') or None,
+        'limit': limit,
+    }
+
+    month_key = request.GET.get('month', '')
+    job_id = request.GET.get('job', '')
+    try:
+        if job_id.isdigit():
+            job = get_object_or_404(ReportJob, pk=int(job_id))
+            if job.status != ReportJob.STATUS_DONE:
+                return JsonResponse({'error': 'Rapor işi henüz tamamlanmadı'}, status=409)
+            month_key = job.start_date.strftime('%Y-%m')
+            if MonthlyProfitSummary.objects.filter(month_key=month_key, refreshed_at__gte=job.started_at).exists():
+                orders, next_cursor, total = page_stored_orders(month_key, **options)
+            else:
+                orders, next_cursor, total = page_order_list(deserialize_result(job.result)[2], **options)
+        else:
+            parse_month_key(month_key)
+            orders, next_cursor, total = page_stored_orders(month_key, **options)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'orders': [_order_json(order) for order in orders],
+        'next_cursor': next_cursor,
+        'total': total,
+    })
+
+
+def trendyol_profit_export(request, section, fmt):
+    """
+    Rapor bölümünü (monthly / orders / missing) CSV veya XLSX olarak indirir.
+    ?month=YYYY-MM materyalize aydan, ?job=<id> tamamlanmış rapor işinden okur.
+    XLSX için section=all tüm bölümleri ayrı sayfalara yazar.
+    """
+    resp = _require_login(request)
+    if resp:
+        return resp
+
+    if fmt not in ('csv', 'xlsx') or (section not in EXPORT_SECTIONS and not (section == 'all' and fmt == 'xlsx')):
+        raise Http404("Geçersiz dışa aktarım")
+
+    month_key = request.GET.get('month', '')
+    job_id = request.GET.get('job', '')
+    source = None
+    if job_id.isdigit():
+        source = ExportSource.for_job(get_object_or_404(ReportJob, pk=int(job_id)))
+    elif month_key:
+        try:
+            parse_month_key(month_key)
+        except ValueError:
+            raise Http404("Geçersiz ay")
+        source = ExportSource.for_month(month_key)
+    if source is None:
+        raise Http404("Bu ay için hesaplanmış rapor yok")
+
+    filename = f"trendyol-kar-{source.name}-{section}.{fmt}"
+    if fmt == 'csv':
+        response = StreamingHttpResponse(iter_csv(source, section), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    sections = list(EXPORT_SECTIONS) if section == 'all' else [section]
+    return FileResponse(
+        write_xlsx(source, sections),
+        as_attachment=True,
+        filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
 def login_view(request):
     error = None
     if request.method == 'POST':
@@ -779,63 +1094,10 @@ def trendyol_order_webhook(request):
             raw_payload=payload
         )
 
-        results = []
-        processed_count = 0  # Kaç line item gerçekten işlendi
-        
-        for line in lines:
-            barcode = line.get('barcode')
-            quantity = line.get('quantity', 1)
-            product_name = line.get('productName', 'N/A')
-            line_item_status = line.get('orderLineItemStatusName', 'UNKNOWN')
-            
-            if not barcode:
-                logger.warning(f"⚠️ Barcode bulunamadı: {line}")
-                continue
-            
-            # ═══ İŞLENECEK STATÜLER ═══
-            # Approved: Seller manuel onayladı
-            # ReadyToShip: Trendyol otomatik onayladı, kargoya hazır
-            PROCESSABLE_STATUSES = {"Approved", "ReadyToShip"}
-            should_process = line_item_status in PROCESSABLE_STATUSES
-            
-            if not should_process:
-                logger.info(f"⏭️ Atlandı: {barcode} - Status: {line_item_status}")
-                # Log kaydet ama stok düşürme
-                TrendyolWebhookLog.objects.create(
-                    order_number=order_number,
-                    barcode=barcode,
-                    status=status,
-                    line_item_status=line_item_status,
-                    quantity=quantity,
-                    success=False,
-                    processed=False,
-                    error_message=f"Atlandı: orderLineItemStatusName '{line_item_status}' işlenmiyor",
-                    raw_payload=payload
-                )
-                results.append({
-                    'success': False,
-                    'message': f"Atlandı: Status '{line_item_status}'",
-                    'barcode': barcode,
-                    'line_item_status': line_item_status,
-                    'processed': False
-                })
-                continue
-                
-            # İşlemi yap ve logla
-            result = process_trendyol_order_line(
-                order_number=order_number,
-                barcode=barcode,
-                quantity=quantity,
-                status=status,
-                line_item_status=line_item_status,
-                raw_payload=payload
-            )
-            results.append(result)
-            
-            if result.get('processed'):
-                processed_count += 1
-            
-            logger.info(f"{'✅' if result['success'] else '❌'} {barcode}: {result['message']}")
+        results = process_trendyol_order(order_number, status, lines, payload)
+        processed_count = sum(1 for r in results if r.get('processed'))  # Kaç line item gerçekten işlendi
+        for result in results:
+            logger.info(f"{'✅' if result['success'] else '❌'} {result['barcode']}: {result['message']}")
 
         # Genel özet
         success_count = sum(1 for r in results if r['success'])
@@ -911,128 +1173,178 @@ def trendyol_order_webhook(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 
-def process_trendyol_order_line(order_number, barcode, quantity, status, line_item_status, raw_payload):
+# ═══ İŞLENECEK STATÜLER ═══
+# Approved: Seller manuel onayladı
+# ReadyToShip: Trendyol otomatik onayladı, kargoya hazır
+PROCESSABLE_LINE_STATUSES = {"Approved", "ReadyToShip"}
+
+
+def process_trendyol_order(order_number, status, lines, raw_payload):
     """
-    Tek bir sipariş satırını işler - stok düşürme mantığı burada.
+    Bir siparişin tüm satırlarını tek transaction'da işler - stok düşürme mantığı burada.
+
+    Ürünler ve bileşenler tüm barkodlar için tek seferde okunur; etkilenen SKU
+    satırları select_for_update ile kilitlenir ve tek bir
+    UPDATE ... SET quantity = GREATEST(quantity - x, 0) ile düşülür. Eşzamanlı
+    iki webhook aynı SKU'yu birbirinin üzerine yazamaz. Log satırları
+    bulk_create ile yazılır.
     Returns:
-        dict: {'success': bool, 'message': str, 'processed': bool, 'affected_items': list}
+        list: satır başına {'success': bool, 'message': str, 'processed': bool, 'affected_items': list}
     """
-    try:
-        # 1. Barcode ile inventory_product bul
-        try:
-            product = Product.objects.get(barcode=barcode)
-        except Product.DoesNotExist:
-            TrendyolWebhookLog.objects.create(
-                order_number=order_number,
-                barcode=barcode,
-                status=status,
-                line_item_status=line_item_status,
-                quantity=quantity,
-                success=False,
-                processed=False,
-                error_message=f"Barkod '{barcode}' sistemde bulunamadı",
-                raw_payload=raw_payload
-            )
-            return {
+    logs = []
+    results = []
+
+    def log(barcode, line_item_status, quantity, **fields):
+        logs.append(TrendyolWebhookLog(
+            order_number=order_number,
+            barcode=barcode,
+            status=status,
+            line_item_status=line_item_status,
+            quantity=quantity,
+            raw_payload=raw_payload,
+            **fields
+        ))
+
+    pending = []
+    for line in lines:
+        barcode = line.get('barcode')
+        quantity = line.get('quantity', 1)
+        line_item_status = line.get('orderLineItemStatusName', 'UNKNOWN')
+
+        if not barcode:
+            logger.warning(f"⚠️ Barcode bulunamadı: {line}")
+            continue
+
+        if line_item_status not in PROCESSABLE_LINE_STATUSES:
+            logger.info(f"⏭️ Atlandı: {barcode} - Status: {line_item_status}")
+            # Log kaydet ama stok düşürme
+            log(barcode, line_item_status, quantity, success=False, processed=False,
+                error_message=f"Atlandı: orderLineItemStatusName '{line_item_status}' işlenmiyor")
+            results.append({
                 'success': False,
-                'message': f"Barkod '{barcode}' bulunamadı",
+                'message': f"Atlandı: Status '{line_item_status}'",
                 'barcode': barcode,
                 'line_item_status': line_item_status,
                 'processed': False
-            }
+            })
+            continue
+        pending.append((len(results), barcode, quantity, line_item_status))
+        results.append(None)
+    skipped_logs = len(logs)
 
-        # 2. Product'ın listing_components'larını al
-        components = ListingComponent.objects.filter(
-            inventory_product=product
-        ).select_related('purchase_item')
+    try:
+        with transaction.atomic():
+            # 1. Barkod (veya barkod eşlemesi) ile inventory_product'lar — tek seferde
+            products = find_products(barcode for _, barcode, _, _ in pending)
+
+            # 2. Tüm ürünlerin listing_components'ları — tek sorgu
+            components = collections.defaultdict(list)
+            for product_id, purchase_item_id, qty_per_listing in ListingComponent.objects.filter(
+                inventory_product__in=[p.id for p in products.values()]
+            ).values_list('inventory_product_id', 'purchase_item_id', 'qty_per_listing'):
+                components[product_id].append((purchase_item_id, qty_per_listing))
+
+            # 3. Etkilenen SKU'ları kilitle (pk sırasıyla: kilitlenme olmasın)
+            sku_ids = {sku_id for rows in components.values() for sku_id, _ in rows}
+            skus = {
+                item.id: item
+                for item in PurchaseItem.objects.select_for_update()
+                .filter(pk__in=sku_ids).order_by('pk').only('id', 'name', 'purchase_barcode', 'quantity')
+            }
+            quantities = {sku_id: item.quantity for sku_id, item in skus.items()}
+            deductions = collections.defaultdict(int)
+
+            for index, barcode, quantity, line_item_status in pending:
+                product = products.get(barcode)
+                if product is None:
+                    log(barcode, line_item_status, quantity, success=False, processed=False,
+                        error_message=f"Barkod '{barcode}' sistemde bulunamadı")
+                    results[index] = {
+                        'success': False,
+                        'message': f"Barkod '{barcode}' bulunamadı",
+                        'barcode': barcode,
+                        'line_item_status': line_item_status,
+                        'processed': False
+                    }
+                    continue
+
+                if not components.get(product.id):
+                    log(barcode, line_item_status, quantity, success=True, processed=True,
+                        error_message=f"'{product.name}' için bileşen tanımlı değil (listing_components boş)",
+                        affected_product_id=product.id)
+                    results[index] = {
+                        'success': True,
+                        'message': f"'{product.name}' için bileşen yok - stok düşürülmedi",
+                        'barcode': barcode,
+                        'product_id': product.id,
+                        'product_name': product.name,
+                        'order_quantity': quantity,
+                        'line_item_status': line_item_status,
+                        'processed': True
+                    }
+                    continue
+
+                # 4. Satırın SKU düşümleri (aynı SKU'yu kullanan satırlar sırayla düşer)
+                affected_items = []
+                for sku_id, qty_per_listing in components[product.id]:
+                    deduction_amount = int(qty_per_listing * quantity)
+                    old_quantity = quantities[sku_id]
+                    quantities[sku_id] = max(old_quantity - deduction_amount, 0)
+                    deductions[sku_id] += deduction_amount
+                    affected_items.append({
+                        'sku_name': skus[sku_id].name,
+                        'sku_barcode': skus[sku_id].purchase_barcode,
+                        'old_qty': old_quantity,
+                        'new_qty': quantities[sku_id],
+                        'deducted': deduction_amount
+                    })
+
+                log(barcode, line_item_status, quantity, success=True, processed=True,
+                    affected_product_id=product.id, affected_components=affected_items)
+                results[index] = {
+                    'success': True,
+                    'message': f"'{product.name}' için {len(affected_items)} SKU stoku düşürüldü",
+                    'barcode': barcode,
+                    'product_id': product.id,
+                    'product_name': product.name,
+                    'order_quantity': quantity,
+                    'line_item_status': line_item_status,
+                    'processed': True,
+                    'affected_items': affected_items
+                }
+
+            # 5. Tüm SKU'lar tek UPDATE ile
+            if deductions:
+                PurchaseItem.objects.filter(pk__in=deductions.keys()).update(quantity=Case(
+                    *[When(pk=sku_id, then=Greatest(F('quantity') - Value(amount), Value(0),
+                                                    output_field=IntegerField()))
+                      for sku_id, amount in deductions.items()],
+                    default=F('quantity'),
+                    output_field=IntegerField(),
+                ))
+            TrendyolWebhookLog.objects.bulk_create(logs)
 
-        if not components.exists():
-            TrendyolWebhookLog.objects.create(
-                order_number=order_number,
-                barcode=barcode,
-                status=status,
-                line_item_status=line_item_status,
-                quantity=quantity,
-                success=True,
-                processed=True,
-                error_message=f"'{product.name}' için bileşen tanımlı değil (listing_components boş)",
-                affected_product_id=product.id,
-                raw_payload=raw_payload
-            )
-            return {
-                'success': True,
-                'message': f"'{product.name}' için bileşen yok - stok düşürülmedi",
+    except Exception as e:
+        logger.error(f"Process error for order {order_number}: {e}", exc_info=True)
+        # Transaction geri alındı: hiçbir satırda stok düşmedi
+        del logs[skipped_logs:]
+        for index, barcode, quantity, line_item_status in pending:
+            log(barcode, line_item_status, quantity, success=False, processed=False, error_message=str(e))
+            results[index] = {
+                'success': False,
+                'message': f"İşlem hatası: {str(e)}",
                 'barcode': barcode,
-                'product_id': product.id,
-                'product_name': product.name,
-                'order_quantity': quantity,
                 'line_item_status': line_item_status,
-                'processed': True
+                'processed': False
             }
+        # Hata logları kendi transaction'ında; yazılamazsa webhook yine sonuç döner
+        try:
+            with transaction.atomic():
+                TrendyolWebhookLog.objects.bulk_create(logs)
+        except Exception as log_error:
+            logger.error(f"Webhook logları yazılamadı, sipariş {order_number}: {log_error}", exc_info=True)
 
-        # 3. Her component için purchase_item.quantity'yi düşür
-        affected_items = []
-        for component in components:
-            purchase_item = component.purchase_item
-            deduction_amount = component.qty_per_listing * quantity
-            old_quantity = purchase_item.quantity
-            purchase_item.quantity -= int(deduction_amount)
-            if purchase_item.quantity < 0:
-                purchase_item.quantity = 0
-            purchase_item.save()
-            affected_items.append({
-                'sku_name': purchase_item.name,
-                'sku_barcode': purchase_item.purchase_barcode,
-                'old_qty': old_quantity,
-                'new_qty': purchase_item.quantity,
-                'deducted': int(deduction_amount)
-            })
-
-        # 4. Başarılı log kaydet
-        TrendyolWebhookLog.objects.create(
-            order_number=order_number,
-            barcode=barcode,
-            status=status,
-            line_item_status=line_item_status,
-            quantity=quantity,
-            success=True,
-            processed=True,
-            affected_product_id=product.id,
-            affected_components=affected_items,
-            raw_payload=raw_payload
-        )
-        return {
-            'success': True,
-            'message': f"'{product.name}' için {len(affected_items)} SKU stoku düşürüldü",
-            'barcode': barcode,
-            'product_id': product.id,
-            'product_name': product.name,
-            'order_quantity': quantity,
-            'line_item_status': line_item_status,
-            'processed': True,
-            'affected_items': affected_items
-        }
-
-    except Exception as e:
-        TrendyolWebhookLog.objects.create(
-            order_number=order_number,
-            barcode=barcode,
-            status=status,
-            line_item_status=line_item_status,
-            quantity=quantity,
-            success=False,
-            processed=False,
-            error_message=str(e),
-            raw_payload=raw_payload
-        )
-        logger.error(f"Process error for {barcode}: {e}", exc_info=True)
-        return {
-            'success': False,
-            'message': f"İşlem hatası: {str(e)}",
-            'barcode': barcode,
-            'line_item_status': line_item_status,
-            'processed': False
-        }
+    return results
 
 
 @csrf_exempt
@@ -202,6 +202,57 @@ TRENDYOL_SUPPLIER_ID = os.getenv('TRENDYOL_SUPPLIER_ID', '')
 TRENDYOL_API_KEY = os.getenv('TRENDYOL_API_KEY', '')
 TRENDYOL_API_SECRET = os.getenv('TRENDYOL_API_SECRET', '')
 
+# Trendyol HTTP connection pool (trendyol_client.TrendyolClient)
+TRENDYOL_HTTP_POOL_CONNECTIONS = int(os.getenv('TRENDYOL_HTTP_POOL_CONNECTIONS', '4'))
+TRENDYOL_HTTP_POOL_MAXSIZE = int(os.getenv('TRENDYOL_HTTP_POOL_MAXSIZE', '16'))
+
+# Max concurrent Trendyol requests per fan-out (periods / pages)
+TRENDYOL_MAX_WORKERS = int(os.getenv('TRENDYOL_MAX_WORKERS', '4'))
+
+# Max concurrent cargo-invoice serials in build_cargo_cost_by_order
+TRENDYOL_CARGO_INVOICE_WORKERS = int(os.getenv('TRENDYOL_CARGO_INVOICE_WORKERS', '4'))
+
+# Recent days that are re-scanned for new DeductionInvoices records (cargo invoice index)
+TRENDYOL_CARGO_INDEX_SETTLE_DAYS = int(os.getenv('TRENDYOL_CARGO_INDEX_SETTLE_DAYS', '2'))
+
+# Local settlements warehouse (sync_settlements command)
+TRENDYOL_SETTLEMENT_RECHECK_DAYS = int(os.getenv('TRENDYOL_SETTLEMENT_RECHECK_DAYS', '3'))
+TRENDYOL_SETTLEMENT_INITIAL_DAYS = int(os.getenv('TRENDYOL_SETTLEMENT_INITIAL_DAYS', '365'))
+
+# On-disk Trendyol response cache (trendyol_client.ResponseCache)
+TRENDYOL_CACHE_ENABLED = os.getenv('TRENDYOL_CACHE_ENABLED', 'True') == 'True'
+TRENDYOL_CACHE_DIR = os.getenv('TRENDYOL_CACHE_DIR', os.path.join(BASE_DIR, "cache", "trendyol"))
+TRENDYOL_CACHE_IMMUTABLE_AFTER_DAYS = int(os.getenv('TRENDYOL_CACHE_IMMUTABLE_AFTER_DAYS', '30'))
+TRENDYOL_CACHE_RECENT_TTL_SECONDS = int(os.getenv('TRENDYOL_CACHE_RECENT_TTL_SECONDS', '600'))
+
+# Shared Trendyol rate limiter and retry policy
+TRENDYOL_RATE_LIMIT_PER_SECOND = float(os.getenv('TRENDYOL_RATE_LIMIT_PER_SECOND', '10'))
+TRENDYOL_RATE_LIMIT_BURST = int(os.getenv('TRENDYOL_RATE_LIMIT_BURST', '10'))
+TRENDYOL_MAX_RETRIES = int(os.getenv('TRENDYOL_MAX_RETRIES', '4'))
+
+# Max concurrent requests per call in the asyncio client (inventory.trendyol_async)
+TRENDYOL_ASYNC_CONCURRENCY = int(os.getenv('TRENDYOL_ASYNC_CONCURRENCY', '8'))
+# Run report jobs through the asyncio client instead of the threaded sync client
+TRENDYOL_ASYNC_REPORTS = os.getenv('TRENDYOL_ASYNC_REPORTS', 'False') == 'True'
+
+# Settlement aggregation engine for monthly summaries: "python" or "pandas" (inventory.columnar)
+TRENDYOL_AGGREGATION_ENGINE = os.getenv('TRENDYOL_AGGREGATION_ENGINE', 'python')
+
+# /trendyol-profit/ report jobs: a finished job is reused for this long before recomputing
+REPORT_JOB_REUSE_SECONDS = int(os.getenv('REPORT_JOB_REUSE_SECONDS', str(6 * 3600)))
+
+# /trendyol-profit/range/: max report jobs one "compute" request may enqueue
+REPORT_RANGE_MAX_ENQUEUE = int(os.getenv('REPORT_RANGE_MAX_ENQUEUE', '12'))
+
+# Single-flight for identical concurrent report computations (inventory.singleflight):
+# a crashed leader's lease expires after this long; waiters poll at this interval
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.getenv('SINGLE_FLIGHT_LEASE_SECONDS', '1800'))
+SINGLE_FLIGHT_POLL_SECONDS = float(os.getenv('SINGLE_FLIGHT_POLL_SECONDS', '2'))
+
+# Product barcode aliases (inventory.barcode_aliases): the in-process alias map checks
+# the table version at most this often
+BARCODE_ALIAS_CHECK_SECONDS = float(os.getenv('BARCODE_ALIAS_CHECK_SECONDS', '10'))
+
 # Trendyol Webhook Authentication (Basic Authentication)
 TRENDYOL_WEBHOOK_USERNAME = os.getenv('TRENDYOL_WEBHOOK_USERNAME', 'webhook_admin_2024')
 TRENDYOL_WEBHOOK_PASSWORD = os.getenv('TRENDYOL_WEBHOOK_PASSWORD', '')